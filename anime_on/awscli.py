@@ -1,17 +1,26 @@
+import json
 import logging
 import boto3
 
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
+from hashlib import sha256
+from typing import Optional
 from uuid import uuid4
 
 from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.choices import TaskCoalescing
 
 
 logger = logging.getLogger(__name__)
 scheduler_client = None
 events_client = None
+sqs_client = None
+schedulers = {}  # instances of scheduler backends by their paths
 
 
 def get_scheduler_client():
@@ -21,12 +30,58 @@ def get_scheduler_client():
     return scheduler_client
 
 
+def get_sqs_client():
+    """
+    Client of the queue of async tasks by 'SQS_TRANSPORT': boto3 SQS client or 'SQLiteSQSClient' with the same methods.
+    """
+    global sqs_client
+    if sqs_client is None:
+        if settings.SQS_TRANSPORT == 'sqlite':
+            from .sqs_sqlite import SQLiteSQSClient
+
+            sqs_client = SQLiteSQSClient(settings.SQS_SQLITE_PATH)
+        elif settings.SQS_TRANSPORT == 'sqs':
+            sqs_client = boto3.client('sqs')
+        else:
+            raise ValueError(f"Unknown SQS_TRANSPORT '{settings.SQS_TRANSPORT}', expected 'sqs' or 'sqlite'")
+    return sqs_client
+
+
+def get_scheduler():
+    """
+    Instance of 'SCHEDULER_BACKEND'.
+    """
+    path = settings.SCHEDULER_BACKEND
+    if path not in schedulers:
+        schedulers[path] = import_string(path)()
+    return schedulers[path]
+
+
+def get_task_key(command: str, args: list = None, kwargs: dict = None) -> str:
+    """
+    The same for calls of the command with equal arguments, the order of kwargs doesn't matter.
+    """
+    data = json.dumps([command, args or [], kwargs or {}], cls=DjangoJSONEncoder, sort_keys=True)
+    return sha256(data.encode()).hexdigest()[:32]
+
+
+def complete_scheduled_task(command_input: dict):
+    """
+    Remove the one-time task of the processed message from pending ones, so the command can be scheduled again.
+    """
+    from apps.core.models import ScheduledTask
+
+    if command_input.get('task_key'):
+        ScheduledTask.objects.filter(key=command_input['task_key'], run_at__isnull=False).delete()
+
+
 def schedule_command(
     command: str,
     start_time: datetime = None,
     schedule_expression: str = None,
     args: list = None,
     kwargs: dict = None,
+    coalesce: TaskCoalescing = None,
 ):
     """
     start_time: datetime, only for one-time scheduling case
@@ -36,21 +91,21 @@ def schedule_command(
      rate(5 minutes)         - recurrent scheduling case
      cron(15 10 ? * 6L 2022) - recurrent scheduling case
 
+    coalesce: TaskCoalescing, what to do if the same command with the same arguments is pending
+     None     - schedule one more task
+     SKIP     - keep the pending task, this call is skipped
+     DEBOUNCE - replace the schedule of the pending task with this one
+
     Example call: schedule_command(start_time=datetime.utcnow()+timedelta(seconds=30), command="migrate")
     """
-    queue_arn = settings.SQS_QUEUE_ARN
-    if not queue_arn:
-        logger.warning("SQS_QUEUE_ARN is not configured. Scheduling task has been skipped.")
-        return
-
-    role_arn = settings.SCHEDULER_RUN_TASK_ROLE_ARN
-    if not role_arn:
-        logger.warning("SCHEDULER_RUN_TASK_ROLE_ARN is not configured. Scheduling task has been skipped.")
+    scheduler = get_scheduler()
+    if not scheduler.is_configured():
         return
 
     if start_time is not None and schedule_expression is not None:
         raise ValueError('Only one of start_time and schedule_expression required')
 
+    run_at = None
     if schedule_expression is None:
         if start_time is None:
             start_time = timezone.now()
@@ -62,6 +117,9 @@ def schedule_command(
             start_time = start_time.astimezone(UTC)
 
         schedule_expression = f"at({start_time.strftime('%Y-%m-%dT%H:%M:%S')})"
+        run_at = start_time
+    elif schedule_expression.startswith('at('):
+        run_at = datetime.strptime(schedule_expression, 'at(%Y-%m-%dT%H:%M:%S)').replace(tzinfo=UTC)
 
     command_input = {
         "command": command,
@@ -73,23 +131,75 @@ def schedule_command(
     if kwargs:
         command_input["kwargs"] = kwargs
 
-    task_id = f'Task-{command[:26]}-{uuid4().hex}'  # max length of 'task_id' is 64 chars
-    command_input = DjangoJSONEncoder().encode(command_input)
-
-    get_scheduler_client().create_schedule(
-        Name=task_id,
-        ActionAfterCompletion="DELETE",
-        FlexibleTimeWindow={'Mode': 'OFF'},
-        ScheduleExpression=schedule_expression,
-        ScheduleExpressionTimezone='UTC',
-        Target={
-            'Arn': queue_arn,
-            'Input': command_input,
-            'RoleArn': role_arn,
-        },
-    )
+    if coalesce is None:
+        task_id = f'Task-{command[:26]}-{uuid4().hex}'  # max length of 'task_id' is 64 chars
+        command_input = DjangoJSONEncoder().encode(command_input)
+        scheduler.create_schedule(task_id, schedule_expression, command_input)
+    else:
+        task_key = command_input["task_key"] = get_task_key(command, args, kwargs)
+        task_id = f'Task-{command[:26]}-{task_key}'
+        command_input = DjangoJSONEncoder().encode(command_input)
+        if not coalesce_task(scheduler, coalesce, task_key, task_id, command, schedule_expression, run_at,
+                             command_input):
+            logger.info('The task is pending, scheduling has been skipped.',
+                        extra={'message_id': 'schedule_command_task_skipped',
+                               'command_name': command,
+                               'task_key': task_key})
+            return
+
     logger.info('A task has been scheduled.',
                 extra={'message_id': 'schedule_command_task_registered',
                        'command_name': command,
                        'command_input': command_input,
                        'schedule_expression': schedule_expression})
+
+
+def coalesce_task(scheduler, coalesce: TaskCoalescing, task_key: str, task_id: str, command: str,
+                  schedule_expression: str, run_at: Optional[datetime], command_input: str) -> bool:
+    """
+    Register the task in its registry row and replace its schedule after the commit. The row is locked,
+    so concurrent calls for the same task are serialized, and a rolled back registration leaves no schedule.
+    :return: bool. False if the task is pending and it is skipped
+    """
+    from apps.core.models import ScheduledTask
+
+    with transaction.atomic():
+        replaced_name = None
+        task, created = ScheduledTask.objects.get_or_create(key=task_key, defaults={
+            'name': task_id, 'command': command, 'schedule_expression': schedule_expression, 'run_at': run_at,
+        })
+        if not created:
+            task = ScheduledTask.objects.select_for_update().get(pk=task.pk)
+            # a one-time task which hasn't run long after its time was lost (the message, the consumer)
+            stale_before = timezone.now() - timedelta(seconds=settings.SCHEDULER_TASK_STALE_AFTER)
+            pending = task.run_at is None or task.run_at > stale_before
+            if pending and coalesce == TaskCoalescing.SKIP:
+                return False
+            replaced_name = task.name
+            task.name, task.schedule_expression, task.run_at = task_id, schedule_expression, run_at
+            task.save(update_fields=['name', 'schedule_expression', 'run_at', 'updated'])
+        transaction.on_commit(lambda: replace_task_schedule(
+            scheduler, task_key, task_id, schedule_expression, command_input, replaced_name,
+        ))
+    return True
+
+
+def replace_task_schedule(scheduler, task_key: str, task_id: str, schedule_expression: str, command_input: str,
+                          replaced_name: Optional[str] = None):
+    """
+    Delete the replaced schedule and create the schedule of the committed registry row. The row is locked
+    again, a schedule of a call which has been replaced by a concurrent one is not created.
+    If the schedule can't be created, the row is deleted, so next calls don't skip the task as pending.
+    """
+    from apps.core.models import ScheduledTask
+
+    task = ScheduledTask.objects.filter(key=task_key, name=task_id, schedule_expression=schedule_expression)
+    try:
+        if replaced_name:
+            scheduler.delete_schedule(replaced_name)
+        with transaction.atomic():
+            if task.select_for_update().exists():
+                scheduler.create_schedule(task_id, schedule_expression, command_input)
+    except Exception:
+        task.delete()
+        raise
@@ -1,13 +1,28 @@
 from django.http.request import HttpRequest
 from contextlib import contextmanager
+from logging.handlers import QueueHandler as BaseQueueHandler, QueueListener
+from typing import Dict, Optional
 import logging
 import json
+import os
+import queue
+import random
 import traceback
 import threading
 
+try:
+    import orjson
+except ImportError:  # optional, it is several times faster than json
+    orjson = None
+
 
 thread_context = threading.local()
 
+# attributes of every LogRecord, the other attributes are 'extra' of the call
+RECORD_ATTRIBUTES = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+# attributes of LogRecord in the output, 'name' is written as 'logger'
+RECORD_FIELDS = ('levelname', 'levelno', 'pathname', 'filename', 'module', 'lineno', 'funcName', 'created')
+
 
 def get_request_id():
     return getattr(thread_context, "request_id", None)
@@ -37,22 +52,98 @@ def default(obj):  # add more types to pass their objects to loggers
         if obj.GET:
             result["query"] = dict(obj.GET)
         return result
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode(errors='replace')
     return str(obj)  # any type will be converted to json, even if the result's ugly
 
 
+# 'json.dumps' with 'default' creates an encoder for every call
+json_encoder = json.JSONEncoder(default=default)
+
+
 class FormatterJSON(logging.Formatter):
+    """
+    :param fast_json: encode with 'orjson' when it is installed
+    """
+    def __init__(self, *args, fast_json: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fast_json = fast_json and orjson is not None
+
     def format(self, record):
-        exclude = (
-            'msg', 'args', 'exc_text', 'stack_info',
-            'relativeCreated', 'msecs',
-            'thread', 'threadName', 'processName', 'process',
-        )
-        log_data = {k: v for k, v in record.__dict__.items() if k not in exclude}
+        record_data = record.__dict__
+        log_data = {field: record_data[field] for field in RECORD_FIELDS}
+        for key in record_data.keys() - RECORD_ATTRIBUTES:
+            log_data[key] = record_data[key]
         log_data["asctime"] = self.formatTime(record, self.datefmt)
         log_data["message"] = record.getMessage()
-        log_data["logger"] = log_data.pop("name")
-        log_data["request_id"] = get_request_id()
-        exc_info = log_data.pop("exc_info")
-        if exc_info:
-            log_data["exception"] = traceback.format_exception(*exc_info)
-        return json.dumps(log_data, default=default)
+        log_data["logger"] = record.name
+        # records of 'QueueHandler' are formatted in another thread, the request id is saved in them
+        log_data["request_id"] = record_data.get("request_id") or get_request_id()
+        if record.exc_info:
+            log_data["exception"] = traceback.format_exception(*record.exc_info)
+        if self.fast_json:
+            return orjson.dumps(log_data, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json_encoder.encode(log_data)
+
+
+class QueueHandler(BaseQueueHandler):
+    """
+    Puts records to a queue, a thread of the process formats and writes them to the stream, so logging
+    doesn't wait for I/O. The thread is started by the first record of every process (gunicorn workers
+    are forked), 'logging.shutdown' flushes the queue at exit.
+    Records are formatted later, so objects in their 'extra' should not be changed after logging.
+    """
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.handler = logging.StreamHandler(stream)
+        self.listener: Optional[QueueListener] = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # the listener formats records
+        self.handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        record.request_id = get_request_id()
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        super().enqueue(record)
+
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            self.listener = QueueListener(self.queue, self.handler)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def flush(self):
+        """
+        Wait until the queued records are written.
+        """
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.pid = None
+        self.handler.flush()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes the share of records by their 'message_id' given in 'rates', for example, {"error_logging_middleware": 0.1}.
+    Other records and records of errors always pass.
+    """
+    def __init__(self, rates: Dict[str, float] = None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'message_id', None))
+        if rate is None or record.levelno >= logging.ERROR:
+            return True
+        return random.random() < rate
@@ -0,0 +1,141 @@
+import calendar
+import re
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional, Set, Tuple
+
+
+RATE_PATTERN = re.compile(r'^rate\((\d+) (minute|minutes|hour|hours|day|days)\)$')
+RATE_UNITS = {'minute': 'minutes', 'hour': 'hours', 'day': 'days'}
+MONTH_NAMES = {name.upper(): index for index, name in enumerate(calendar.month_abbr) if name}
+# day-of-week of EventBridge: 1 is Sunday
+DAY_NAMES = {'SUN': 1, 'MON': 2, 'TUE': 3, 'WED': 4, 'THU': 5, 'FRI': 6, 'SAT': 7}
+# (name, min, max, names) of the fields of cron expressions
+CRON_FIELDS = (
+    ('minutes', 0, 59, {}),
+    ('hours', 0, 23, {}),
+    ('day-of-month', 1, 31, {}),
+    ('month', 1, 12, MONTH_NAMES),
+    ('day-of-week', 1, 7, DAY_NAMES),
+    ('year', 1970, 2199, {}),
+)
+MAX_CRON_SEARCH_DAYS = 366 * 5
+# 'nL' of day-of-week: the last day n of the month, for example, '6L' is the last Friday
+LAST_DAY_OF_WEEK_PATTERN = re.compile(r'^(\w*)L$', re.IGNORECASE)
+
+
+def parse_value(value: str, names: Dict[str, int]) -> int:
+    return names[value.upper()] if value.upper() in names else int(value)
+
+
+def parse_cron_field(value: str, low: int, high: int, names: Dict[str, int]) -> Set[int]:
+    """
+    Values of the field: '*', '?', numbers, names, lists 'a,b', ranges 'a-b' and increments 'a/b', '*/b'.
+    """
+    result = set()
+    for part in value.split(','):
+        part, _, step = part.partition('/')
+        if part in ('*', '?'):
+            start, end = low, high
+        elif '-' in part:
+            start, end = (parse_value(item, names) for item in part.split('-', 1))
+        else:
+            start = parse_value(part, names)
+            end = high if step else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Value '{value}' is out of {low}-{high}")
+        result.update(range(start, end + 1, int(step) if step else 1))
+    return result
+
+
+def parse_cron(expression: str) -> Tuple[Set[int], Set[int], Optional[Set[int]], Set[int], Set[int], Set[int]]:
+    """
+    cron(minutes hours day-of-month month day-of-week year) of EventBridge Scheduler in UTC.
+    'L' is supported as the last day of the month or the week (Saturday) and 'nL' as the last day n
+    of the week in the month, 'W' and '#' are not.
+    :return: tuple. Sets of values of the fields, day-of-month is None for 'L',
+        day-of-week is a negative value for 'nL'
+    """
+    fields = expression[len('cron('):-1].split()
+    if not expression.endswith(')') or len(fields) != len(CRON_FIELDS):
+        raise ValueError(f"Wrong cron expression '{expression}', 6 fields are expected")
+    if '?' not in (fields[2], fields[4]):
+        raise ValueError(f"Wrong cron expression '{expression}', day-of-month or day-of-week must be '?'")
+
+    values: List[Optional[Set[int]]] = []
+    for value, (name, low, high, names) in zip(fields, CRON_FIELDS):
+        if name == 'day-of-month' and value == 'L':
+            values.append(None)
+            continue
+        try:
+            last_day_of_week = LAST_DAY_OF_WEEK_PATTERN.match(value) if name == 'day-of-week' else None
+            if last_day_of_week and not last_day_of_week.group(1):
+                values.append({high})
+            elif last_day_of_week:
+                day_of_week = parse_value(last_day_of_week.group(1), names)
+                if not low <= day_of_week <= high:
+                    raise ValueError(f"Value '{value}' is out of {low}-{high}")
+                values.append({-day_of_week})
+            else:
+                values.append(parse_cron_field(value, low, high, names))
+        except (KeyError, ValueError) as error:
+            raise ValueError(f"Wrong {name} '{value}' of '{expression}': {error}")
+    return tuple(values)
+
+
+def is_cron_day(day: datetime, days_of_month: Optional[Set[int]], months: Set[int], days_of_week: Set[int],
+                years: Set[int]) -> bool:
+    if day.year not in years or day.month not in months:
+        return False
+    last_day = calendar.monthrange(day.year, day.month)[1]
+    if days_of_month is None:
+        return day.day == last_day
+    day_of_week = (day.weekday() + 1) % 7 + 1
+    return day.day in days_of_month and (
+        day_of_week in days_of_week or -day_of_week in days_of_week and day.day > last_day - 7
+    )
+
+
+def get_next_cron_time(expression: str, after: datetime) -> Optional[datetime]:
+    minutes, hours, days_of_month, months, days_of_week, years = parse_cron(expression)
+    start = (after + timedelta(minutes=1)).replace(second=0, microsecond=0)
+    day = start.replace(hour=0, minute=0)
+    for _ in range(MAX_CRON_SEARCH_DAYS):
+        if is_cron_day(day, days_of_month, months, days_of_week, years):
+            for hour in sorted(hours):
+                for minute in sorted(minutes):
+                    candidate = day.replace(hour=hour, minute=minute)
+                    if candidate >= start:
+                        return candidate
+        day += timedelta(days=1)
+    return None
+
+
+def get_next_run_at(expression: str, now: datetime, previous: datetime = None) -> Optional[datetime]:
+    """
+    Time of the next run by the schedule expression of EventBridge Scheduler in UTC:
+     at(2022-11-20T13:00:00)   - the time, None after the run ('previous')
+     rate(5 minutes)           - now for the first run, then the next time by the rate after 'now',
+                                 missed runs are skipped
+     cron(15 10 ? * MON-FRI *) - the next matching minute after 'now'
+    :raise ValueError: if the expression is wrong or not supported
+    """
+    now = now.astimezone(UTC)
+    if expression.startswith('at('):
+        run_at = datetime.strptime(expression, 'at(%Y-%m-%dT%H:%M:%S)').replace(tzinfo=UTC)
+        return run_at if previous is None else None
+
+    if expression.startswith('rate('):
+        match = RATE_PATTERN.match(expression)
+        if not match or int(match.group(1)) <= 0:
+            raise ValueError(f"Wrong rate expression '{expression}'")
+        if previous is None:
+            return now
+        unit = match.group(2)
+        interval = timedelta(**{RATE_UNITS.get(unit, unit): int(match.group(1))})
+        missed = max(0, (now - previous) // interval)
+        return previous + interval * (missed + 1)
+
+    if expression.startswith('cron('):
+        return get_next_cron_time(expression, now)
+
+    raise ValueError(f"Unknown schedule expression '{expression}', expected at(), rate() or cron()")
@@ -0,0 +1,158 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.models import ScheduledJob
+from .awscli import get_scheduler_client, get_sqs_client
+from .schedule_expressions import get_next_run_at
+
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerBackend:
+    """
+    Backend of 'schedule_command' (see 'SCHEDULER_BACKEND'): its schedules put the input of the command
+    to the queue of async tasks by the schedule expression.
+    """
+    def is_configured(self) -> bool:
+        return True
+
+    def create_schedule(self, name: str, schedule_expression: str, command_input: str):
+        """
+        Create the schedule or replace the schedule with the same name.
+        """
+        raise NotImplementedError
+
+    def delete_schedule(self, name: str):
+        """
+        Delete the schedule, nothing happens if it doesn't exist (one-time schedules are deleted after the run).
+        """
+        raise NotImplementedError
+
+
+class EventBridgeScheduler(SchedulerBackend):
+    """
+    AWS EventBridge Scheduler, it sends the input to 'SQS_QUEUE_ARN'.
+    """
+    def is_configured(self) -> bool:
+        if not settings.SQS_QUEUE_ARN:
+            logger.warning("SQS_QUEUE_ARN is not configured. Scheduling task has been skipped.")
+            return False
+        if not settings.SCHEDULER_RUN_TASK_ROLE_ARN:
+            logger.warning("SCHEDULER_RUN_TASK_ROLE_ARN is not configured. Scheduling task has been skipped.")
+            return False
+        return True
+
+    def create_schedule(self, name: str, schedule_expression: str, command_input: str):
+        client = get_scheduler_client()
+        params = dict(
+            Name=name,
+            ActionAfterCompletion="DELETE",
+            FlexibleTimeWindow={'Mode': 'OFF'},
+            ScheduleExpression=schedule_expression,
+            ScheduleExpressionTimezone='UTC',
+            Target={
+                'Arn': settings.SQS_QUEUE_ARN,
+                'Input': command_input,
+                'RoleArn': settings.SCHEDULER_RUN_TASK_ROLE_ARN,
+            },
+        )
+        try:
+            client.create_schedule(**params)
+        except client.exceptions.ConflictException:
+            client.update_schedule(**params)
+
+    def delete_schedule(self, name: str):
+        client = get_scheduler_client()
+        try:
+            client.delete_schedule(Name=name)
+        except client.exceptions.ResourceNotFoundException:
+            pass
+
+
+class MemoryScheduler(SchedulerBackend):
+    """
+    Keeps schedules in the memory of the process, for tests.
+    """
+    def __init__(self):
+        self.schedules: Dict[str, Dict[str, str]] = {}
+
+    def create_schedule(self, name: str, schedule_expression: str, command_input: str):
+        self.schedules[name] = {'schedule_expression': schedule_expression, 'input': command_input}
+
+    def delete_schedule(self, name: str):
+        self.schedules.pop(name, None)
+
+
+class DatabaseScheduler(SchedulerBackend):
+    """
+    Keeps schedules in the 'ScheduledJob' table, for dev and self-hosted deployments without EventBridge.
+    Due jobs are run by 'manage.py run_scheduler' workers: a job is leased by one worker with
+    SELECT ... FOR UPDATE SKIP LOCKED, a worker which has died holds it until the lease expires.
+    """
+    def create_schedule(self, name: str, schedule_expression: str, command_input: str):
+        next_run_at = get_next_run_at(schedule_expression, timezone.now())
+        if next_run_at is None:
+            raise ValueError(f"Schedule expression '{schedule_expression}' has no runs in the future")
+        ScheduledJob.objects.update_or_create(name=name, defaults={
+            'schedule_expression': schedule_expression, 'input': command_input, 'next_run_at': next_run_at,
+            'leased_until': None, 'leased_by': '',
+        })
+
+    def delete_schedule(self, name: str):
+        ScheduledJob.objects.filter(name=name).delete()
+
+    @staticmethod
+    def lease_due_jobs(worker: str, limit: int, lease_seconds: int) -> List[ScheduledJob]:
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                ScheduledJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(next_run_at__lte=now)
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now))
+                .order_by('next_run_at')[:limit]
+            )
+            for job in jobs:
+                job.leased_until, job.leased_by = now + timedelta(seconds=lease_seconds), worker
+            ScheduledJob.objects.bulk_update(jobs, ['leased_until', 'leased_by'])
+        return jobs
+
+    @staticmethod
+    def run_job(job: ScheduledJob, worker: str, to_queue: bool = False) -> dict:
+        """
+        Process the input of the job as a message of the queue in this process, or send it to the queue.
+        One-time jobs are deleted after the run, others get the next time. Nothing is saved if the lease
+        has expired and the job was taken by another worker.
+        :return: dict. For example, {"ok": True, "duration_ms": 12.5, "lag_ms": 150.0}
+        """
+        # the worker module imports the WSGI application
+        from .sqs_consumer import handle_message
+
+        started_at = timezone.now()
+        lag_ms = round((started_at - job.next_run_at).total_seconds() * 1000, 3)
+        if to_queue:
+            started = time.perf_counter()
+            get_sqs_client().send_message(QueueUrl=settings.SQS_QUEUE_URL, MessageBody=job.input)
+            result = {'ok': True, 'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+        else:
+            result = handle_message({'MessageId': f'job-{job.name}', 'Body': job.input})
+
+        leased = ScheduledJob.objects.filter(pk=job.pk, leased_by=worker)
+        next_run_at = get_next_run_at(job.schedule_expression, timezone.now(), previous=job.next_run_at)
+        if next_run_at is None:
+            leased.delete()
+        else:
+            leased.update(
+                next_run_at=next_run_at, leased_until=None, leased_by='', runs=job.runs + 1,
+                failures=job.failures + (0 if result['ok'] else 1), last_run_at=started_at,
+                last_duration_ms=result['duration_ms'], last_ok=result['ok'], updated=timezone.now(),
+            )
+        return {**result, 'lag_ms': lag_ms}
@@ -98,6 +98,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     'apps.core.middleware.request_id_middleware',
+    'apps.core.middleware.query_budget_middleware',
     'apps.core.middleware.error_logging_middleware',
 ]
 
@@ -114,11 +115,64 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'apps.core.views.custom_exception_handler'
 }
 
+# CACHE_BACKEND: locmem (default), redis or memcached
+# CACHE_LOCATION: comma separated servers, e.g. 'redis://redis:6379/0' or 'memcached:11211'
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem').lower()
+CACHE_LOCATION = to_list(os.getenv('CACHE_LOCATION'))
+CACHE_MAX_CONNECTIONS = int(os.getenv('CACHE_MAX_CONNECTIONS', 50))
+CACHE_TIMEOUT = int(os.getenv('CACHE_TIMEOUT', 300))
+
+if CACHE_BACKEND != 'locmem' and not CACHE_LOCATION:
+    logger.error(f"'CACHE_LOCATION' is not defined for the '{CACHE_BACKEND}' cache. Local memory cache will be used")
+    CACHE_BACKEND = 'locmem'
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "TIMEOUT": CACHE_TIMEOUT,
+        # keys of different environments and releases never clash in a shared cache
+        "KEY_PREFIX": f'{ENV_NAME}.{PROJECT_VERSION}'.lower(),
     }
 }
+if CACHE_BACKEND == 'redis':
+    CACHES['default'].update({
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_LOCATION,
+        "OPTIONS": {
+            "max_connections": CACHE_MAX_CONNECTIONS,
+        },
+    })
+elif CACHE_BACKEND == 'memcached':
+    CACHES['default'].update({
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": CACHE_LOCATION,
+        "OPTIONS": {
+            "use_pooling": True,
+            "max_pool_size": CACHE_MAX_CONNECTIONS,
+            "no_delay": True,
+        },
+    })
+elif CACHE_BACKEND != 'locmem':
+    raise ValueError(f"Unsupported CACHE_BACKEND '{CACHE_BACKEND}'")
+
+# limits of 'apps.core.mixins.CheckIPSpam' by 'spam_key': (max requests, window in seconds)
+IP_SPAM_LIMITS = {
+    'comment': (int(os.getenv('IP_SPAM_COMMENT_LIMIT', 1)), int(os.getenv('IP_SPAM_COMMENT_WINDOW', 30))),
+    'help': (int(os.getenv('IP_SPAM_HELP_LIMIT', 1)), int(os.getenv('IP_SPAM_HELP_WINDOW', 30))),
+    'rightholder': (int(os.getenv('IP_SPAM_RIGHTHOLDER_LIMIT', 1)), int(os.getenv('IP_SPAM_RIGHTHOLDER_WINDOW', 30))),
+}
+
+# public read endpoints are invalidated by model versions, the timeout only bounds the memory usage
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 60))
+
+# 'apps.core.middleware.query_budget_middleware': requests over the query budget of their view, repeated SQL
+# (N+1) and a sample of requests are logged with their queries
+QUERY_BUDGET_ENABLED = to_bool(os.getenv('QUERY_BUDGET_ENABLED', 'true'))
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 30))
+QUERY_BUDGETS = {}  # budgets by URL name, for example, {'anime:get_anime': 10}, they override 'view.query_budget'
+QUERY_DUPLICATES_LIMIT = int(os.getenv('QUERY_DUPLICATES_LIMIT', 5))  # executions of the same SQL to be an N+1
+QUERY_SAMPLE_RATE = float(os.getenv('QUERY_SAMPLE_RATE', 0))  # share of requests logged with all their queries
+SERVER_TIMING_ENABLED = to_bool(os.getenv('SERVER_TIMING_ENABLED', 'true'))
 
 ROOT_URLCONF = 'anime_on.urls'
 
@@ -263,17 +317,29 @@ SIMPLE_JWT = {
 # INFO logs required to capture log events and metric
 # can be increased to ERROR on dev environments to save us from the global warming
 LOGGER_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# records are written by a thread of the process, not by the thread of the request
+LOG_ASYNC = to_bool(os.getenv('LOG_ASYNC', 'true'))
+# shares of records passed by 'message_id', for example, 'error_logging_middleware:0.1,query_budget_middleware:0.5'
+LOG_SAMPLE_RATES = {
+    message_id: float(rate) for message_id, rate in (item.split(':') for item in to_list(os.getenv('LOG_SAMPLE_RATES')))
+}
+# request and response bodies in logs of 'error_logging_middleware' are cut to the size
+LOG_BODY_MAX_SIZE = int(os.getenv('LOG_BODY_MAX_SIZE', 2048))
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'json': {"()": 'anime_on.logging.FormatterJSON'},
+        'json': {"()": 'anime_on.logging.FormatterJSON', 'fast_json': True},
+    },
+    'filters': {
+        'sampling': {"()": 'anime_on.logging.SamplingFilter', 'rates': LOG_SAMPLE_RATES},
     },
     'handlers': {
         'console': {
             'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
+            'class': 'anime_on.logging.QueueHandler' if LOG_ASYNC else 'logging.StreamHandler',
             'formatter': 'json',
+            'filters': ['sampling'],
         },
     },
     'loggers': {
@@ -318,12 +384,43 @@ DEFAULT_EXCEPTION_REPORTER_FILTER = 'apps.core.debug.JSONSafeExceptionReporterFi
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD')
 
-SQS_QUEUE_URL = os.getenv('SQS_QUEUE_URL')
+# transport of the queue of async tasks: 'sqs' (AWS) or 'sqlite' (a local file for dev and self-hosted deployments)
+SQS_TRANSPORT = os.getenv('SQS_TRANSPORT', 'sqs')
+SQS_SQLITE_PATH = os.getenv('SQS_SQLITE_PATH', str(BASE_DIR / 'queue.sqlite3'))
+SQS_QUEUE_URL = os.getenv('SQS_QUEUE_URL') or ('local://tasks' if SQS_TRANSPORT == 'sqlite' else None)
 SQS_QUEUE_ARN = os.getenv('SQS_QUEUE_ARN')
-if not SQS_QUEUE_ARN:
-    logger.error("'SQS_QUEUE_ARN' is not defined. Async tasks schedules will be ignored")
+# 'anime_on.sqs_consumer': workers process messages in threads or processes ('thread' or 'process')
+SQS_CONSUMER_WORKERS = int(os.getenv('SQS_CONSUMER_WORKERS', os.cpu_count() or 1))
+SQS_CONSUMER_POOL = os.getenv('SQS_CONSUMER_POOL', 'thread')
+SQS_VISIBILITY_TIMEOUT = int(os.getenv('SQS_VISIBILITY_TIMEOUT', 30))  # seconds, it is extended for long messages
+# EventBridge messages are dispatched to their views with this middleware only,
+# 'false' to process them as requests to the whole WSGI application
+SQS_DIRECT_DISPATCH = to_bool(os.getenv('SQS_DIRECT_DISPATCH', 'true'))
+SQS_DISPATCH_MIDDLEWARE = [
+    'apps.core.middleware.request_id_middleware',
+    'apps.core.middleware.query_budget_middleware',
+    'apps.core.middleware.error_logging_middleware',
+]
+# messages of one receive with the same command or 'detail-type' are processed together by these handlers
+# (see 'anime_on.sqs_consumer.handle_batch'), others one by one
+SQS_BATCH_ENABLED = to_bool(os.getenv('SQS_BATCH_ENABLED', 'true'))
+SQS_BATCH_HANDLERS = {
+    'rebuild_anime_counters': 'apps.anime.batch_handlers.rebuild_anime_counters',
+    'rebuild_published_voiceovers': 'apps.anime.batch_handlers.rebuild_published_voiceovers',
+}
 SCHEDULER_RUN_TASK_ROLE_ARN = os.getenv('SCHEDULER_RUN_TASK_ROLE_ARN')
-if not SCHEDULER_RUN_TASK_ROLE_ARN:
-    logger.error("'SCHEDULER_RUN_TASK_ROLE_ARN' is not defined. Async tasks schedules will be ignored")
+# backend of 'anime_on.awscli.schedule_command': EventBridge Scheduler when it is configured,
+# otherwise 'DatabaseScheduler' whose jobs are run by 'manage.py run_scheduler'.
+# 'anime_on.schedulers.MemoryScheduler' keeps schedules in memory for tests
+SCHEDULER_BACKEND = os.getenv('SCHEDULER_BACKEND')
+if not SCHEDULER_BACKEND:
+    if SQS_QUEUE_ARN and SCHEDULER_RUN_TASK_ROLE_ARN:
+        SCHEDULER_BACKEND = 'anime_on.schedulers.EventBridgeScheduler'
+    else:
+        SCHEDULER_BACKEND = 'anime_on.schedulers.DatabaseScheduler'
+        logger.warning("'SQS_QUEUE_ARN' or 'SCHEDULER_RUN_TASK_ROLE_ARN' is not defined. "
+                       "Async tasks are scheduled in the database, run them with 'manage.py run_scheduler'")
+# seconds, a pending one-time task which hasn't run this long after its time is scheduled again by coalescing calls
+SCHEDULER_TASK_STALE_AFTER = int(os.getenv('SCHEDULER_TASK_STALE_AFTER', 3600))
 
 COUNT_TOP_ANIME = os.getenv("DEFAULT_FROM_EMAIL", 100)
@@ -1,16 +1,27 @@
 import io
 import os
+import signal
 import sys
 import logging
 import json
-from time import sleep
-
-import boto3
+import threading
+import time
+from importlib import import_module
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
 
 from .wsgi import application
+from .awscli import complete_scheduled_task, get_sqs_client
 from urllib.parse import urlencode
 from wsgiref.headers import Headers
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
 from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connections, transaction
+from django.http import HttpRequest, QueryDict, parse_cookie
+from django.utils.module_loading import import_string
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anime_on.settings')
 
@@ -34,8 +45,12 @@ def process_message(msg):
         kwargs = msg_body.get("kwargs") or {}
 
         command = msg_body["command"]
+        # a new call of 'schedule_command' for the same task schedules it again
+        complete_scheduled_task(msg_body)
 
         return call_command(command, *args, **kwargs)
+    elif settings.SQS_DIRECT_DISPATCH:
+        return dispatch_request(msg_body)
     else:
         return process_request(msg_body)
 
@@ -52,20 +67,29 @@ def setup_environ_items(environ, headers):
     return environ
 
 
-def process_request(message):
-    details = message["detail"]
-
+def get_event_headers(details: dict) -> Headers:
     headers = details.get("headers") or {}
     headers["content-type"] = headers.get("content-type", "application/json")
     allowed_hosts = os.getenv("ALLOWED_HOSTS", "*").split(",")
     if allowed_hosts and "*" not in allowed_hosts:
         headers["Host"] = allowed_hosts[0]
-    headers = Headers(list(headers.items()))
+    return Headers(list(headers.items()))
+
 
+def get_event_body(details: dict) -> bytes:
     body = details.get("body", "")
     if isinstance(body, dict):
         body = json.dumps(body)
-    body = body.encode()
+    return body.encode()
+
+
+def process_request(message):
+    """
+    Process the message as a request to the whole WSGI application.
+    """
+    details = message["detail"]
+    headers = get_event_headers(details)
+    body = get_event_body(details)
 
     environ = {
         "CONTENT_LENGTH": str(len(body)),
@@ -92,46 +116,363 @@ def process_request(message):
     return result
 
 
-def main():
-    # Create SQS client
-    sqs = boto3.client('sqs')
-    queue_url = os.environ.get("SQS_QUEUE_URL")
+class EventRequest(HttpRequest):
+    """
+    Request of an EventBridge message for 'EventHandler', it is made of the message as is, without a WSGI environ.
+    There is no SessionMiddleware, views which use the session get an empty one which is not saved.
+    """
+    def __init__(self, method: str, path: str, headers: Headers, body: bytes, query_string: str = ""):
+        self.method = method.upper()
+        self.path = self.path_info = path
+        self.META = {
+            "REQUEST_METHOD": self.method,
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": query_string,
+            "CONTENT_LENGTH": str(len(body)),
+            "CONTENT_TYPE": headers.get("Content-Type", ""),
+            "REMOTE_ADDR": "",
+            "SERVER_NAME": headers.get("Host", "127.0.0.1"),
+            "SERVER_PORT": headers.get("X-Forwarded-Port", "443"),
+            "wsgi.url_scheme": headers.get("X-Forwarded-Proto", "https"),
+        }
+        for key, value in headers.items():
+            key = "HTTP_" + key.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                self.META[key] = value
+        self.GET = QueryDict(query_string)
+        self.COOKIES = parse_cookie(self.META.get("HTTP_COOKIE", ""))
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        self.resolver_match = None
+        self._set_content_type_params(self.META)
+        self._stream = io.BytesIO(body)
+        self._read_started = False
 
-    empty_tries = 0
-    # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sqs/client/receive_message.html#
-    while True:
-        response = sqs.receive_message(
-            QueueUrl=queue_url,
+    def _get_scheme(self):
+        return self.META["wsgi.url_scheme"]
+
+    def _get_post(self):
+        if not hasattr(self, "_post"):
+            self._load_post_and_files()
+        return self._post
+
+    def _set_post(self, post):
+        self._post = post
+
+    @property
+    def FILES(self):
+        if not hasattr(self, "_files"):
+            self._load_post_and_files()
+        return self._files
+
+    POST = property(_get_post, _set_post)
+
+
+class EventHandler(BaseHandler):
+    """
+    Resolves the path of 'EventRequest' to a view and calls it through the middleware of 'SQS_DISPATCH_MIDDLEWARE'
+    only: event-driven requests don't need the browser-facing middleware (sessions, CSRF, CORS, static files).
+    """
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for middleware_path in reversed(settings.SQS_DISPATCH_MIDDLEWARE):
+            middleware = import_string(middleware_path)(handler)
+            if hasattr(middleware, "process_view"):
+                self._view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, "process_template_response"):
+                self._template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, "process_exception"):
+                self._exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self._middleware_chain = handler
+
+
+event_handler = None
+
+
+def get_event_handler() -> EventHandler:
+    global event_handler
+    if event_handler is None:
+        event_handler = EventHandler()
+        event_handler.load_middleware()
+    return event_handler
+
+
+def dispatch_request(message):
+    """
+    Process the message as a request to its view with 'EventHandler', without the WSGI environ and
+    the whole middleware stack of 'process_request'.
+    """
+    details = message["detail"]
+    request = EventRequest(
+        details.get("httpMethod", "POST"),
+        message["detail-type"],
+        get_event_headers(details),
+        get_event_body(details),
+        urlencode(details.get("queryStringParameters") or {}),
+    )
+    handler = get_event_handler()
+    # as in WSGIHandler and HttpResponse.close(): stale connections are closed, queries of DEBUG are reset,
+    # receivers of the end of the request run even if the handler fails
+    request_started.send(sender=handler.__class__, environ=request.META)
+    try:
+        return handler.get_response(request)
+    finally:
+        request_finished.send(sender=handler.__class__)
+
+
+def handle_message(message: dict) -> dict:
+    """
+    Process the message in a worker, exceptions and unexpected statuses are logged.
+    :return: dict. Picklable result for process pools, for example, {"ok": True, "duration_ms": 12.5}
+    """
+    started = time.perf_counter()
+    ok = True
+    try:
+        result = process_message(message)
+    except Exception as e:
+        ok = False
+        logger.exception(e, extra={"sqs_message": message})
+    else:
+        if result and getattr(result, 'status_code', 200) > 201:
+            ok = False
+            logger.error(
+                f"Unexpected status '{result.status_code}': {result.content}\n"
+                f"while processing msg from EventBus: {message}"
+            )
+    finally:
+        # workers live long, a broken or expired connection shouldn't be reused by the next message
+        close_old_connections()
+    return {'ok': ok, 'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+def get_group_key(message: dict) -> Optional[str]:
+    """
+    :return: str. The command or 'detail-type' of the message, None if the body is broken
+    """
+    try:
+        body = json.loads(message['Body'])
+        return body.get('command') or body.get('detail-type')
+    except (ValueError, AttributeError):
+        return None
+
+
+def handle_batch(handler_path: str, messages: List[dict]) -> List[dict]:
+    """
+    Process messages of one group with the batch handler in one transaction. The handler gets the list
+    of message bodies, for example, [{"command": "rebuild_anime_counters", "kwargs": {"anime": [1]}}, ...].
+    If it fails, the transaction is rolled back and the messages are processed one by one,
+    so a broken message doesn't fail the others.
+    :return: list. Results of 'handle_message' for every message
+    """
+    started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            bodies = [json.loads(message['Body']) for message in messages]
+            for body in bodies:
+                complete_scheduled_task(body)
+            import_string(handler_path)(bodies)
+    except Exception as e:
+        logger.exception(e, extra={'message_id': 'sqs_batch_failed', 'batch_handler': handler_path,
+                                   'sqs_message_ids': [message.get('MessageId') for message in messages]})
+        return [handle_message(message) for message in messages]
+    finally:
+        close_old_connections()
+    duration_ms = round((time.perf_counter() - started) * 1000 / len(messages), 3)
+    return [{'ok': True, 'duration_ms': duration_ms} for _ in messages]
+
+
+class InFlightMessage:
+    def __init__(self, message: dict, visible_until: float):
+        self.message = message
+        self.received = time.monotonic()
+        self.visible_until = visible_until
+
+
+class SQSConsumer:
+    """
+    Receives messages while there are free workers and processes them in a thread or process pool.
+    Messages of one receive with the same command or 'detail-type' in 'batch_handlers' are processed together
+    by one worker with 'handle_batch', others one by one with 'handler'.
+    Processed messages (failed ones too, they are logged) are deleted by batches of 10, a smaller batch
+    is deleted when its oldest message would need the visibility extended.
+    Visibility of messages in progress is extended before it expires, so long commands are not received
+    twice. SIGTERM and SIGINT stop receiving, messages in progress are finished and deleted.
+    """
+    max_batch_size = 10  # of SQS batch calls
+
+    def __init__(self, client, queue_url: str, workers: int = None, pool: str = 'thread',
+                 visibility_timeout: int = 30, wait_time: int = 20, handler: Callable[[dict], dict] = handle_message,
+                 batch_handlers: Dict[str, str] = None):
+        self.client = client
+        self.queue_url = queue_url
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = pool
+        self.visibility_timeout = visibility_timeout
+        self.wait_time = wait_time
+        self.handler = handler
+        self.batch_handlers = batch_handlers or {}  # import paths of handlers by the command or 'detail-type'
+        self.in_flight: Dict[Future, List[InFlightMessage]] = {}  # a message or a group of them by the task
+        self.processed: List[InFlightMessage] = []  # messages waiting for the delete
+        self.stopping = threading.Event()
+        self.metrics = {'received': 0, 'processed': 0, 'failed': 0, 'deleted': 0, 'extended': 0, 'batches': 0}
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def create_executor(self) -> Executor:
+        if self.pool == 'process':
+            # forked workers must not share the connections of this process
+            connections.close_all()
+            return ProcessPoolExecutor(self.workers)
+        return ThreadPoolExecutor(self.workers, thread_name_prefix='sqs-worker')
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        with self.create_executor() as executor:
+            while not self.stopping.is_set():
+                received = self.receive(executor)
+                # without free workers or new messages wait for results, otherwise receive more
+                wait_results = not received or len(self.in_flight) >= self.workers
+                self.collect(timeout=self.get_heartbeat_interval() if wait_results else 0)
+                self.extend_visibility()
+                self.delete_processed()
+            # graceful shutdown: nothing new is received, messages in progress are finished
+            while self.in_flight:
+                self.collect(timeout=self.get_heartbeat_interval())
+                self.extend_visibility()
+                self.delete_processed()
+        self.delete_processed(force=True)
+        logger.info('SQS consumer has been stopped', extra={'message_id': 'sqs_consumer_stopped', **self.metrics})
+
+    def get_heartbeat_interval(self) -> float:
+        return max(self.visibility_timeout / 3, 0.1)
+
+    def receive(self, executor: Executor) -> int:
+        free = self.workers - len(self.in_flight)
+        if free <= 0:
+            return 0
+        # with messages in progress the poll is short, they need heartbeats and deletes
+        wait_time = min(self.wait_time, int(self.get_heartbeat_interval())) if self.in_flight else self.wait_time
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
             MessageAttributeNames=['All'],
-            MaxNumberOfMessages=10,
-            VisibilityTimeout=10,
-            WaitTimeSeconds=20
+            MaxNumberOfMessages=min(free, self.max_batch_size),
+            VisibilityTimeout=self.visibility_timeout,
+            WaitTimeSeconds=wait_time,
         )
-        messages = response.get("Messages")
-        if messages:
-            empty_tries = 0
-            for message in messages:
-                receipt_handle = message['ReceiptHandle']
-                try:
-                    result = process_message(message)
-                except Exception as e:
-                    logger.exception(e, extra={"sqs_message": message})
-                else:
-                    if result and result.status_code > 201:
-                        logger.error(
-                            f"Unexpected status '{result.status_code}': {result.content}\n"
-                            f"while processing msg from EventBus: {message}"
-                        )
-
-                # Delete received message from queue
-                sqs.delete_message(
-                    QueueUrl=queue_url,
-                    ReceiptHandle=receipt_handle
-                )
-                logger.info(f'Received and deleted message: {message}')
-        else:
-            empty_tries += 1
-            sleep(min(empty_tries, 10))
+        visible_until = time.monotonic() + self.visibility_timeout
+        messages = response.get('Messages') or []
+        for key, group in self.group_messages(messages):
+            if key is None:
+                future = executor.submit(self.handler, group[0])
+            else:
+                future = executor.submit(handle_batch, self.batch_handlers[key], group)
+                self.metrics['batches'] += 1
+            self.in_flight[future] = [InFlightMessage(message, visible_until) for message in group]
+        self.metrics['received'] += len(messages)
+        return len(messages)
+
+    def group_messages(self, messages: List[dict]) -> List[tuple]:
+        """
+        :return: list. Pairs of the key of the batch handler and the messages, or of None and one message
+        """
+        groups: Dict[str, List[dict]] = {}
+        singles = []
+        for message in messages:
+            key = get_group_key(message) if self.batch_handlers else None
+            if key in self.batch_handlers:
+                groups.setdefault(key, []).append(message)
+            else:
+                singles.append(message)
+        for key, group in list(groups.items()):
+            if len(group) == 1:  # nothing to batch
+                singles.extend(groups.pop(key))
+        return [(key, group) for key, group in groups.items()] + [(None, [message]) for message in singles]
+
+    def collect(self, timeout: float):
+        if not self.in_flight:
+            return
+        done, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            items = self.in_flight.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:  # the worker process has died
+                logger.exception(e, extra={"sqs_message": items[0].message})
+                results = [{'ok': False} for _ in items]
+            if not isinstance(results, list):  # of 'handler'
+                results = [results]
+            for item, result in zip(items, results):
+                self.metrics['processed' if result.get('ok') else 'failed'] += 1
+                self.processed.append(item)
+                self.on_processed(item, result)
+
+    def on_processed(self, item: InFlightMessage, result: dict):
+        logger.info('SQS message has been processed', extra={
+            'message_id': 'sqs_message_processed',
+            'sqs_message_id': item.message.get('MessageId'),
+            'ok': result.get('ok'),
+            'duration_ms': result.get('duration_ms'),
+            'total_duration_ms': round((time.monotonic() - item.received) * 1000, 3),
+        })
+
+    def is_expiring(self, item: InFlightMessage, now: float) -> bool:
+        return item.visible_until - now < self.visibility_timeout - self.get_heartbeat_interval()
+
+    def extend_visibility(self):
+        now = time.monotonic()
+        expiring = [item for items in self.in_flight.values() for item in items if self.is_expiring(item, now)]
+        for start in range(0, len(expiring), self.max_batch_size):
+            batch = expiring[start:start + self.max_batch_size]
+            self.client.change_message_visibility_batch(QueueUrl=self.queue_url, Entries=[
+                {'Id': str(index), 'ReceiptHandle': item.message['ReceiptHandle'],
+                 'VisibilityTimeout': self.visibility_timeout}
+                for index, item in enumerate(batch)
+            ])
+            for item in batch:
+                item.visible_until = now + self.visibility_timeout
+            self.metrics['extended'] += len(batch)
+
+    def delete_processed(self, force: bool = False):
+        """
+        Delete full batches, and the rest when there is nothing in progress to fill the batch, with 'force'
+        or when the oldest processed message would need the visibility extended (it isn't extended after
+        the processing, so it would be received again while long messages are in progress).
+        """
+        now = time.monotonic()
+        while self.processed and (len(self.processed) >= self.max_batch_size or force or not self.in_flight
+                                  or self.is_expiring(self.processed[0], now)):
+            batch, self.processed = self.processed[:self.max_batch_size], self.processed[self.max_batch_size:]
+            response = self.client.delete_message_batch(QueueUrl=self.queue_url, Entries=[
+                {'Id': str(index), 'ReceiptHandle': item.message['ReceiptHandle']}
+                for index, item in enumerate(batch)
+            ])
+            self.metrics['deleted'] += len(response.get('Successful') or [])
+            for failed in response.get('Failed') or []:
+                logger.error('SQS message has not been deleted', extra={
+                    'message_id': 'sqs_message_not_deleted', 'sqs_message': batch[int(failed['Id'])].message,
+                    'error': failed,
+                })
+
+
+def main():
+    # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/sqs/client/receive_message.html#
+    consumer = SQSConsumer(
+        get_sqs_client(),
+        settings.SQS_QUEUE_URL,
+        workers=settings.SQS_CONSUMER_WORKERS,
+        pool=settings.SQS_CONSUMER_POOL,
+        visibility_timeout=settings.SQS_VISIBILITY_TIMEOUT,
+        batch_handlers=settings.SQS_BATCH_HANDLERS if settings.SQS_BATCH_ENABLED else None,
+    )
+    consumer.run()
 
 
 if __name__ == "__main__":
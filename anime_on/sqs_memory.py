@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+
+class InMemoryMessage:
+    def __init__(self, body: str, attributes: dict = None):
+        self.id = uuid4().hex
+        self.body = body
+        self.attributes = attributes or {}
+        self.sent_at = time.time()
+        self.visible_at = 0.0
+        self.receipt_handle: Optional[str] = None
+        self.receive_count = 0
+
+
+class InMemorySQSClient:
+    """
+    The part of the boto3 SQS client used by the consumer, messages are kept in the memory of the process.
+    Received messages are hidden for 'VisibilityTimeout' seconds and are received again if they are not
+    deleted in time, as in SQS. For tests and benchmarks of the consumer without AWS.
+    """
+    def __init__(self):
+        self.queues: Dict[str, List[InMemoryMessage]] = {}
+        self.condition = threading.Condition()
+        self.calls: Dict[str, int] = {}  # numbers of calls by method name
+
+    def count_call(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def get_queue(self, queue_url: str) -> List[InMemoryMessage]:
+        return self.queues.setdefault(queue_url, [])
+
+    def send_message(self, QueueUrl: str, MessageBody: str, MessageAttributes: dict = None, **kwargs) -> dict:
+        message = InMemoryMessage(MessageBody, MessageAttributes)
+        with self.condition:
+            self.count_call('send_message')
+            self.get_queue(QueueUrl).append(message)
+            self.condition.notify_all()
+        return {'MessageId': message.id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        messages = [InMemoryMessage(entry['MessageBody'], entry.get('MessageAttributes')) for entry in Entries]
+        with self.condition:
+            self.count_call('send_message_batch')
+            self.get_queue(QueueUrl).extend(messages)
+            self.condition.notify_all()
+        return {'Successful': [{'Id': entry['Id'], 'MessageId': message.id}
+                               for entry, message in zip(Entries, messages)], 'Failed': []}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, VisibilityTimeout: int = 30,
+                        WaitTimeSeconds: int = 0, **kwargs) -> dict:
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self.condition:
+            self.count_call('receive_message')
+            while True:
+                now = time.monotonic()
+                visible = [message for message in self.get_queue(QueueUrl) if message.visible_at <= now]
+                if visible or now >= deadline:
+                    break
+                # hidden messages become visible without a notification
+                next_visible = min((message.visible_at for message in self.get_queue(QueueUrl)), default=deadline)
+                self.condition.wait(max(0.0, min(deadline, next_visible) - now))
+            result = []
+            for message in visible[:MaxNumberOfMessages]:
+                message.visible_at = now + VisibilityTimeout
+                message.receipt_handle = uuid4().hex
+                message.receive_count += 1
+                result.append({
+                    'MessageId': message.id, 'ReceiptHandle': message.receipt_handle, 'Body': message.body,
+                    'MessageAttributes': message.attributes,
+                    'Attributes': {'ApproximateReceiveCount': str(message.receive_count),
+                                   'SentTimestamp': str(int(message.sent_at * 1000))},
+                })
+        return {'Messages': result} if result else {}
+
+    def find(self, queue_url: str, receipt_handle: str) -> Optional[InMemoryMessage]:
+        for message in self.get_queue(queue_url):
+            if message.receipt_handle == receipt_handle:
+                return message
+        return None
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs) -> dict:
+        with self.condition:
+            self.count_call('delete_message')
+            message = self.find(QueueUrl, ReceiptHandle)
+            if message:
+                self.get_queue(QueueUrl).remove(message)
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        if len(Entries) > 10:
+            raise ValueError('Too many entries in the batch, the max is 10')
+        successful, failed = [], []
+        with self.condition:
+            self.count_call('delete_message_batch')
+            for entry in Entries:
+                message = self.find(QueueUrl, entry['ReceiptHandle'])
+                if message:
+                    self.get_queue(QueueUrl).remove(message)
+                    successful.append({'Id': entry['Id']})
+                else:
+                    failed.append({'Id': entry['Id'], 'Code': 'ReceiptHandleIsInvalid', 'SenderFault': True})
+        return {'Successful': successful, 'Failed': failed}
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        if len(Entries) > 10:
+            raise ValueError('Too many entries in the batch, the max is 10')
+        successful, failed = [], []
+        with self.condition:
+            self.count_call('change_message_visibility_batch')
+            now = time.monotonic()
+            for entry in Entries:
+                message = self.find(QueueUrl, entry['ReceiptHandle'])
+                if message:
+                    message.visible_at = now + entry['VisibilityTimeout']
+                    successful.append({'Id': entry['Id']})
+                else:
+                    failed.append({'Id': entry['Id'], 'Code': 'ReceiptHandleIsInvalid', 'SenderFault': True})
+            self.condition.notify_all()
+        return {'Successful': successful, 'Failed': failed}
+
+    def count_messages(self, queue_url: str) -> int:
+        with self.condition:
+            return len(self.get_queue(queue_url))
+
+    def purge_queue(self, QueueUrl: str, **kwargs) -> dict:
+        with self.condition:
+            self.get_queue(QueueUrl).clear()
+        return {}
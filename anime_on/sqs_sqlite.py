@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import List
+from uuid import uuid4
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL,
+    queue_url TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attributes TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    visible_at REAL NOT NULL,
+    receipt_handle TEXT,
+    receive_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS message_queue_visible ON message (queue_url, visible_at);
+CREATE INDEX IF NOT EXISTS message_receipt_handle ON message (receipt_handle);
+"""
+
+
+class SQLiteSQSClient:
+    """
+    The part of the boto3 SQS client used by the consumer, messages are kept in a SQLite file, so they can be sent
+    and consumed by different processes of a local or self-hosted deployment. Visibility timeouts work as in SQS:
+    a received message is hidden and received again if it is not deleted in time.
+    Every thread has its own connection, receives are serialized by 'BEGIN IMMEDIATE'.
+    """
+    poll_interval = 0.05  # seconds between checks of an empty queue during long polling
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.calls = {}  # numbers of calls by method name
+        self.calls_lock = threading.Lock()
+        self.get_connection().executescript(SCHEMA)
+
+    def get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # autocommit, transactions are started explicitly
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def count_call(self, method: str):
+        with self.calls_lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def insert(self, queue_url: str, entries: List[dict]) -> List[str]:
+        now = time.time()
+        rows = [(uuid4().hex, queue_url, entry['MessageBody'], json.dumps(entry.get('MessageAttributes') or {}),
+                 now, now + entry.get('DelaySeconds', 0)) for entry in entries]
+        self.get_connection().executemany(
+            'INSERT INTO message (message_id, queue_url, body, attributes, sent_at, visible_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows,
+        )
+        return [row[0] for row in rows]
+
+    def send_message(self, QueueUrl: str, MessageBody: str, MessageAttributes: dict = None,
+                     DelaySeconds: int = 0, **kwargs) -> dict:
+        self.count_call('send_message')
+        message_id, = self.insert(QueueUrl, [{
+            'MessageBody': MessageBody, 'MessageAttributes': MessageAttributes, 'DelaySeconds': DelaySeconds,
+        }])
+        return {'MessageId': message_id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        if len(Entries) > 10:
+            raise ValueError('Too many entries in the batch, the max is 10')
+        self.count_call('send_message_batch')
+        message_ids = self.insert(QueueUrl, Entries)
+        return {'Successful': [{'Id': entry['Id'], 'MessageId': message_id}
+                               for entry, message_id in zip(Entries, message_ids)], 'Failed': []}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, VisibilityTimeout: int = 30,
+                        WaitTimeSeconds: int = 0, **kwargs) -> dict:
+        self.count_call('receive_message')
+        deadline = time.monotonic() + WaitTimeSeconds
+        while True:
+            messages = self.take(QueueUrl, MaxNumberOfMessages, VisibilityTimeout)
+            if messages or time.monotonic() >= deadline:
+                break
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+        return {'Messages': messages} if messages else {}
+
+    def take(self, queue_url: str, limit: int, visibility_timeout: int) -> List[dict]:
+        connection = self.get_connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute(
+                'SELECT id, message_id, body, attributes, sent_at, receive_count FROM message '
+                'WHERE queue_url = ? AND visible_at <= ? ORDER BY id LIMIT ?', (queue_url, now, limit),
+            ).fetchall()
+            updates = [(now + visibility_timeout, uuid4().hex, row[0]) for row in rows]
+            connection.executemany(
+                'UPDATE message SET visible_at = ?, receipt_handle = ?, receive_count = receive_count + 1 '
+                'WHERE id = ?', updates,
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return [{
+            'MessageId': message_id, 'ReceiptHandle': receipt_handle, 'Body': body,
+            'MessageAttributes': json.loads(attributes),
+            'Attributes': {'ApproximateReceiveCount': str(receive_count + 1),
+                           'SentTimestamp': str(int(sent_at * 1000))},
+        } for (_, message_id, body, attributes, sent_at, receive_count), (_, receipt_handle, _) in zip(rows, updates)]
+
+    def update_batch(self, queue_url: str, entries: List[dict], sql: str, get_params) -> dict:
+        if len(entries) > 10:
+            raise ValueError('Too many entries in the batch, the max is 10')
+        successful, failed = [], []
+        connection = self.get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for entry in entries:
+                if connection.execute(sql, (*get_params(entry), queue_url, entry['ReceiptHandle'])).rowcount:
+                    successful.append({'Id': entry['Id']})
+                else:
+                    failed.append({'Id': entry['Id'], 'Code': 'ReceiptHandleIsInvalid', 'SenderFault': True})
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return {'Successful': successful, 'Failed': failed}
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs) -> dict:
+        self.count_call('delete_message')
+        self.get_connection().execute(
+            'DELETE FROM message WHERE queue_url = ? AND receipt_handle = ?', (QueueUrl, ReceiptHandle),
+        )
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        self.count_call('delete_message_batch')
+        return self.update_batch(QueueUrl, Entries, 'DELETE FROM message WHERE queue_url = ? AND receipt_handle = ?',
+                                 lambda entry: ())
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: List[dict], **kwargs) -> dict:
+        self.count_call('change_message_visibility_batch')
+        now = time.time()
+        return self.update_batch(
+            QueueUrl, Entries, 'UPDATE message SET visible_at = ? WHERE queue_url = ? AND receipt_handle = ?',
+            lambda entry: (now + entry['VisibilityTimeout'],),
+        )
+
+    def count_messages(self, queue_url: str) -> int:
+        return self.get_connection().execute(
+            'SELECT COUNT(*) FROM message WHERE queue_url = ?', (queue_url,),
+        ).fetchone()[0]
+
+    def purge_queue(self, QueueUrl: str, **kwargs) -> dict:
+        self.get_connection().execute('DELETE FROM message WHERE queue_url = ?', (QueueUrl,))
+        return {}
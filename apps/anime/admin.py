@@ -6,6 +6,8 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
 
 from rest_framework import status
 from django_admin_inline_paginator.admin import TabularInlinePaginated
@@ -18,9 +20,11 @@ from apps.anime.models import (
 )
 from apps.core.admin import OnlyAddPermissionMixin, ReadOnlyPermissionsMixin, OnlyChangePermissionMixin
 from apps.anime.choices import VoiceoverHistoryEvents
-from apps.anime.forms import AnimeAdminForm
+from apps.anime.forms import AnimeAdminForm, VoiceoverImportForm
+from apps.anime.voiceover_import import VoiceoverImporter
 from apps.core.utils import get_instance_or_ajax_redirect
 from apps.anime.admin_filters import AnimeFilter
+from apps.anime.admin_action import approve_voiceovers, decline_voiceovers
 from apps.anime.exception import ManyTOPAnimeException
 
 # Register your models here.
@@ -179,13 +183,13 @@ class AnimeAdmin(AnimeTOPMixin, admin.ModelAdmin):
     def display_season(self, obj: Anime):
         return obj.get_season_display()
 
-    @admin.display(description='Episodes')
+    @admin.display(description='Episodes', ordering='count_episodes')
     def display_count_episodes(self, obj: Anime):
-        return obj.episode_set.count()
+        return obj.count_episodes
 
     def get_queryset(self, request):
         return super().get_queryset(request).prefetch_related(
-            'genres', 'director', 'related', 'studio', 'episode_set',
+            'genres', 'director', 'related', 'studio',
         )
 
 
@@ -228,6 +232,7 @@ class VoiceoverAdmin(admin.ModelAdmin):
     search_help_text = 'Search by Anime'
     list_display = ['display_anime', 'episode', 'team', 'user', 'type', 'status']
     inlines = [VoiceoverHistoryInline]
+    actions = [approve_voiceovers, decline_voiceovers]
 
     fields = ('episode', 'team', 'type', 'url')
     autocomplete_fields = ('episode',)
@@ -299,9 +304,27 @@ class VoiceoverAdmin(admin.ModelAdmin):
             path('<str:object_id>/edit/',
                  self.admin_site.admin_view(self.edit_view),
                  name='edit_voiceover'),
+            path('import/',
+                 self.admin_site.admin_view(self.import_view),
+                 name='voiceover_import'),
         ]
         return my_urls + urls
 
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        context = {**self.admin_site.each_context(request), 'opts': self.model._meta, 'title': 'Імпорт озвучок'}
+        form = VoiceoverImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            dry_run = form.cleaned_data['dry_run']
+            result = VoiceoverImporter(user=request.user).run(form.cleaned_data['rows'], dry_run=dry_run)
+            if result.created and not dry_run:
+                self.message_user(request, f'Імпортовано озвучок: {result.created}', level=messages.SUCCESS)
+            context.update({'result': result, 'dry_run': dry_run})
+        context['form'] = form
+        return TemplateResponse(request, 'admin/anime/voiceover/import.html', context)
+
     @method_decorator(require_POST)
     @get_instance_or_ajax_redirect(error_message="Voiceover does not exist!",
                                    redirect_url='admin:anime_voiceover_changelist')
@@ -0,0 +1,38 @@
+from django.contrib import admin, messages
+from django.utils.translation import ngettext
+
+from apps.anime.choices import VoiceoverHistoryEvents
+from apps.anime.models import Voiceover
+from apps.support.admin_action import require_confirmation
+
+
+def process_voiceovers_event(modeladmin, request, queryset, event: VoiceoverHistoryEvents):
+    all_count = queryset.count()
+    # the changelist queryset can be distinct, such queryset can't be locked
+    count_voiceover = Voiceover.objects.filter(pk__in=queryset.values('pk')).process_new_history_event(
+        event=event,
+        user=request.user,
+        message=request.POST.get('userComment', ''),
+    )
+
+    message = ngettext(
+        'Статус %(count_voiceover)d озвучки з %(all_count)d змінено на "%(event)s".',
+        'Статус %(count_voiceover)d озвучок з %(all_count)d змінено на "%(event)s".',
+        count_voiceover,
+    ) % {'all_count': all_count, 'count_voiceover': count_voiceover, 'event': event.label}
+
+    modeladmin.message_user(request, message, level=messages.INFO)
+
+
+@admin.action(description='Підтвердити озвучки', permissions=['change'])
+@require_confirmation(confirmation_action_name='підтвердити озвучки', object_label='Озвучка',
+                      user_comment_label_text='Коментар')
+def approve_voiceovers(modeladmin, request, queryset):
+    process_voiceovers_event(modeladmin, request, queryset, event=VoiceoverHistoryEvents.APPROVED)
+
+
+@admin.action(description='Відхилити озвучки', permissions=['change'])
+@require_confirmation(confirmation_action_name='відхилити озвучки', object_label='Озвучка',
+                      user_comment_label_text='Коментар')
+def decline_voiceovers(modeladmin, request, queryset):
+    process_voiceovers_event(modeladmin, request, queryset, event=VoiceoverHistoryEvents.DECLINED)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AnimeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.anime'
+
+    def ready(self):
+        import apps.anime.signals  # noqa: F401
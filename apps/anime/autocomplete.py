@@ -0,0 +1,203 @@
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import DatabaseError
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.anime.models import Anime
+from apps.core.cache import get_cache_versions, CacheVersionKey, get_model_label
+
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[int, str, str, str]  # id, slug, title, other_title
+ROW_FIELDS = ('id', 'slug', 'title', 'other_title')
+
+
+class AnimePrefixIndex:
+    """
+    In-process autocomplete index: sorted arrays of normalized keys searched with bisect.
+    Keys are 'title', 'other_title' and 'slug' normalized by 'AnimeManager.normalize_slug' (Cyrillic is
+    transliterated to Latin, so both alphabets match), and their tails from every word for inner words.
+    The index is built at worker start ('gunicorn.conf.py') and refreshed when the cache version of Anime
+    is changed (see 'apps.core.signals'): only anime with a recent 'updated' are read and merged, the index
+    is rebuilt when anime have been deleted (found by the count and the sum of ids) or too many of them have
+    been changed. Changes which don't set 'updated' (QuerySet.update of titles) are not picked up until
+    the next rebuild.
+    """
+    max_key_length = 64
+    # anime saved this long before the last refresh are read again, their transactions may commit later
+    refresh_margin = timedelta(minutes=5)
+    max_refresh_rows = 1000
+    # with more keys of changed anime the arrays are merged instead of inserts into them
+    max_inserted_entries = 200
+
+    def __init__(self):
+        self.version = None
+        self.refreshed_at = None
+        # (title keys, title ids, word keys, word ids, items) is replaced at once on rebuild
+        self.data = ([], [], [], [], {})
+        self.row_keys: Dict[int, Tuple[Tuple[str, str, str], set, set]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_rows() -> Iterable[Row]:
+        return Anime.objects.order_by().values_list(*ROW_FIELDS).iterator(chunk_size=5000)
+
+    @classmethod
+    def get_keys(cls, *texts: str) -> Tuple[set, set]:
+        title_keys, word_keys = set(), set()
+        for text in texts:
+            words = [word for word in Anime.objects.normalize_slug(text).split('-') if word]
+            for index in range(len(words)):
+                key = '-'.join(words[index:])[:cls.max_key_length]
+                (word_keys if index else title_keys).add(key)
+        return title_keys, word_keys
+
+    def build(self, rows: Iterable[Row], version: Optional[int] = None):
+        title_entries, word_entries, items, row_keys = [], [], {}, {}
+        for pk, slug, title, other_title in rows:
+            items[pk] = {'id': pk, 'slug': slug, 'title': title}
+            texts = (title, other_title, slug)
+            # normalization is the slowest part, keys of unchanged anime are reused
+            cached = self.row_keys.get(pk)
+            if cached and cached[0] == texts:
+                row_keys[pk] = cached
+            else:
+                title_keys, word_keys = self.get_keys(*texts)
+                row_keys[pk] = (texts, title_keys, word_keys - title_keys)
+            title_entries.extend((key, pk) for key in row_keys[pk][1])
+            word_entries.extend((key, pk) for key in row_keys[pk][2])
+        title_entries.sort()
+        word_entries.sort()
+        self.data = (
+            [key for key, _ in title_entries], [pk for _, pk in title_entries],
+            [key for key, _ in word_entries], [pk for _, pk in word_entries],
+            items,
+        )
+        self.row_keys = row_keys
+        self.version = version
+
+    def update(self, rows: Iterable[Row]):
+        """
+        Merge changed and new rows into the index, rows of unchanged anime are kept.
+        """
+        title_keys, title_ids, word_keys, word_ids, items = self.data
+        items = dict(items)
+        changed = {}
+        for pk, slug, title, other_title in rows:
+            items[pk] = {'id': pk, 'slug': slug, 'title': title}
+            texts = (title, other_title, slug)
+            cached = self.row_keys.get(pk)
+            if not cached or cached[0] != texts:
+                title_row_keys, word_row_keys = self.get_keys(*texts)
+                changed[pk] = (texts, title_row_keys, word_row_keys - title_row_keys)
+        if not changed:
+            self.data = (title_keys, title_ids, word_keys, word_ids, items)
+            return
+        title_keys, title_ids, word_keys, word_ids = list(title_keys), list(title_ids), list(word_keys), list(word_ids)
+        count_entries = sum(len(keys[1]) + len(keys[2]) for keys in changed.values())
+        if count_entries <= self.max_inserted_entries:
+            # readers keep the old lists, every insert or delete moves the tail of a copy
+            for pk, (_, title_row_keys, word_row_keys) in changed.items():
+                old_title_keys, old_word_keys = self.row_keys[pk][1:] if pk in self.row_keys else ((), ())
+                self.replace_entries(title_keys, title_ids, pk, old_title_keys, title_row_keys)
+                self.replace_entries(word_keys, word_ids, pk, old_word_keys, word_row_keys)
+        else:
+            # the sorted arrays are merged in linear time
+            title_entries = list(heapq.merge(
+                ((key, pk) for key, pk in zip(title_keys, title_ids) if pk not in changed),
+                sorted((key, pk) for pk, keys in changed.items() for key in keys[1]),
+            ))
+            word_entries = list(heapq.merge(
+                ((key, pk) for key, pk in zip(word_keys, word_ids) if pk not in changed),
+                sorted((key, pk) for pk, keys in changed.items() for key in keys[2]),
+            ))
+            title_keys, title_ids = [key for key, _ in title_entries], [pk for _, pk in title_entries]
+            word_keys, word_ids = [key for key, _ in word_entries], [pk for _, pk in word_entries]
+        self.row_keys = {**self.row_keys, **changed}
+        self.data = (title_keys, title_ids, word_keys, word_ids, items)
+
+    @staticmethod
+    def replace_entries(keys: List[str], ids: List[int], pk: int, old_keys: Iterable[str], new_keys: Iterable[str]):
+        """
+        Replace keys of the anime in the arrays sorted by (key, id).
+        """
+        for key in old_keys:
+            index = bisect_left(keys, key)
+            while ids[index] != pk:
+                index += 1
+            del keys[index], ids[index]
+        for key in new_keys:
+            index = bisect_left(keys, key)
+            while index < len(keys) and keys[index] == key and ids[index] < pk:
+                index += 1
+            keys.insert(index, key)
+            ids.insert(index, pk)
+
+    def refresh(self):
+        """
+        Update the index when Anime has been changed, it costs a read of the cache version otherwise.
+        """
+        version = get_cache_versions([Anime])[CacheVersionKey.format(model=get_model_label(Anime))]
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            started_at = timezone.now()
+            rows = None
+            if self.refreshed_at is not None:
+                rows = list(Anime.objects.filter(
+                    updated__gte=self.refreshed_at - self.refresh_margin
+                ).order_by().values_list(*ROW_FIELDS)[:self.max_refresh_rows + 1])
+            if rows is not None and len(rows) <= self.max_refresh_rows:
+                self.update(rows)
+            # deleted anime are found by the count and the sum of ids (new ids are greater than deleted ones,
+            # so a deletion and a creation don't keep both), they are removed by the rebuild
+            if rows is None or len(rows) > self.max_refresh_rows or self.get_ids_checksum() != Anime.objects.aggregate(
+                count=Count('id'), sum=Coalesce(Sum('id'), 0),
+            ):
+                self.build(self.get_rows())
+            self.version, self.refreshed_at = version, started_at
+
+    def get_ids_checksum(self) -> Dict[str, int]:
+        items = self.data[4]
+        return {'count': len(items), 'sum': sum(items)}
+
+    def warm_up(self):
+        """
+        Build the index before the first request, a failure leaves it to the first request.
+        """
+        try:
+            self.refresh()
+        except DatabaseError as error:
+            logger.warning(f'Anime autocomplete index has not been built: {error}')
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """
+        :return: list. Anime which title starts with the text go first, then anime with a word starting with it.
+            For example, [{"id": 1, "slug": "naruto", "title": "Naruto"}]
+        """
+        prefix = Anime.objects.normalize_slug(text)
+        if not prefix:
+            return []
+        title_keys, title_ids, word_keys, word_ids, items = self.data
+        result, seen = [], set()
+        for keys, ids in ((title_keys, title_ids), (word_keys, word_ids)):
+            index = bisect_left(keys, prefix)
+            while index < len(keys) and len(result) < limit and keys[index].startswith(prefix):
+                if ids[index] not in seen:
+                    seen.add(ids[index])
+                    result.append(items[ids[index]])
+                index += 1
+        return result
+
+
+anime_prefix_index = AnimePrefixIndex()
@@ -0,0 +1,27 @@
+from typing import List, Optional
+
+from django.core.management import call_command
+
+
+def get_anime_ids(bodies: List[dict]) -> Optional[List[int]]:
+    """
+    :return: list. Union of 'anime' of the command messages, None if any of them is for all Anime
+    """
+    anime_ids = set()
+    for body in bodies:
+        if body.get('args'):
+            raise ValueError(f"Positional args of '{body['command']}' can't be merged, pass 'anime' in kwargs")
+        anime = (body.get('kwargs') or {}).get('anime')
+        if not anime:
+            return None
+        anime_ids.update(anime)
+    return sorted(anime_ids)
+
+
+# batch handlers of SQS messages (see 'SQS_BATCH_HANDLERS'), messages of a command are merged into one call
+def rebuild_anime_counters(bodies: List[dict]):
+    call_command('rebuild_anime_counters', anime=get_anime_ids(bodies))
+
+
+def rebuild_published_voiceovers(bodies: List[dict]):
+    call_command('rebuild_published_voiceovers', anime=get_anime_ids(bodies))
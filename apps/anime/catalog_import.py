@@ -0,0 +1,320 @@
+import csv
+import io
+import json
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.anime.models import Anime, Arch, Director, Episode, Genre, Studio
+from apps.core.cache import bump_cache_version
+
+
+CATALOG_IMPORT_FORMATS = ('jsonl', 'csv')
+# scalar fields of Anime taken from rows, the other keys are relations
+ANIME_IMPORT_FIELDS = (
+    'title', 'other_title', 'type', 'start_date', 'end_date', 'status', 'rating', 'description', 'season',
+    'year', 'average_time_episode', 'release_day_of_week', 'country', 'trailer_url',
+)
+# fields of nested arches and episodes, 'order' is required
+ARCH_IMPORT_FIELDS = ('order', 'title')
+EPISODE_IMPORT_FIELDS = ('order', 'title', 'release_date', 'status', 'is_accessible')
+CSV_LIST_SEPARATOR = '|'
+
+
+def read_catalog_rows(file: io.TextIOBase, file_format: str) -> Iterator[dict]:
+    """
+    Stream rows of a JSON Lines or CSV file, the file is not loaded into memory.
+    JSON Lines rows are objects with fields of Anime and 'slug', 'director' ("First Last"), 'genres' and
+    'studios' (lists of names), 'arches' ([{"order": 1, "title": "..."}]) and 'episodes'
+    ([{"order": 1, "title": "...", "release_date": "2024-01-01", "status": "...", "arch": 1}] or a number).
+    CSV has the same columns, 'genres' and 'studios' are separated by "|", 'episodes' is a number.
+    """
+    if file_format == 'jsonl':
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+        return
+    for row in csv.DictReader(file):
+        for key in ('genres', 'studios'):
+            if key in row:
+                row[key] = [name.strip() for name in (row[key] or '').split(CSV_LIST_SEPARATOR) if name.strip()]
+        yield row
+
+
+def iterate_batches(rows: Iterable, batch_size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class NameCache:
+    """
+    Ids of objects by name, loaded with one query and completed by bulk_create of missing names.
+    """
+    def __init__(self, model, get_key: Callable = None, get_fields: Callable = None):
+        self.model = model
+        self.get_key = get_key or (lambda obj: obj.name)
+        self.get_fields = get_fields or (lambda name: {'name': name})
+        self.ids: Optional[Dict[str, int]] = None
+        self.created = 0
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, int]:
+        if self.ids is None:
+            self.ids = {self.get_key(obj): obj.pk for obj in self.model.objects.order_by('-id')}
+        missing = {name for name in names if name and name not in self.ids}
+        if missing:
+            objects = self.model.objects.bulk_create([self.model(**self.get_fields(name)) for name in sorted(missing)])
+            self.ids.update((self.get_key(obj), obj.pk) for obj in objects)
+            self.created += len(objects)
+        return self.ids
+
+
+def split_full_name(full_name: str) -> dict:
+    first_name, _, last_name = full_name.partition(' ')
+    return {'first_name': first_name, 'last_name': last_name.strip()}
+
+
+class CatalogImportStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.episodes = 0
+        self.errors: List[Tuple[int, str]] = []  # (row number starting from 1, message)
+
+    @property
+    def rows_per_sec(self) -> float:
+        duration = time.perf_counter() - self.started
+        return round(self.rows / duration, 2) if duration else 0.0
+
+
+class CatalogImporter:
+    """
+    Import of anime with their episodes, arches, genres, studios and director by batches of rows.
+    Anime are matched by slug (the normalized title by default): new anime are created and existing ones
+    are updated (or skipped without 'update_existing'). Every batch is one transaction with a constant
+    number of queries: bulk inserts/updates of anime, m2m through tables, arches and episodes (upserted by order),
+    and the stored counters and search vectors, which signals don't maintain for bulk operations.
+    Director, Studio and Genre are resolved by name from in-memory caches, missing ones are created.
+    """
+    def __init__(self, batch_size: int = 500, update_existing: bool = True,
+                 on_batch: Callable[[CatalogImportStats], None] = None):
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.on_batch = on_batch
+        self.genres = NameCache(Genre)
+        self.studios = NameCache(Studio)
+        self.directors = NameCache(Director, get_key=lambda obj: obj.full_name.strip(), get_fields=split_full_name)
+        self.anime_fields = {name: Anime._meta.get_field(name) for name in ANIME_IMPORT_FIELDS}
+        self.choices = {
+            name: {str(key) for key, _ in field.flatchoices}
+            for name, field in self.anime_fields.items() if field.choices
+        }
+        self.required_fields = [
+            name for name, field in self.anime_fields.items() if not (field.has_default() or field.null)
+        ]
+        self.arch_fields = {name: Arch._meta.get_field(name) for name in ARCH_IMPORT_FIELDS}
+        # 'arch' of an episode is the order of the arch
+        self.episode_fields = {
+            **{name: Episode._meta.get_field(name) for name in EPISODE_IMPORT_FIELDS},
+            'arch': Arch._meta.get_field('order'),
+        }
+
+    def run(self, rows: Iterable[dict]) -> CatalogImportStats:
+        stats = CatalogImportStats()
+        numbered_rows = enumerate(rows, start=1)
+        for batch in iterate_batches(numbered_rows, self.batch_size):
+            with transaction.atomic():
+                self.import_batch(batch, stats)
+            stats.rows += len(batch)
+            if self.on_batch:
+                self.on_batch(stats)
+        for model in (Anime, Episode, Arch, Genre, Studio, Director):
+            bump_cache_version(model)
+        return stats
+
+    @staticmethod
+    def clean_value(field, value, choices: set = None):
+        """
+        'field.clean' without its choices check, which translates every choice (all countries) for every value.
+        """
+        value = field.to_python(value)
+        if choices is not None and value not in choices:
+            raise ValidationError(f'Invalid choice "{value}"')
+        field.run_validators(value)
+        return value
+
+    def parse_nested(self, key: str, items, fields: dict) -> List[dict]:
+        """
+        :return: list. Values of nested rows ('arches' or 'episodes') cleaned by the model fields
+        """
+        if not isinstance(items, list):
+            raise ValidationError(f'{key}: A list is expected')
+        result, orders = [], set()
+        for index, item in enumerate(items, start=1):
+            if not isinstance(item, dict):
+                raise ValidationError(f'{key}[{index}]: An object is expected')
+            values = {}
+            for name, field in fields.items():
+                value = item.get(name)
+                if value in (None, ''):
+                    if name == 'order':
+                        raise ValidationError(f'{key}[{index}].order: This field is required.')
+                    continue
+                try:
+                    values[name] = self.clean_value(field, value)
+                except ValidationError as error:
+                    raise ValidationError(f'{key}[{index}].{name}: {" ".join(error.messages)}')
+            # one upsert can't change a row twice
+            if values['order'] in orders:
+                raise ValidationError(f'{key}[{index}].order: Repeated order {values["order"]}')
+            orders.add(values['order'])
+            result.append(values)
+        return result
+
+    def parse_row(self, row: dict) -> dict:
+        """
+        :return: dict. Values of Anime fields cleaned by the model fields and the relations of the row
+        """
+        values = {}
+        for name, field in self.anime_fields.items():
+            value = row.get(name)
+            if value in (None, ''):
+                continue  # defaults of new anime, existing anime keep their values
+            try:
+                values[name] = self.clean_value(field, value, self.choices.get(name))
+            except ValidationError as error:
+                raise ValidationError(f'{name}: {" ".join(error.messages)}')
+        slug = row.get('slug') or Anime.objects.normalize_slug(values.get('title'))
+        if not slug:
+            raise ValidationError('Title or slug is required')
+        values['slug'] = slug
+
+        episodes = row.get('episodes') or []
+        if not isinstance(episodes, list):
+            episodes = [{'order': order} for order in range(1, int(episodes) + 1)]
+        return {
+            'values': values,
+            # an empty director keeps the director of an existing anime
+            'director': (row.get('director') or '').strip(),
+            # None keeps genres and studios of an existing anime
+            'genres': list(row['genres'] or []) if 'genres' in row else None,
+            'studios': list(row['studios'] or []) if 'studios' in row else None,
+            'arches': self.parse_nested('arches', row.get('arches') or [], self.arch_fields),
+            'episodes': self.parse_nested('episodes', episodes, self.episode_fields),
+        }
+
+    def import_batch(self, batch: List[Tuple[int, dict]], stats: CatalogImportStats):
+        parsed = {}
+        for number, row in batch:
+            try:
+                item = self.parse_row(row)
+            except (ValidationError, TypeError, ValueError) as error:
+                messages = error.messages if isinstance(error, ValidationError) else [str(error)]
+                stats.errors.append((number, '; '.join(messages)))
+                continue
+            item['number'] = number
+            parsed[item['values']['slug']] = item  # the last row wins for a repeated slug
+        if not parsed:
+            return
+
+        directors = self.directors.resolve(item['director'] for item in parsed.values())
+        genres = self.genres.resolve(name for item in parsed.values() for name in item['genres'] or [])
+        studios = self.studios.resolve(name for item in parsed.values() for name in item['studios'] or [])
+
+        # slugs are not unique in the table, the oldest anime is updated
+        existing = dict(Anime.objects.filter(slug__in=parsed).order_by().values('slug').annotate(
+            min_id=Min('id')
+        ).values_list('slug', 'min_id'))
+        new_anime, updated_anime = [], {}
+        now = timezone.now()
+        for slug, item in parsed.items():
+            anime = Anime(pk=existing.get(slug), director_id=directors.get(item['director']), **item['values'])
+            if anime.pk is None:
+                missing = [name for name in self.required_fields if name not in item['values']]
+                if missing:
+                    stats.errors.append((item['number'], f'Missing fields: {", ".join(missing)}'))
+                    continue
+                new_anime.append(anime)
+            elif self.update_existing:
+                anime.updated = now
+                fields = [name for name in item['values'] if name != 'slug']
+                if item['director']:
+                    fields.append('director')
+                updated_anime.setdefault(tuple(sorted(fields)), []).append(anime)
+        Anime.objects.bulk_create(new_anime)
+        # rows update only their fields, anime with the same fields are updated together
+        for fields, anime_list in updated_anime.items():
+            Anime.objects.bulk_update(anime_list, ['updated', *fields])
+        updated_anime = [anime for anime_list in updated_anime.values() for anime in anime_list]
+        stats.created += len(new_anime)
+        stats.updated += len(updated_anime)
+
+        anime_items = [(anime.pk, parsed[anime.slug]) for anime in new_anime + updated_anime]
+        anime_ids = [pk for pk, _ in anime_items]
+        self.set_m2m(Anime.genres.through, 'genre_id', [
+            (pk, [genres[name] for name in item['genres']]) for pk, item in anime_items if item['genres'] is not None
+        ])
+        self.set_m2m(Anime.studio.through, 'studio_id', [
+            (pk, [studios[name] for name in item['studios']]) for pk, item in anime_items if item['studios'] is not None
+        ])
+        stats.episodes += self.import_episodes(anime_items)
+
+        Anime.objects.filter(pk__in=anime_ids).refresh_counters(reactions=False)
+        Anime.objects.filter(pk__in=anime_ids).refresh_search_vector()
+
+    @staticmethod
+    def set_m2m(through, field: str, items: List[Tuple[int, List[int]]]):
+        """
+        Replace related ids of the anime with a DELETE and an INSERT of the through table.
+        """
+        if not items:
+            return
+        rows = through.objects.filter(anime_id__in=[anime_id for anime_id, _ in items])
+        rows._raw_delete(rows.db)  # without collecting rows for signals, the cache versions are bumped by 'run'
+        through.objects.bulk_create([
+            through(anime_id=anime_id, **{field: pk}) for anime_id, ids in items for pk in set(ids)
+        ], ignore_conflicts=True)
+
+    def import_episodes(self, anime_items: List[Tuple[int, dict]]) -> int:
+        arches = [
+            Arch(anime_id=pk, order=arch['order'], title=arch.get('title') or f'Арка {arch["order"]}')
+            for pk, item in anime_items for arch in item['arches']
+        ]
+        arch_ids = {}
+        if arches:
+            Arch.objects.bulk_create(
+                arches, update_conflicts=True, unique_fields=['anime', 'order'], update_fields=['title'],
+            )
+            arch_ids = {
+                (anime_id, order): pk for anime_id, order, pk in Arch.objects.filter(
+                    anime_id__in={arch.anime_id for arch in arches}
+                ).values_list('anime_id', 'order', 'id')
+            }
+
+        episodes = []
+        for pk, item in anime_items:
+            for episode in item['episodes']:
+                order = episode['order']
+                episodes.append(Episode(
+                    anime_id=pk, order=order, title=episode.get('title') or f'Епізод {order}',
+                    status=episode.get('status') or 'RELEASED', release_date=episode.get('release_date'),
+                    is_accessible=episode.get('is_accessible', False),
+                    arch_id=arch_ids.get((pk, episode['arch'])) if 'arch' in episode else None,
+                ))
+        if episodes:
+            Episode.objects.bulk_create(
+                episodes, batch_size=self.batch_size * 10, update_conflicts=True, unique_fields=['anime', 'order'],
+                update_fields=['title', 'status', 'release_date', 'is_accessible', 'arch'],
+            )
+        return len(episodes)
@@ -0,0 +1,133 @@
+from hashlib import md5
+from typing import Callable, Dict, List, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count
+from django_countries import countries
+
+from apps.anime.choices import AnimeStatuses, AnimeTypes, SeasonTypes
+from apps.anime.models import Anime, Director, Genre, Studio, PublishedVoiceover
+from apps.core.cache import get_cache_versions, get_model_label, CacheVersionKey
+from apps.user.models import Group
+
+
+FacetCacheKey = 'facets.{name}.{versions_hash}'
+
+Options = List[Tuple[str, str]]
+Counts = Dict[str, int]
+
+
+class Facet:
+    """
+    A filter of the anime list with its options and the number of anime for every option.
+    Both are cached until any of 'models' is changed.
+    """
+    def __init__(self, name: str, models_list: Tuple[Type[models.Model], ...],
+                 get_options: Callable[[], Options], get_counts: Callable[[], Counts]):
+        self.name = name
+        self.models = models_list
+        self.get_options = get_options
+        self.get_counts = get_counts
+
+    def build(self, with_counts: bool) -> dict:
+        return {
+            'options': self.get_options(),
+            'counts': self.get_counts() if with_counts else None,
+        }
+
+
+def count_by_field(queryset: models.QuerySet, field: str) -> Counts:
+    rows = queryset.order_by().values(field).annotate(count_anime=Count('pk', distinct=True))
+    return {str(row[field]): row['count_anime'] for row in rows if row[field] not in (None, '')}
+
+
+def count_anime(queryset: models.QuerySet, anime_lookup: str) -> Counts:
+    rows = queryset.order_by().values('id').annotate(count_anime=Count(anime_lookup, distinct=True))
+    return {str(row['id']): row['count_anime'] for row in rows}
+
+
+def get_country_options() -> Options:
+    codes = Anime.objects.exclude(country='').exclude(country__isnull=True).order_by().values_list(
+        'country', flat=True
+    ).distinct()
+    return sorted(((code, str(countries.name(code))) for code in codes), key=lambda option: option[1])
+
+
+def get_choices_options(choices) -> Callable[[], Options]:
+    return lambda: list(choices)
+
+
+FACETS = [
+    Facet(
+        'directors', (Director, Anime),
+        lambda: [(str(director.id), director.full_name) for director in Director.objects.order_by('id')],
+        lambda: count_anime(Director.objects.all(), 'anime'),
+    ),
+    Facet(
+        'genres', (Genre, Anime),
+        lambda: [(str(genre.id), genre.name) for genre in Genre.objects.order_by('id')],
+        lambda: count_anime(Genre.objects.all(), 'anime'),
+    ),
+    Facet(
+        'studios', (Studio, Anime),
+        lambda: [(str(studio.id), studio.name) for studio in Studio.objects.order_by('id')],
+        lambda: count_anime(Studio.objects.all(), 'anime'),
+    ),
+    Facet(
+        'countries', (Anime,),
+        get_country_options,
+        lambda: count_by_field(Anime.objects.all(), 'country'),
+    ),
+    Facet(
+        'voiceover', (Group, PublishedVoiceover),
+        lambda: [(str(group.id), group.name) for group in Group.objects.order_by('id')],
+        lambda: count_anime(Group.objects.all(), 'published_voiceovers__anime'),
+    ),
+    Facet(
+        'status', (Anime,),
+        get_choices_options(AnimeStatuses.choices),
+        lambda: count_by_field(Anime.objects.all(), 'status'),
+    ),
+    Facet(
+        'type', (Anime,),
+        get_choices_options(AnimeTypes.choices),
+        lambda: count_by_field(Anime.objects.all(), 'type'),
+    ),
+    Facet(
+        'season', (Anime,),
+        get_choices_options(SeasonTypes.choices),
+        lambda: count_by_field(Anime.objects.all(), 'season'),
+    ),
+]
+
+FACET_MODELS = tuple({model for facet in FACETS for model in facet.models})
+
+
+def get_anime_filter_facets(with_counts: bool = False) -> Dict[str, dict]:
+    """
+    :return: dict. For example,
+        {
+            "genres": {"options": [("1", "Drama")], "counts": {"1": 10}},
+            "status": {"options": [("CAME_OUT", "Вийшов")], "counts": None},
+        }
+    Warm facets cost two cache reads (versions + facets), only the facets of changed models are rebuilt.
+    """
+    versions = get_cache_versions(FACET_MODELS)
+    keys = {}
+    for facet in FACETS:
+        facet_versions = [versions[CacheVersionKey.format(model=get_model_label(model))] for model in facet.models]
+        versions_hash = md5(f'{facet_versions}.{with_counts}'.encode(), usedforsecurity=False).hexdigest()
+        keys[facet.name] = FacetCacheKey.format(name=facet.name, versions_hash=versions_hash)
+
+    cached = cache.get_many(keys.values())
+    result, missing = {}, {}
+    for facet in FACETS:
+        key = keys[facet.name]
+        if key not in cached:
+            cached[key] = missing[key] = facet.build(with_counts)
+        result[facet.name] = cached[key]
+    if missing:
+        cache.set_many(missing, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return result
@@ -1,9 +1,10 @@
 from django_filters import rest_framework as filters
 from django_countries import Countries
+from rest_framework.filters import SearchFilter
 
 from django.contrib.auth.models import Group
 
-from apps.anime.models import Anime, Genre, Studio, Director
+from apps.anime.models import Anime, Genre, Studio, Director, PublishedVoiceover
 from apps.anime.choices import AnimeTypes, SeasonTypes, AnimeStatuses
 
 
@@ -44,7 +45,7 @@ class AnimeListFilterSet(filters.FilterSet):
         field_name='type', choices=AnimeTypes.choices
     )
     voiceover = filters.ModelChoiceFilter(
-        field_name='episode__voiceover__team_id', to_field_name='id',
+        to_field_name='id', method='filter_voiceover',
         queryset=Group.objects.all()
     )
     season = filters.ChoiceFilter(
@@ -69,3 +70,23 @@ class AnimeListFilterSet(filters.FilterSet):
             'genres', 'studio', 'country', 'status', 'director', 'type', 'voiceover', 'season',
             'year_gte', 'year_lte', 'episode_lte', 'episode_gte'
         ]
+
+    def filter_voiceover(self, queryset, name, value):
+        # a subquery instead of a join, anime are not repeated for every voiced episode
+        return queryset.filter(pk__in=PublishedVoiceover.objects.filter(team_id=value.pk).values('anime_id'))
+
+
+class AnimeSearchFilter(SearchFilter):
+    """
+    The 'search' query param is matched by the full-text search instead of ILIKE over 'search_fields'.
+    Titles similar to the text are returned only when nothing is found, it is probably a typo.
+    """
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        text = ' '.join(search_terms)
+        result = queryset.search(text)
+        if not result.exists():
+            result = queryset.search_similar(text)
+        return result
@@ -3,6 +3,7 @@ from django_countries.data import COUNTRIES
 from dal import autocomplete
 
 from apps.anime.models import Anime
+from apps.anime.voiceover_import import read_voiceover_rows, VOICEOVER_IMPORT_FORMATS
 
 
 class AnimeAdminForm(forms.ModelForm):
@@ -14,3 +15,21 @@ class AnimeAdminForm(forms.ModelForm):
     class Meta:
         model = Anime
         exclude = ['is_top']
+
+
+class VoiceoverImportForm(forms.Form):
+    file = forms.FileField(
+        help_text='CSV або JSON з полями: anime (id або slug), order, team (id або назва), type, url'
+    )
+    dry_run = forms.BooleanField(required=False, label='Тільки перевірити')
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        file_format = file.name.rsplit('.', 1)[-1].lower()
+        if file_format not in VOICEOVER_IMPORT_FORMATS:
+            raise forms.ValidationError('Підтримуються лише файли CSV та JSON')
+        try:
+            self.cleaned_data['rows'] = read_voiceover_rows(file.read(), file_format)
+        except ValueError as error:
+            raise forms.ValidationError(f'Невірний файл: {error}')
+        return file
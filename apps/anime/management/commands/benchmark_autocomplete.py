@@ -0,0 +1,49 @@
+import random
+import time
+
+from faker import Faker
+
+from apps.anime.autocomplete import AnimePrefixIndex
+from apps.core.benchmark import BenchmarkCommand, measure
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure build time and lookups of the autocomplete prefix index on generated titles'
+    default_iterations = 10000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--titles', type=int, default=100_000, help='Number of generated titles')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        fake = Faker(['en_US', 'uk_UA'])
+        fake.seed_instance(options['seed'])
+        random.seed(options['seed'])
+        rows = [
+            (pk, f'title-{pk}', fake.catch_phrase() if pk % 2 else fake.sentence(nb_words=3), fake.sentence(nb_words=4))
+            for pk in range(1, options['titles'] + 1)
+        ]
+
+        index = AnimePrefixIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        build_time = time.perf_counter() - started
+        started = time.perf_counter()
+        index.build(rows[:-1] + [(rows[-1][0], rows[-1][1], 'Changed title', rows[-1][3])])
+        rebuild_time = time.perf_counter() - started
+        started = time.perf_counter()
+        index.update([(rows[0][0], rows[0][1], 'Changed title', rows[0][3])])
+        update_time = time.perf_counter() - started
+
+        titles = [title for _, _, title, _ in random.sample(rows, min(len(rows), 1000))]
+        prefixes = [title[:random.randint(1, len(title))] for title in titles]
+        results = {
+            'search': measure(lambda i: index.search(prefixes[i % len(prefixes)]), options['iterations']),
+        }
+        self.write_results(results, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Index of {len(rows)} titles: {len(index.data[0]) + len(index.data[2])} keys, '
+            f'built in {build_time:.2f} s, rebuilt after a change in {rebuild_time:.2f} s, '
+            f'updated in {update_time:.2f} s'
+        ))
@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.db import connection, transaction
+
+from apps.anime.choices import AnimeTypes, RatingTypes
+from apps.anime.models import Anime
+from apps.anime.random_anime import pick_random_anime_id
+from apps.core.benchmark import BenchmarkCommand, measure
+from apps.core.cache import CacheVersionKey, get_model_label, incr_cache_version
+
+
+class Command(BenchmarkCommand):
+    help = ('Compare ORDER BY RANDOM() against the cached ids of the random anime as the catalog grows. '
+            'Generated rows are rolled back at the end')
+    default_iterations = 200
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--sizes', type=int, nargs='*', default=[1_000, 10_000, 100_000],
+                            help='Numbers of generated anime')
+
+    def handle(self, *args, **options):
+        results = {}
+        with transaction.atomic():
+            generated = 0
+            for size in sorted(options['sizes']):
+                self.generate_anime(size - generated)
+                generated = size
+                results[f'{size}.order_by_random'] = measure(
+                    lambda i: Anime.objects.order_by('?').only('id', 'slug').first(), options['iterations'],
+                )
+                # the pick without the read of the anime
+                results[f'{size}.pick'] = measure(lambda i: pick_random_anime_id(), options['iterations'], warmup=1)
+                results[f'{size}.cached_ids'] = measure(
+                    lambda i: Anime.objects.only('id', 'slug').get(pk=pick_random_anime_id()),
+                    options['iterations'], warmup=1,
+                )
+            transaction.set_rollback(True)
+        self.write_results(results, options['output'])
+
+    def generate_anime(self, count: int):
+        Anime.objects.bulk_create(
+            [
+                Anime(title=f'Anime {index}', type=AnimeTypes.SERIAL, rating=RatingTypes.PG13,
+                      start_date=date(2024, 1, 1), year=2024)
+                for index in range(count)
+            ],
+            batch_size=5000,
+        )
+        # bulk_create does not send signals, the version is bumped at once since the rows are never committed
+        incr_cache_version(CacheVersionKey.format(model=get_model_label(Anime)))
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Anime._meta.db_table}')
@@ -0,0 +1,82 @@
+import random
+from datetime import date
+
+from django.db import connection, transaction
+
+from faker import Faker
+
+from apps.anime.choices import AnimeTypes, RatingTypes
+from apps.anime.models import Anime
+from apps.core.benchmark import BenchmarkCommand, measure
+
+
+def search(text: str):
+    # the same path as 'AnimeSearchFilter'
+    result = Anime.objects.search(text)
+    if not result.exists():
+        result = Anime.objects.search_similar(text)
+    return result
+
+
+class Command(BenchmarkCommand):
+    help = ('Compare latency of the full-text search against ILIKE on generated titles. '
+            'Generated rows are rolled back at the end')
+    default_iterations = 100
+    page_size = 12
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--titles', type=int, nargs='*', default=[10_000, 100_000],
+                            help='Numbers of generated titles')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        fake = Faker()
+        fake.seed_instance(options['seed'])
+        random.seed(options['seed'])
+
+        results = {}
+        with transaction.atomic():
+            generated = 0
+            for titles in sorted(options['titles']):
+                self.generate_anime(fake, titles - generated)
+                generated = titles
+                words = [title.split()[0] for title in random.sample(self.titles, 20)]
+                queries = {
+                    'word': words,
+                    'prefix': [word[:3] for word in words],
+                    'typo': [word[:-1] + 'x' if len(word) > 4 else word for word in words],
+                }
+                for name, values in queries.items():
+                    results[f'{titles}.ilike.{name}'] = self.measure_search(
+                        lambda value: Anime.objects.filter(title__icontains=value).order_by('-created'),
+                        values, options['iterations'],
+                    )
+                    results[f'{titles}.search.{name}'] = self.measure_search(
+                        search, values, options['iterations'],
+                    )
+            transaction.set_rollback(True)
+        self.write_results(results, options['output'])
+
+    def generate_anime(self, fake: Faker, count: int):
+        anime_list = [
+            Anime(
+                title=fake.catch_phrase(), other_title=fake.catch_phrase(), description=fake.text(300),
+                type=AnimeTypes.SERIAL, rating=RatingTypes.PG13, start_date=date(2024, 1, 1), year=2024,
+            )
+            for _ in range(count)
+        ]
+        Anime.objects.bulk_create(anime_list, batch_size=5000)
+        self.titles = getattr(self, 'titles', []) + [anime.title for anime in anime_list]
+        Anime.objects.filter(search_vector__isnull=True).refresh_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Anime._meta.db_table}')
+        self.stdout.write(f'Generated {len(self.titles)} titles')
+
+    def measure_search(self, search, values: list, iterations: int):
+        # a page of results and the count, as in the paginated endpoint
+        def run(iteration):
+            queryset = search(values[iteration % len(values)])
+            return list(queryset[:self.page_size]), queryset.count()
+
+        return measure(run, iterations, warmup=len(values))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.anime.catalog_import import CatalogImporter, CatalogImportStats, read_catalog_rows, CATALOG_IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Import anime with episodes, arches, genres, studios and directors from a JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Path of the file')
+        parser.add_argument('--format', type=str, choices=CATALOG_IMPORT_FORMATS,
+                            help='Format of the file (by the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of rows in a transaction')
+        parser.add_argument('--skip-existing', action='store_true', help='Do not update anime with existing slugs')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in CATALOG_IMPORT_FORMATS:
+            raise CommandError(f'Unknown format "{file_format}", use --format')
+
+        importer = CatalogImporter(
+            batch_size=options['batch_size'], update_existing=not options['skip_existing'], on_batch=self.report,
+        )
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            stats = importer.run(read_catalog_rows(file, file_format))
+
+        for row_number, message in stats.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish import catalog: {stats.created} Anime created, {stats.updated} updated, '
+            f'{stats.episodes} Episodes, {len(stats.errors)} errors ({stats.rows_per_sec} rows/s)'
+        ))
+
+    def report(self, stats: CatalogImportStats):
+        self.stdout.write(f'{stats.rows} rows: {stats.created} created, {stats.updated} updated, '
+                          f'{stats.episodes} episodes, {stats.rows_per_sec} rows/s')
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.anime.voiceover_import import VoiceoverImporter, read_voiceover_rows, VOICEOVER_IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Import voiceovers from a CSV or JSON file (fields: anime, order, team, type, url)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Path of the file')
+        parser.add_argument('--format', type=str, choices=VOICEOVER_IMPORT_FORMATS,
+                            help='Format of the file (by the extension by default)')
+        parser.add_argument('--user', type=str, help='Username of the author of the voiceovers')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate rows without saving')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in VOICEOVER_IMPORT_FORMATS:
+            raise CommandError(f'Unknown format "{file_format}", use --format')
+
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" does not exist')
+
+        with open(options['path'], 'rb') as file:
+            try:
+                rows = read_voiceover_rows(file.read(), file_format)
+            except ValueError as error:
+                raise CommandError(f'Invalid file: {error}')
+
+        started = time.perf_counter()
+        result = VoiceoverImporter(user=user, batch_size=options['batch_size']).run(rows, dry_run=options['dry_run'])
+        duration = time.perf_counter() - started
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        rows_per_sec = round(len(rows) / duration) if duration else len(rows)
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish import voiceovers: {result.created} created, {len(result.errors)} errors '
+            f'({len(rows)} rows in {duration:.2f}s, {rows_per_sec} rows/s)'
+        ))
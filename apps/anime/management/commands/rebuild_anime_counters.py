@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from django.db import transaction
+
+from apps.anime.models import Anime
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the stored episode and reaction counters of Anime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anime', type=int, nargs='*', help='Ids of Anime to rebuild (all by default)')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        queryset = Anime.objects.all()
+        if options['anime']:
+            queryset = queryset.filter(pk__in=options['anime'])
+
+        count_anime = queryset.refresh_counters()
+
+        self.stdout.write(self.style.SUCCESS(f'Finish rebuild counters: {count_anime} Anime updated'))
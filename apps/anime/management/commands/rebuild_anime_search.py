@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from django.db import transaction
+
+from apps.anime.models import Anime
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the stored full-text search vectors of Anime in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of Anime updated per transaction')
+        parser.add_argument('--missing', action='store_true', help='Only Anime without a search vector')
+
+    def handle(self, *args, **options):
+        queryset = Anime.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(search_vector__isnull=True)
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+
+        count_anime = 0
+        for start in range(0, len(ids), options['batch_size']):
+            batch = ids[start:start + options['batch_size']]
+            with transaction.atomic():
+                count_anime += Anime.objects.filter(pk__in=batch).refresh_search_vector()
+            self.stdout.write(f'{count_anime}/{len(ids)}')
+
+        self.stdout.write(self.style.SUCCESS(f'Finish rebuild search vectors: {count_anime} Anime updated'))
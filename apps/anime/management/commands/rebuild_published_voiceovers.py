@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from django.db import transaction
+
+from apps.anime.models import PublishedVoiceover
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized index of approved voiceovers (PublishedVoiceover)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anime', type=int, nargs='*', help='Ids of Anime to rebuild (all by default)')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        count_rows = PublishedVoiceover.objects.rebuild(anime_ids=options['anime'] or None)
+
+        self.stdout.write(self.style.SUCCESS(f'Finish rebuild published voiceovers: {count_rows} rows created'))
@@ -1,10 +1,80 @@
-from django.db import models
-from django.db.models import Count, Q
+import re
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 
 from slugify import slugify
 
 
-class AnimeManager(models.Manager):
+# titles are mixed Ukrainian, English and romanized Japanese, so words are not stemmed
+SEARCH_CONFIG = 'simple'
+
+
+def get_search_vector() -> SearchVector:
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('other_title', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+class AnimeQuerySet(models.QuerySet):
+    def refresh_counters(self, episodes: bool = True, reactions: bool = True) -> int:
+        """
+        Recalculate the stored 'count_*' columns from the related tables with a single UPDATE.
+        """
+        from apps.anime.models import Episode, Reaction
+        from apps.anime.choices import ReactionChoices
+
+        def count_subquery(queryset):
+            queryset = queryset.filter(anime_id=OuterRef('pk')).order_by().values('anime_id')
+            return Coalesce(Subquery(queryset.annotate(total=Count('pk')).values('total')), Value(0))
+
+        counters = {}
+        if episodes:
+            counters['count_episodes'] = count_subquery(Episode.objects.all())
+        if reactions:
+            counters['count_like'] = count_subquery(Reaction.objects.filter(reaction=ReactionChoices.LIKE))
+            counters['count_dislike'] = count_subquery(Reaction.objects.filter(reaction=ReactionChoices.DISLIKE))
+        if not counters:
+            return 0
+        return self.update(**counters)
+
+    def refresh_search_vector(self) -> int:
+        return self.update(search_vector=get_search_vector())
+
+    def search(self, text: str):
+        """
+        Full-text search by the stored 'search_vector', ordered by rank. The last word is a prefix,
+        so it also works while the word is being typed.
+        """
+        words = re.findall(r'\w+', text.lower())
+        if not words:
+            return self.none()
+        query = SearchQuery(' & '.join(words[:-1] + [f'{words[-1]}:*']), search_type='raw', config=SEARCH_CONFIG)
+        return self.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+
+    def search_similar(self, text: str):
+        """
+        Trigram word similarity of titles, it finds titles with typos which the full-text search misses.
+        """
+        phrase = ' '.join(re.findall(r'\w+', text.lower()))
+        if not phrase:
+            return self.none()
+        return self.filter(
+            Q(title__trigram_word_similar=phrase) | Q(other_title__trigram_word_similar=phrase)
+        ).annotate(
+            search_rank=Greatest(TrigramWordSimilarity(phrase, 'title'), TrigramWordSimilarity(phrase, 'other_title'))
+        ).order_by('-search_rank', '-id')
+
+
+class AnimeManager(models.Manager.from_queryset(AnimeQuerySet)):
     @classmethod
     def normalize_slug(cls, title):
         """
@@ -13,13 +83,109 @@ class AnimeManager(models.Manager):
         title = title or ""
         return slugify(title.strip())
 
-    def get_queryset(self):
-        return super().get_queryset().annotate(
-            count_episodes=Count('episode'),
-            count_like=Count('reactions', filter=Q(reactions__reaction='LIKE')),
+
+class EpisodeQuerySet(models.QuerySet):
+    def with_public_voiceovers(self):
+        """
+        Prefetch approved voiceovers and subtitles with their teams into 'public_voiceovers' and 'public_subtitles'.
+        """
+        from apps.anime.models import Voiceover
+        from apps.anime.choices import VoiceoverStatuses, VoiceoverTypes
+
+        public_voiceovers = Voiceover.objects.filter(status=VoiceoverStatuses.APPROVED).select_related('team')
+        return self.prefetch_related(
+            models.Prefetch(
+                lookup='voiceover_set',
+                queryset=public_voiceovers.filter(type=VoiceoverTypes.VOICEOVER),
+                to_attr='public_voiceovers',
+            ),
+            models.Prefetch(
+                lookup='voiceover_set',
+                queryset=public_voiceovers.filter(type=VoiceoverTypes.SUBTITLES),
+                to_attr='public_subtitles',
+            ),
         )
 
 
+class VoiceoverQuerySet(models.QuerySet):
+    def process_new_history_event(self, event: str, **kwargs) -> int:
+        """
+        Add the event to the history of every voiceover of the queryset in one transaction:
+        a locking SELECT, one INSERT of the history and an UPDATE per new status. The published voiceovers
+        of the changed anime are rebuilt once after the commit, as on saves of voiceovers (see 'apps.anime.signals').
+        Updates don't send signals, so the cache version of Voiceover is bumped here.
+        :return: int. The number of voiceovers which status has been changed
+        """
+        from apps.anime.models import VoiceoverHistory
+        from apps.anime.signals import schedule_published_voiceovers_rebuild
+        from apps.anime.voiceover_status import VoiceoverStateMachine
+        from apps.core.cache import bump_cache_version
+
+        with transaction.atomic():
+            voiceovers = list(
+                self.select_related('episode').select_for_update(of=('self',)).only('status', 'episode__anime')
+            )
+            history, changed = [], {}
+            for voiceover in voiceovers:
+                new_status = VoiceoverStateMachine.get_next_status(voiceover.status, event)
+                status_changed = new_status != voiceover.status
+                if status_changed:
+                    changed.setdefault(new_status, []).append(voiceover)
+                history.append(VoiceoverHistory(
+                    voiceover=voiceover, event=event, status=new_status if status_changed else '', **kwargs
+                ))
+            VoiceoverHistory.objects.bulk_create(history)
+
+            for new_status, changed_voiceovers in changed.items():
+                self.model.objects.filter(pk__in=[voiceover.pk for voiceover in changed_voiceovers]).update(
+                    status=new_status, updated=timezone.now()
+                )
+            if changed:
+                anime_ids = {
+                    voiceover.episode.anime_id for voiceovers in changed.values() for voiceover in voiceovers
+                }
+                schedule_published_voiceovers_rebuild(anime_ids=anime_ids)
+                bump_cache_version(self.model)
+        return sum(len(changed_voiceovers) for changed_voiceovers in changed.values())
+
+
+class PublishedVoiceoverQuerySet(models.QuerySet):
+    def rebuild(self, anime_ids=None) -> int:
+        """
+        Replace the rows of the anime (ids or a subquery, all anime by default) with approved voiceovers
+        aggregated per team and type: a DELETE, a grouped SELECT and a single INSERT.
+        Rebuilds of the same anime are serialized by a lock of the anime rows, so concurrent ones don't
+        insert the same rows twice and the last one reads the voiceovers committed by others.
+        """
+        from apps.anime.models import Anime, Voiceover
+        from apps.anime.choices import VoiceoverStatuses
+        from apps.core.cache import bump_cache_version
+
+        rows = self.all()
+        voiceovers = Voiceover.objects.filter(status=VoiceoverStatuses.APPROVED)
+        anime = Anime.objects.all()
+        if anime_ids is not None:
+            rows = rows.filter(anime_id__in=anime_ids)
+            voiceovers = voiceovers.filter(episode__anime_id__in=anime_ids)
+            anime = anime.filter(pk__in=anime_ids)
+
+        with transaction.atomic():
+            # NO KEY UPDATE doesn't block inserts of episodes and reactions which reference the anime
+            list(anime.select_for_update(no_key=True).order_by('pk').values_list('pk', flat=True))
+            # rows have no relations, signals are skipped and the cache version is bumped once below
+            rows._raw_delete(rows.db)
+            groups = voiceovers.order_by().values('episode__anime_id', 'team_id', 'type').annotate(
+                episodes=ArrayAgg('episode__order', distinct=True, ordering='episode__order'),
+            )
+            created = self.bulk_create([
+                self.model(anime_id=group['episode__anime_id'], team_id=group['team_id'], type=group['type'],
+                           episodes=group['episodes'])
+                for group in groups
+            ], batch_size=1000)
+            bump_cache_version(self.model)
+        return len(created)
+
+
 class ReactionQuerySet(models.QuerySet):
     def get_users(self):
         return [reaction.user for reaction in self.all()]
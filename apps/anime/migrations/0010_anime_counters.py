@@ -0,0 +1,47 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_anime_counters(apps, schema_editor):
+    Anime = apps.get_model('anime', 'Anime')
+    Episode = apps.get_model('anime', 'Episode')
+    Reaction = apps.get_model('anime', 'Reaction')
+
+    def count_subquery(queryset):
+        queryset = queryset.filter(anime_id=OuterRef('pk')).order_by().values('anime_id')
+        return Coalesce(Subquery(queryset.annotate(total=Count('pk')).values('total')), Value(0))
+
+    Anime.objects.update(
+        count_episodes=count_subquery(Episode.objects.all()),
+        count_like=count_subquery(Reaction.objects.filter(reaction='LIKE')),
+        count_dislike=count_subquery(Reaction.objects.filter(reaction='DISLIKE')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anime', '0009_animehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anime',
+            name='count_dislike',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='anime',
+            name='count_episodes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='anime',
+            name='count_like',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(fill_anime_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anime', '0010_anime_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='anime',
+            name='count_like',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='anime',
+            index=models.Index(fields=['-created', '-id'], name='anime_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='anime',
+            index=models.Index(fields=['-count_like', '-id'], name='anime_count_like_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    Anime = apps.get_model('anime', 'Anime')
+    Anime.objects.update(
+        search_vector=(
+            SearchVector('title', weight='A', config='simple')
+            + SearchVector('other_title', weight='B', config='simple')
+            + SearchVector('description', weight='C', config='simple')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anime', '0011_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='anime',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='anime',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='anime_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='anime',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='anime_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='anime',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['other_title'], name='anime_other_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:00
+
+import django.contrib.postgres.fields
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_published_voiceovers(apps, schema_editor):
+    Voiceover = apps.get_model('anime', 'Voiceover')
+    PublishedVoiceover = apps.get_model('anime', 'PublishedVoiceover')
+    groups = Voiceover.objects.filter(status='APPROVED').order_by().values(
+        'episode__anime_id', 'team_id', 'type'
+    ).annotate(episodes=ArrayAgg('episode__order', distinct=True, ordering='episode__order'))
+    PublishedVoiceover.objects.bulk_create([
+        PublishedVoiceover(anime_id=group['episode__anime_id'], team_id=group['team_id'], type=group['type'],
+                           episodes=group['episodes'])
+        for group in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_groupsettings'),
+        ('anime', '0012_anime_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedVoiceover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('VOICEOVER', 'Озвучка'), ('SUBTITLES', 'Субтитри')], max_length=255)),
+                ('episodes', django.contrib.postgres.fields.ArrayField(base_field=models.SmallIntegerField(), default=list, size=None)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='voiceover',
+            name='episode',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='anime.episode'),
+        ),
+        migrations.AddIndex(
+            model_name='voiceover',
+            index=models.Index(fields=['episode', 'status', 'type'], name='voiceover_episode_status_idx'),
+        ),
+        migrations.AddField(
+            model_name='publishedvoiceover',
+            name='anime',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_voiceovers', to='anime.anime'),
+        ),
+        migrations.AddField(
+            model_name='publishedvoiceover',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_voiceovers', to='user.group'),
+        ),
+        migrations.AddIndex(
+            model_name='publishedvoiceover',
+            index=models.Index(fields=['team', 'anime'], name='published_voiceover_team_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='publishedvoiceover',
+            constraint=models.UniqueConstraint(fields=('anime', 'team', 'type'), name='unique_published_voiceover'),
+        ),
+        migrations.RunPython(fill_published_voiceovers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count
 from django.conf import settings
 from django_countries.fields import CountryField
 
@@ -7,12 +11,15 @@ from apps.anime.choices import (
     VoiceoverTypes, AnimeTypes, RatingTypes, SeasonTypes, VoiceoverStatuses, VoiceoverHistoryEvents,
     AnimeStatuses, DayOfWeekChoices, ReactionChoices, AnimeHistoryEvents
 )
-from apps.anime.managers import AnimeManager, ReactionQuerySet
+from apps.anime.managers import (
+    AnimeManager, EpisodeQuerySet, PublishedVoiceoverQuerySet, ReactionQuerySet, VoiceoverQuerySet
+)
 from apps.anime.s3_path import (
     anime_preview_image_save_path, anime_background_image_save_path, anime_poster_image_save_path,
     anime_card_image_save_path, episode_preview_image_save_path,
 )
 from apps.anime.exception import ManyTOPAnimeException
+from apps.anime.voiceover_status import VoiceoverStateMachine
 from apps.user.models import Group
 
 # Create your models here.
@@ -67,9 +74,26 @@ class Anime(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
     release_day_of_week = models.CharField(choices=DayOfWeekChoices.choices, null=True, blank=True)
     country = CountryField(null=True, blank=True)
     trailer_url = models.URLField(null=True, blank=True)
+    # denormalized counters, kept in sync by 'apps.anime.signals' and rebuilt by 'rebuild_anime_counters'
+    count_episodes = models.PositiveIntegerField(default=0, editable=False)
+    count_like = models.PositiveIntegerField(default=0, editable=False)
+    count_dislike = models.PositiveIntegerField(default=0, editable=False)
+    # weighted title, other_title and description, kept in sync by 'apps.anime.signals'
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = AnimeManager()
 
+    class Meta:
+        indexes = [
+            # keys of the cursor pagination of the anime list
+            models.Index(fields=['-created', '-id'], name='anime_created_id_idx'),
+            models.Index(fields=['-count_like', '-id'], name='anime_count_like_id_idx'),
+            # full-text and trigram search
+            GinIndex(fields=['search_vector'], name='anime_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='anime_title_trgm_idx'),
+            GinIndex(fields=['other_title'], opclasses=['gin_trgm_ops'], name='anime_other_title_trgm_idx'),
+        ]
+
     def __str__(self):
         return f'{self.title}'
 
@@ -78,17 +102,29 @@ class Anime(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
         self.slug = self.__class__.objects.normalize_slug(self.title)
 
     def get_distinct_team(self):
-        return Group.objects.prefetch_related('voiceover_set__episode').filter(
-            voiceover__episode__in=self.episode_set.all()
-        ).distinct()
+        return Group.objects.select_related('settings').filter(
+            pk__in=PublishedVoiceover.objects.filter(anime_id=self.pk).values('team_id')
+        ).order_by('name')
 
-    def get_similar(self):
-        return Anime.objects.prefetch_related('genres').filter(
-            genres__in=self.genres.all()
-        )[:6]
+    def get_similar(self, limit: int = 6):
+        """
+        Anime sharing the most genres with this one, the most liked first.
+        Uses the prefetched genres when they are available.
+        """
+        genre_ids = [genre.id for genre in self.genres.all()]
+        if not genre_ids:
+            return Anime.objects.none()
+        return Anime.objects.filter(
+            genres__in=genre_ids
+        ).exclude(pk=self.pk).annotate(
+            count_shared_genres=Count('genres')
+        ).order_by('-count_shared_genres', '-count_like', '-id')[:limit]
 
     def get_count_by_reaction(self, reaction: ReactionChoices.values) -> int:
-        return self.reactions.filter(reaction=reaction).count()
+        return {
+            ReactionChoices.LIKE: self.count_like,
+            ReactionChoices.DISLIKE: self.count_dislike,
+        }[reaction]
 
     def process_new_history_event(self, event: AnimeHistoryEvents, **kwargs) -> 'AnimeHistory':
         history_record = self.anime_history.create(event=event, **kwargs)
@@ -154,6 +190,8 @@ class Episode(CreatedDateTimeMixin, UpdatedDateTimeMixin, OrderMixin, models.Mod
     end_ending = models.PositiveSmallIntegerField(help_text='in seconds', null=True, blank=True)
     preview_image = models.ImageField(upload_to=episode_preview_image_save_path, null=True, blank=True)
 
+    objects = EpisodeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-order']
         constraints = [
@@ -198,12 +236,20 @@ class Genre(models.Model):
 
 class Voiceover(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
     type = models.CharField(max_length=255, choices=VoiceoverTypes.choices)
-    episode = models.ForeignKey('anime.Episode', on_delete=models.CASCADE)
+    episode = models.ForeignKey('anime.Episode', on_delete=models.CASCADE, db_index=False)
     team = models.ForeignKey('user.Group', on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     status = models.CharField(choices=VoiceoverStatuses.choices, max_length=255)
     url = models.URLField()
 
+    objects = VoiceoverQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # public voiceovers of episodes, the index also serves lookups by the episode only
+            models.Index(fields=['episode', 'status', 'type'], name='voiceover_episode_status_idx'),
+        ]
+
     def __str__(self):
         return f'voiceover# {self.episode.title} ({self.team.name})'
 
@@ -211,32 +257,33 @@ class Voiceover(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
         return self.user != user
 
     def process_new_history_event(self, event: VoiceoverHistoryEvents, **kwargs) -> 'VoiceoverHistory':
-        old_status = self.status
-
-        history_record = self.voiceover_history.create(event=event, **kwargs)
-        self.revaluate_status()
-
-        if self.status != old_status:
-            history_record.status = self.status
-            history_record.save(update_fields=['status'])
+        """
+        The history record and the new status are saved together, with an INSERT and an UPDATE when
+        the status is changed. Use 'Voiceover.objects.process_new_history_event' for many voiceovers.
+        Statuses only get stronger, so an event which doesn't change the loaded status is just recorded,
+        otherwise the status is re-read under a row lock, a concurrent transition is not overwritten.
+        """
+        new_status = VoiceoverStateMachine.get_next_status(self.status, event)
+        if new_status == self.status:
+            return self.voiceover_history.create(event=event, **kwargs)
+
+        with transaction.atomic():
+            self.status = Voiceover.objects.select_for_update().values_list('status', flat=True).get(pk=self.pk)
+            new_status = VoiceoverStateMachine.get_next_status(self.status, event)
+            if new_status == self.status:
+                return self.voiceover_history.create(event=event, **kwargs)
+            history_record = self.voiceover_history.create(event=event, status=new_status, **kwargs)
+            self.status = new_status
+            self.save(update_fields=['status'])
 
         return history_record
 
     def revaluate_status(self):
         """
-        Note: should be called AFTER the voiceover history has been created
+        Recalculate the status from the whole history, with one query for the history events.
         """
-
-        history = self.voiceover_history
-
-        if history.filter(event=VoiceoverHistoryEvents.DECLINED).exists():
-            new_status = VoiceoverStatuses.DECLINED
-        elif history.filter(event=VoiceoverHistoryEvents.APPROVED).exists():
-            new_status = VoiceoverStatuses.APPROVED
-        elif history.filter(event=VoiceoverHistoryEvents.WAIT).exists():
-            new_status = VoiceoverStatuses.WAIT
-        else:
-            new_status = VoiceoverStatuses.CREATED
+        events = self.voiceover_history.order_by().values_list('event', flat=True).distinct()
+        new_status = VoiceoverStateMachine.get_status(events)
 
         if self.status != new_status:
             self.status = new_status
@@ -258,6 +305,32 @@ class VoiceoverHistory(CreatedDateTimeMixin, models.Model):
         ]
 
 
+class PublishedVoiceover(models.Model):
+    """
+    Materialized index of approved voiceovers: orders of the anime episodes published by the team.
+    It is rebuilt from 'Voiceover' on status transitions (see 'apps.anime.signals').
+    """
+    anime = models.ForeignKey('anime.Anime', on_delete=models.CASCADE, related_name='published_voiceovers')
+    team = models.ForeignKey('user.Group', on_delete=models.CASCADE, related_name='published_voiceovers')
+    type = models.CharField(max_length=255, choices=VoiceoverTypes.choices)
+    episodes = ArrayField(models.SmallIntegerField(), default=list)
+
+    objects = PublishedVoiceoverQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['anime', 'team', 'type'], name='unique_published_voiceover'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['team', 'anime'], name='published_voiceover_team_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.team_id} {self.type} of anime#{self.anime_id}'
+
+
 class Poster(CreatedDateTimeMixin, models.Model):
     anime = models.OneToOneField('anime.Anime', on_delete=models.CASCADE)
     image = models.ImageField(upload_to=anime_poster_image_save_path, null=True)
@@ -0,0 +1,89 @@
+import random
+from array import array
+from collections import OrderedDict
+from hashlib import md5
+from math import gcd
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.anime.models import Anime, Episode, Genre
+from apps.core.cache import get_cache_versions
+
+
+RandomAnimeCacheKey = 'random.{filters_hash}.{versions_hash}'
+RandomAnimeSessionKey = 'random_anime'
+
+RANDOM_ANIME_MODELS = (Anime, Episode, Genre)
+
+# the last (cache key, ids) of the process by filters, the shared cache is read only when versions are changed;
+# the least recently used filters are dropped above the limit
+local_random_anime_ids: 'OrderedDict[str, Tuple[str, array]]' = OrderedDict()
+LOCAL_RANDOM_ANIME_IDS_LIMIT = 256
+
+
+def get_random_anime_ids(genre: Optional[int] = None, anime_type: Optional[str] = None,
+                         accessible: bool = False) -> Tuple[str, array]:
+    """
+    :return: the cache key and the sorted array of ids of anime matching the filters.
+        The array is built with one query and cached until any of 'RANDOM_ANIME_MODELS' is changed,
+        the process keeps the deserialized array of the current versions.
+    """
+    versions = sorted(get_cache_versions(RANDOM_ANIME_MODELS).items())
+    filters_hash = md5(f'{genre}.{anime_type}.{accessible}'.encode(), usedforsecurity=False).hexdigest()
+    key = RandomAnimeCacheKey.format(
+        filters_hash=filters_hash,
+        versions_hash=md5(str(versions).encode(), usedforsecurity=False).hexdigest(),
+    )
+    local = local_random_anime_ids.get(filters_hash)
+    if local and local[0] == key:
+        local_random_anime_ids.move_to_end(filters_hash)
+        return local
+    ids = cache.get(key)
+    if ids is None:
+        queryset = Anime.objects.order_by('id')
+        if genre:
+            queryset = queryset.filter(genres=genre)
+        if anime_type:
+            queryset = queryset.filter(type=anime_type)
+        if accessible:
+            queryset = queryset.filter(episode__is_accessible=True)
+        ids = array('q', queryset.values_list('id', flat=True).distinct())
+        cache.set(key, ids, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    local_random_anime_ids[filters_hash] = key, ids
+    local_random_anime_ids.move_to_end(filters_hash)
+    while len(local_random_anime_ids) > LOCAL_RANDOM_ANIME_IDS_LIMIT:
+        local_random_anime_ids.popitem(last=False)
+    return key, ids
+
+
+def new_cycle(key: str, size: int) -> dict:
+    """
+    A random permutation of 'size' indexes without storing it: i -> (step * i + offset) % size
+    visits every index once when 'step' is coprime with 'size'.
+    """
+    step = random.randrange(1, size) if size > 1 else 1
+    while gcd(step, size) != 1:
+        step = random.randrange(1, size)
+    return {'key': key, 'step': step, 'offset': random.randrange(size), 'position': 0}
+
+
+def pick_random_anime_id(session=None, **filters) -> Optional[int]:
+    """
+    Random id of anime matching the filters. With a session, anime are not repeated until every anime
+    matching the filters is returned once (or the catalog is changed).
+    """
+    key, ids = get_random_anime_ids(**filters)
+    if not ids:
+        return None
+    if session is None:
+        return ids[random.randrange(len(ids))]
+
+    cycle = session.get(RandomAnimeSessionKey)
+    if not cycle or cycle['key'] != key or cycle['position'] >= len(ids):
+        cycle = new_cycle(key, len(ids))
+    index = (cycle['step'] * cycle['position'] + cycle['offset']) % len(ids)
+    cycle['position'] += 1
+    session[RandomAnimeSessionKey] = cycle
+    return ids[index]
@@ -8,7 +8,8 @@ from django.templatetags.static import static
 from apps.anime.models import (
     Director, Anime, Studio, Episode, PreviewImage, Genre, Voiceover, Poster, Arch, Reaction
 )
-from apps.anime.choices import ReactionChoices
+from apps.anime.choices import ReactionChoices, AnimeTypes
+from apps.core.serializers import DynamicFieldsSerializerMixin
 from apps.comment.models import Comment
 from apps.user.models import Group
 
@@ -59,17 +60,12 @@ class StudioSerializer(serializers.ModelSerializer):
 
 
 class ResponseAnimeListSerializer(serializers.ModelSerializer):
-    count_episodes = serializers.SerializerMethodField()
-
     class Meta:
         model = Anime
         fields = [
             'id', 'slug', 'title', 'count_episodes', 'type', 'year', 'card_image'
         ]
 
-    def get_count_episodes(self, obj: Anime):
-        return obj.episode_set.count()
-
 
 class ChildTeamSerializer(serializers.ModelSerializer):
     value = serializers.SerializerMethodField()
@@ -133,7 +129,7 @@ class ResponseAnimeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Anime
-        exclude = ['updated', 'created', 'is_top']
+        exclude = ['updated', 'created', 'is_top', 'count_like', 'count_dislike', 'search_vector']
 
     def get_start_date(self, obj: Anime):
         start_date_str = _date(obj.start_date, 'd F Y')
@@ -151,7 +147,7 @@ class ResponseAnimeSerializer(serializers.ModelSerializer):
         return [start_params, end_params] if end_params else start_params
 
     def get_count_episodes(self, obj: Anime):
-        count_episodes = obj.episode_set.count()
+        count_episodes = obj.count_episodes
         return {
             'value': count_episodes,
             'get_params': QueryDict(f'episode_lte={count_episodes}').urlencode(),
@@ -197,17 +193,12 @@ class ResponsePaginatedAnimeListSerializer(serializers.Serializer):
 
 
 class ChildAnimePosterSerializer(serializers.ModelSerializer):
-    count_episodes = serializers.SerializerMethodField()
-
     class Meta:
         model = Anime
         fields = [
             'id', 'slug', 'title', 'count_episodes'
         ]
 
-    def get_count_episodes(self, obj: Anime):
-        return obj.episode_set.count()
-
 
 class ResponsePostersSerializer(serializers.ModelSerializer):
     anime = ChildAnimePosterSerializer(read_only=True)
@@ -252,6 +243,14 @@ class ResponseFiltersAnimeSerializer(serializers.Serializer):
     status = serializers.JSONField()
     type = serializers.JSONField()
     season = serializers.JSONField()
+    counts = serializers.JSONField(required=False, help_text='Number of anime by option, only with "with_counts"')
+
+
+class RequestAnimeRandomSerializer(serializers.Serializer):
+    genre = serializers.PrimaryKeyRelatedField(queryset=Genre.objects.all(), required=False)
+    type = serializers.ChoiceField(choices=AnimeTypes.choices, required=False)
+    accessible = serializers.BooleanField(default=False, help_text='Only anime with accessible episodes')
+    no_repeat = serializers.BooleanField(default=False, help_text='Do not repeat anime within the session')
 
 
 class ResponseAnimeRandomSerializer(serializers.ModelSerializer):
@@ -260,6 +259,17 @@ class ResponseAnimeRandomSerializer(serializers.ModelSerializer):
         fields = ['id', 'slug']
 
 
+class RequestAnimeAutocompleteSerializer(serializers.Serializer):
+    search = serializers.CharField(max_length=255)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
+
+
+class ResponseAnimeAutocompleteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Anime
+        fields = ['id', 'slug', 'title']
+
+
 class EpisodeVoiceoverSerializer(serializers.ModelSerializer):
     value = serializers.SerializerMethodField()
 
@@ -281,6 +291,24 @@ class ResponseAnimeEpisodeSerializer(serializers.ModelSerializer):
                   'start_opening', 'end_opening', 'start_ending', 'end_ending']
 
 
+class ResponseAnimeEpisodesSerializer(DynamicFieldsSerializerMixin, ResponseAnimeEpisodeSerializer):
+    class Meta(ResponseAnimeEpisodeSerializer.Meta):
+        fields = ['order'] + ResponseAnimeEpisodeSerializer.Meta.fields
+
+
+class RequestAnimeEpisodesSerializer(serializers.Serializer):
+    order_gte = serializers.IntegerField(required=False, min_value=0)
+    order_lte = serializers.IntegerField(required=False, min_value=0)
+    fields = serializers.CharField(required=False, help_text='Comma separated fields, for example "order,voiceover"')
+
+    def validate_fields(self, value: str):
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = set(fields) - set(ResponseAnimeEpisodesSerializer.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(f'Невідомі поля: {", ".join(sorted(unknown))}')
+        return fields
+
+
 class ResponseCommentAnimeSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username')
     avatar = serializers.SerializerMethodField()
@@ -0,0 +1,144 @@
+import threading
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.anime.choices import VoiceoverStatuses
+from apps.anime.models import (
+    Anime, Episode, Reaction, Voiceover, Poster, Genre, Studio, Director, Arch, PreviewImage, PublishedVoiceover
+)
+from apps.core.cache import register_versioned_model
+from apps.user.models import Group, GroupSettings
+
+
+register_versioned_model(
+    Anime, Episode, Reaction, Voiceover, Poster, Genre, Studio, Director, Arch, PreviewImage, PublishedVoiceover,
+    Group, GroupSettings,
+)
+
+
+@receiver([post_save, post_delete], sender=Episode)
+def refresh_anime_count_episodes(sender, instance: Episode, **kwargs):
+    # the previous anime of a moved episode loses it (see 'collect_previous_anime_of_episode')
+    anime_ids = {instance.anime_id, getattr(instance, '_previous_anime_id', None)} - {None}
+    Anime.objects.filter(pk__in=anime_ids).refresh_counters(reactions=False)
+
+
+@receiver([post_save, post_delete], sender=Reaction)
+def refresh_anime_count_reactions(sender, instance: Reaction, **kwargs):
+    Anime.objects.filter(pk=instance.anime_id).refresh_counters(episodes=False)
+
+
+class PendingPublishedVoiceovers(threading.local):
+    """
+    Anime and episodes (resolved to their anime at the rebuild) changed by the current transaction
+    of the thread. Ids left by a rolled back transaction are rebuilt after the next commit.
+    """
+    def __init__(self):
+        self.anime_ids, self.episode_ids = set(), set()
+
+
+pending_published_voiceovers = PendingPublishedVoiceovers()
+
+
+def schedule_published_voiceovers_rebuild(anime_ids=(), episode_ids=()):
+    """
+    The published voiceovers of the collected anime are rebuilt once after the commit of the current
+    transaction (at once outside of transactions), instead of a rebuild per changed row.
+    """
+    if not anime_ids and not episode_ids:
+        return
+    pending_published_voiceovers.anime_ids.update(anime_ids)
+    pending_published_voiceovers.episode_ids.update(episode_ids)
+    transaction.on_commit(rebuild_pending_published_voiceovers)
+
+
+def rebuild_pending_published_voiceovers():
+    anime_ids, episode_ids = pending_published_voiceovers.anime_ids, pending_published_voiceovers.episode_ids
+    if not anime_ids and not episode_ids:  # already rebuilt by a callback registered earlier
+        return
+    pending_published_voiceovers.anime_ids, pending_published_voiceovers.episode_ids = set(), set()
+    if episode_ids:
+        anime_ids |= set(Episode.objects.filter(pk__in=episode_ids).values_list('anime_id', flat=True))
+    PublishedVoiceover.objects.rebuild(anime_ids=anime_ids)
+
+
+def is_deleted_with(origin, model) -> bool:
+    """
+    Whether the deletion has been started by an instance or a queryset of the model.
+    """
+    return isinstance(origin, model) or isinstance(origin, QuerySet) and issubclass(origin.model, model)
+
+
+def get_changed_fields(sender, instance, fields, update_fields=None) -> Optional[dict]:
+    """
+    The stored values of the fields (attnames) which differ from the instance, None if nothing is changed.
+    New instances have no stored values, an empty dict is returned.
+    """
+    if update_fields is not None and not {
+        name for field in fields for name in (field, sender._meta.get_field(field).attname)
+    } & set(update_fields):
+        return None
+    if instance._state.adding:
+        return {}
+    attnames = [sender._meta.get_field(field).attname for field in fields]
+    previous = sender.objects.filter(pk=instance.pk).values(*attnames).first()
+    if previous is None:
+        return {}
+    if all(previous[attname] == getattr(instance, attname) for attname in attnames):
+        return None
+    return previous
+
+
+@receiver(pre_save, sender=Episode)
+def collect_previous_anime_of_episode(sender, instance: Episode, update_fields=None, **kwargs):
+    previous = get_changed_fields(sender, instance, ['anime', 'order'], update_fields)
+    # the previous anime loses the episode when it is moved, its counters and published voiceovers are refreshed
+    instance._previous_anime_id = previous['anime_id'] if previous else None
+    instance._published_anime_ids = {previous['anime_id'], instance.anime_id} if previous else set()
+
+
+@receiver(post_save, sender=Episode)
+def refresh_published_voiceovers_of_episode(sender, instance: Episode, **kwargs):
+    schedule_published_voiceovers_rebuild(anime_ids=getattr(instance, '_published_anime_ids', ()))
+
+
+@receiver(post_delete, sender=Episode)
+def refresh_published_voiceovers_of_deleted_episode(sender, instance: Episode, origin=None, **kwargs):
+    # published voiceovers of a deleted anime are deleted by the cascade
+    if not is_deleted_with(origin, Anime):
+        schedule_published_voiceovers_rebuild(anime_ids=[instance.anime_id])
+
+
+@receiver(pre_save, sender=Voiceover)
+def collect_published_voiceovers_of_voiceover(sender, instance: Voiceover, update_fields=None, **kwargs):
+    previous = get_changed_fields(sender, instance, ['status', 'type', 'team', 'episode'], update_fields)
+    instance._published_episode_ids = set()
+    if previous is None:
+        return
+    # the previous episode (and its anime) is rebuilt as well, when the voiceover is moved to another one
+    for status, episode_id in ((previous.get('status'), previous.get('episode_id')),
+                               (instance.status, instance.episode_id)):
+        if status == VoiceoverStatuses.APPROVED:
+            instance._published_episode_ids.add(episode_id)
+
+
+@receiver(post_save, sender=Voiceover)
+def refresh_published_voiceovers(sender, instance: Voiceover, **kwargs):
+    schedule_published_voiceovers_rebuild(episode_ids=getattr(instance, '_published_episode_ids', ()))
+
+
+@receiver(post_delete, sender=Voiceover)
+def refresh_published_voiceovers_of_deleted_voiceover(sender, instance: Voiceover, origin=None, **kwargs):
+    # deletions of episodes rebuild their anime
+    if instance.status == VoiceoverStatuses.APPROVED and not is_deleted_with(origin, (Anime, Episode)):
+        schedule_published_voiceovers_rebuild(episode_ids=[instance.episode_id])
+
+
+@receiver(post_save, sender=Anime)
+def refresh_anime_search_vector(sender, instance: Anime, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'other_title', 'description'} & set(update_fields):
+        Anime.objects.filter(pk=instance.pk).refresh_search_vector()
@@ -6,7 +6,8 @@ from apps.anime.serializers import (
     ResponseAnimeSerializer,
     ResponsePaginatedAnimeListSerializer, ResponsePostersSerializer, ResponseFiltersAnimeSerializer,
     ResponseAnimeRandomSerializer, ResponseAnimeEpisodeSerializer, ResponsePaginatedCommentAnimeListSerializer,
-    ResponseAnimeArchSerializer, ResponseAnimeReactSerializer
+    ResponseAnimeArchSerializer, ResponseAnimeReactSerializer, ResponseAnimeAutocompleteSerializer,
+    ResponseAnimeEpisodesSerializer,
 )
 
 
@@ -281,6 +282,52 @@ class AnimeRandomAPIViewDoc(BaseSwaggerAPIViewDoc):
                 'slug': '<str: slug>'
             }},
         ),
+        status.HTTP_404_NOT_FOUND: openapi.Response(
+            'Not Found.',
+            examples={
+                'application/json': {
+                    "errors": [
+                        {
+                            "message": "Аніме не знайдено",
+                        },
+                    ]
+                }
+            },
+        ),
+    }
+
+
+class AnimeAutocompleteAPIViewDoc(BaseSwaggerAPIViewDoc):
+    """
+        It is a Swagger doc for 'AnimeAutocompleteAPIView'
+    """
+    tags = [SwaggerTags.ANIME]
+
+    responses = {
+        status.HTTP_200_OK: openapi.Response(
+            'Ok.',
+            ResponseAnimeAutocompleteSerializer(many=True),
+            examples={'application/json': [
+                {
+                    'id': 1,
+                    'slug': '<str: slug>',
+                    'title': '<str: title>',
+                },
+            ]},
+        ),
+        status.HTTP_400_BAD_REQUEST: openapi.Response(
+            'Bad Request.',
+            examples={
+                'application/json': {
+                    "errors": [
+                        {
+                            "message": "Це поле обов'язкове.",
+                            "location": "search",
+                        },
+                    ]
+                }
+            },
+        ),
     }
 
 
@@ -319,6 +366,54 @@ class ResponseAnimeEpisodeAPIViewDoc(BaseSwaggerAPIViewDoc):
     }
 
 
+class AnimeEpisodesAPIViewDoc(BaseSwaggerAPIViewDoc):
+    """
+        It is a Swagger doc for 'AnimeEpisodesAPIView'
+    """
+    tags = [SwaggerTags.ANIME]
+    description = 'Episodes of the anime ordered by "order". The response has a strong ETag for "If-None-Match".'
+
+    responses = {
+        status.HTTP_200_OK: openapi.Response(
+            'Ok.',
+            ResponseAnimeEpisodesSerializer(many=True),
+            examples={'application/json': [
+                {
+                    "order": 1,
+                    "title": "<str: title>",
+                    "voiceover": [
+                        {
+                            "value": "<str: value>",
+                            "url": "<str: url>",
+                        }
+                    ],
+                    "subtitles": [],
+                    "preview_image": None,
+                    "id": 24,
+                    "start_opening": None,
+                    "end_opening": None,
+                    "start_ending": None,
+                    "end_ending": None
+                },
+            ]},
+        ),
+        status.HTTP_304_NOT_MODIFIED: openapi.Response('Not Modified.'),
+        status.HTTP_400_BAD_REQUEST: openapi.Response(
+            'Bad Request.',
+            examples={
+                'application/json': {
+                    "errors": [
+                        {
+                            "message": "Невідомі поля: <str: field>",
+                            "location": "fields",
+                        },
+                    ]
+                }
+            },
+        ),
+    }
+
+
 class CommentAnimeAPIViewDoc(BaseSwaggerAPIViewDoc):
     """
         It is a Swagger doc for 'CommentAnimeAPIView'
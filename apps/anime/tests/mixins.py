@@ -0,0 +1,22 @@
+from datetime import date
+
+from apps.anime.models import Anime, Episode
+from apps.anime.choices import AnimeTypes, RatingTypes
+
+
+class AnimeProviderMixin:
+    @classmethod
+    def create_anime(cls, title: str = 'Anime', episodes: int = 0, **kwargs) -> Anime:
+        anime = Anime.objects.create(
+            title=title,
+            slug=Anime.objects.normalize_slug(title),
+            type=kwargs.pop('type', AnimeTypes.SERIAL),
+            rating=kwargs.pop('rating', RatingTypes.PG13),
+            start_date=kwargs.pop('start_date', date(2024, 1, 1)),
+            year=kwargs.pop('year', 2024),
+            **kwargs
+        )
+        for order in range(1, episodes + 1):
+            Episode.objects.create(title=f'Episode {order}', anime=anime, order=order, status='RELEASED')
+        anime.refresh_from_db()
+        return anime
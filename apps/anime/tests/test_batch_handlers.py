@@ -0,0 +1,19 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.anime.batch_handlers import get_anime_ids, rebuild_anime_counters
+
+
+class BatchHandlersTest(SimpleTestCase):
+    def test_get_anime_ids(self):
+        self.assertEqual(get_anime_ids([{'kwargs': {'anime': [3, 1]}}, {'kwargs': {'anime': [1, 2]}}]), [1, 2, 3])
+        self.assertIsNone(get_anime_ids([{'kwargs': {'anime': [1]}}, {'kwargs': {}}]))  # all Anime
+        with self.assertRaises(ValueError):
+            get_anime_ids([{'command': 'rebuild_anime_counters', 'args': ['--anime', '1']}])
+
+    @mock.patch('apps.anime.batch_handlers.call_command')
+    def test_rebuild_anime_counters(self, call_command):
+        rebuild_anime_counters([{'kwargs': {'anime': [1]}}, {'kwargs': {'anime': [2]}}])
+
+        call_command.assert_called_once_with('rebuild_anime_counters', anime=[1, 2])
@@ -0,0 +1,106 @@
+import io
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.anime.catalog_import import CatalogImporter, read_catalog_rows
+from apps.anime.models import Anime, Episode, Genre, Studio, Director
+from apps.anime.tests.mixins import AnimeProviderMixin
+
+
+class CatalogImporterTest(AnimeProviderMixin, TestCase):
+    def get_row(self, index: int, **kwargs) -> dict:
+        return {
+            'title': f'Anime {index}', 'type': 'SERIAL', 'rating': 'PG13', 'start_date': '2024-01-01',
+            'year': 2024, 'director': 'First Last', 'genres': ['Drama', f'Genre {index % 2}'], 'studios': ['Studio'],
+            'arches': [{'order': 1, 'title': 'Arch'}],
+            'episodes': [{'order': order, 'arch': 1} for order in range(1, 4)],
+            **kwargs
+        }
+
+    def test_jsonl(self):
+        content = '\n'.join(json.dumps(self.get_row(index)) for index in range(5))
+
+        stats = CatalogImporter(batch_size=2).run(read_catalog_rows(io.StringIO(content), 'jsonl'))
+
+        self.assertEqual((stats.rows, stats.created, stats.updated, stats.episodes, stats.errors), (5, 5, 0, 15, []))
+        anime = Anime.objects.get(slug='anime-1')
+        self.assertEqual(anime.count_episodes, 3)
+        self.assertEqual(anime.director.full_name, 'First Last')
+        self.assertEqual(sorted(anime.genres.values_list('name', flat=True)), ['Drama', 'Genre 1'])
+        self.assertEqual(set(anime.episode_set.values_list('arch__title', flat=True)), {'Arch'})
+        self.assertEqual((Genre.objects.count(), Studio.objects.count(), Director.objects.count()), (3, 1, 1))
+        self.assertTrue(Anime.objects.search('anime').exists())
+
+    def test_batch_queries_do_not_depend_on_rows(self):
+        importer = CatalogImporter(batch_size=100)
+        importer.run([self.get_row(0), self.get_row(1)])  # fill the name caches
+        for start, count in ((2, 1), (3, 20)):
+            # savepoint, existing slugs, anime, m2m (x4), arches (x2), episodes, counters, search vectors, release
+            with self.subTest(count=count), self.assertNumQueries(13):
+                importer.run([self.get_row(index) for index in range(start, start + count)])
+
+    def test_upsert_by_slug(self):
+        anime = self.create_anime(title='Anime 1', episodes=5)
+
+        stats = CatalogImporter().run([
+            {'title': 'Anime 1', 'description': 'updated', 'episodes': [{'order': 1, 'title': 'Renamed'}]},
+        ])
+
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        anime.refresh_from_db()
+        self.assertEqual((anime.description, anime.type, anime.count_episodes), ('updated', 'SERIAL', 5))
+        self.assertEqual(anime.episode_set.get(order=1).title, 'Renamed')
+
+    def test_update_keeps_missing_director(self):
+        CatalogImporter().run([self.get_row(1, director='Hayao Miyazaki')])
+
+        CatalogImporter().run([{'title': 'Anime 1', 'description': 'updated'}])
+
+        self.assertEqual(Anime.objects.get().director.full_name, 'Hayao Miyazaki')
+
+    def test_nested_errors(self):
+        rows = [
+            self.get_row(1, episodes=[{'title': 'No order'}]),
+            self.get_row(2, episodes=[{'order': 'first'}]),
+            self.get_row(3, episodes=[{'order': 1, 'arch': 'first'}]),
+            self.get_row(4, episodes=[{'order': 1, 'release_date': '2024-13-01'}]),
+            self.get_row(5, arches=[{'title': 'No order'}]),
+            self.get_row(6, episodes=[{'order': 1}, {'order': 1}]),
+            self.get_row(7, episodes='many'),
+            self.get_row(8),
+        ]
+
+        stats = CatalogImporter().run(rows)
+
+        self.assertEqual(stats.created, 1)
+        self.assertEqual([row_number for row_number, _ in stats.errors], [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(stats.errors[0][1], 'episodes[1].order: This field is required.')
+        self.assertTrue(stats.errors[2][1].startswith('episodes[1].arch:'))
+        self.assertTrue(stats.errors[3][1].startswith('episodes[1].release_date:'))
+        self.assertEqual(Anime.objects.get().slug, 'anime-8')
+
+    def test_csv_and_errors(self):
+        content = (
+            'title,type,rating,start_date,year,genres,episodes\n'
+            'Anime 1,SERIAL,PG13,2024-01-01,2024,Drama|Comedy,2\n'
+            'Anime 2,UNKNOWN,PG13,2024-01-01,2024,,\n'
+            'Anime 3,FILM,PG13,not a date,2024,,\n'
+            'Anime 4,FILM,,2024-01-01,2024,,\n'
+        )
+
+        stats = CatalogImporter().run(read_catalog_rows(io.StringIO(content), 'csv'))
+
+        self.assertEqual((stats.created, stats.episodes), (1, 2))
+        self.assertEqual([row_number for row_number, _ in stats.errors], [2, 3, 4])
+        self.assertTrue(stats.errors[0][1].startswith('type:'))
+        self.assertEqual(stats.errors[2][1], 'Missing fields: rating')
+        self.assertEqual(Anime.objects.get().genres.count(), 2)
+
+    def test_generate_tests_anime_command(self):
+        call_command('generate_tests_anime', anime=30, episodes=45, posters=3, batch_size=10, stdout=StringIO())
+
+        self.assertEqual(Anime.objects.count(), 30)
+        self.assertEqual(Episode.objects.count(), 45)
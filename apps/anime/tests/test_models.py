@@ -0,0 +1,266 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.test import TestCase, TransactionTestCase
+
+from apps.anime.models import Anime, Episode, Reaction, Voiceover, VoiceoverHistory, PublishedVoiceover
+from apps.anime.choices import ReactionChoices, VoiceoverTypes, VoiceoverStatuses, VoiceoverHistoryEvents
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.anime.voiceover_status import VoiceoverStateMachine
+from apps.user.models import Group
+
+UserModel = get_user_model()
+
+
+class AnimeCountersTest(AnimeProviderMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first_user = UserModel.objects.create(username='first', email='first@example.com')
+        cls.second_user = UserModel.objects.create(username='second', email='second@example.com')
+
+    def test_count_episodes_follows_episode_writes(self):
+        anime = self.create_anime(episodes=3)
+        anime.refresh_from_db()
+        self.assertEqual(anime.count_episodes, 3)
+
+        Episode.objects.filter(anime=anime, order=1).first().delete()
+        anime.refresh_from_db()
+        self.assertEqual(anime.count_episodes, 2)
+
+    def test_count_episodes_follows_moved_episode(self):
+        anime, other = self.create_anime(episodes=2), self.create_anime(title='Other', episodes=1)
+        episode = anime.episode_set.get(order=2)
+        episode.anime = other
+        episode.save()
+
+        anime.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((anime.count_episodes, other.count_episodes), (1, 2))
+
+    def test_count_reactions_follows_reaction_writes(self):
+        anime = self.create_anime()
+        Reaction.objects.create(user=self.first_user, anime=anime, reaction=ReactionChoices.LIKE)
+        reaction = Reaction.objects.create(user=self.second_user, anime=anime, reaction=ReactionChoices.LIKE)
+        anime.refresh_from_db()
+        self.assertEqual((anime.count_like, anime.count_dislike), (2, 0))
+
+        reaction.reaction = ReactionChoices.DISLIKE
+        reaction.save()
+        anime.refresh_from_db()
+        self.assertEqual((anime.count_like, anime.count_dislike), (1, 1))
+
+        reaction.delete()
+        anime.refresh_from_db()
+        self.assertEqual((anime.count_like, anime.count_dislike), (1, 0))
+        self.assertEqual(anime.get_count_by_reaction(ReactionChoices.LIKE), 1)
+
+    def test_rebuild_anime_counters_command(self):
+        anime = self.create_anime(episodes=2)
+        Anime.objects.filter(pk=anime.pk).update(count_episodes=0, count_like=5)
+
+        call_command('rebuild_anime_counters', stdout=StringIO())
+
+        anime.refresh_from_db()
+        self.assertEqual((anime.count_episodes, anime.count_like, anime.count_dislike), (2, 0, 0))
+
+
+class PublishedVoiceoverTest(AnimeProviderMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime = cls.create_anime(episodes=3)
+        cls.team = Group.objects.create(name='Team')
+        cls.episodes = list(cls.anime.episode_set.order_by('order'))
+
+    def create_voiceover(self, episode: Episode, status: str = VoiceoverStatuses.CREATED) -> Voiceover:
+        return Voiceover.objects.create(
+            episode=episode, team=self.team, type=VoiceoverTypes.VOICEOVER, status=status,
+            url='https://example.com/'
+        )
+
+    def get_published(self):
+        return list(PublishedVoiceover.objects.filter(anime=self.anime).values_list('team_id', 'type', 'episodes'))
+
+    def test_follows_status_transitions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceovers = [self.create_voiceover(episode) for episode in self.episodes]
+        self.assertEqual(self.get_published(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceovers[2].process_new_history_event(event=VoiceoverHistoryEvents.APPROVED)
+            voiceovers[0].process_new_history_event(event=VoiceoverHistoryEvents.APPROVED)
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [1, 3])])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceovers[2].process_new_history_event(event=VoiceoverHistoryEvents.DECLINED)
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [1])])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceovers[0].delete()
+        self.assertEqual(self.get_published(), [])
+
+    def test_follows_episode_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_voiceover(self.episodes[0], status=VoiceoverStatuses.APPROVED)
+            Episode.objects.filter(pk__in=[episode.pk for episode in self.episodes[1:]]).delete()
+            self.episodes[0].order = 5
+            self.episodes[0].save()
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [5])])
+
+    def test_rebuilds_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceovers = [self.create_voiceover(episode, status=VoiceoverStatuses.APPROVED)
+                          for episode in self.episodes]
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [1, 2, 3])])
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(PublishedVoiceover.objects, 'rebuild') as rebuild:
+            voiceovers[0].url = 'https://example.com/other/'
+            voiceovers[0].save()
+        rebuild.assert_not_called()  # the published fields are not changed
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.anime.episode_set.filter(order__gt=1).delete()
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [1])])
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(PublishedVoiceover.objects, 'rebuild') as rebuild:
+            Anime.objects.filter(pk=self.anime.pk).delete()
+        rebuild.assert_not_called()  # published voiceovers of the anime are deleted by the cascade
+
+    def test_moved_voiceover_rebuilds_both_anime(self):
+        other = self.create_anime(title='Other', episodes=1)
+        voiceover = self.create_voiceover(self.episodes[0], status=VoiceoverStatuses.APPROVED)
+        with self.captureOnCommitCallbacks(execute=True):
+            voiceover.episode = other.episode_set.get()
+            voiceover.save()
+        self.assertEqual(self.get_published(), [])
+        self.assertEqual(PublishedVoiceover.objects.get(anime=other).episodes, [1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            episode = other.episode_set.get()
+            episode.anime = self.anime
+            episode.order = 4
+            episode.save()
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [4])])
+        self.assertFalse(PublishedVoiceover.objects.filter(anime=other).exists())
+
+    def test_rebuild_published_voiceovers_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_voiceover(self.episodes[0], status=VoiceoverStatuses.APPROVED)
+        PublishedVoiceover.objects.all().delete()
+
+        call_command('rebuild_published_voiceovers', stdout=StringIO())
+
+        self.assertEqual(self.get_published(), [(self.team.pk, VoiceoverTypes.VOICEOVER, [1])])
+
+
+class ConcurrentRebuildTest(AnimeProviderMixin, TransactionTestCase):
+    def test_approvals_of_one_anime_are_serialized(self):
+        anime = self.create_anime(episodes=2)
+        team = Group.objects.create(name='Team')
+        first, second = [
+            Voiceover.objects.create(episode=episode, team=team, type=VoiceoverTypes.VOICEOVER,
+                                     status=VoiceoverStatuses.WAIT, url='https://example.com/')
+            for episode in anime.episode_set.order_by('order')
+        ]
+        rebuilt, errors = threading.Event(), []
+
+        def approve(voiceover: Voiceover, hold: bool = False):
+            try:
+                with transaction.atomic():
+                    voiceover.process_new_history_event(event=VoiceoverHistoryEvents.APPROVED)
+                    if hold:  # the first approval isn't committed while the second one is committed and rebuilt
+                        rebuilt.set()
+                        time.sleep(0.5)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=approve, args=(first, True)),
+                   threading.Thread(target=approve, args=(second,))]
+        threads[0].start()
+        rebuilt.wait(5)
+        threads[1].start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(PublishedVoiceover.objects.get(anime=anime).episodes, [1, 2])
+
+
+class VoiceoverStatusTest(AnimeProviderMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime = cls.create_anime(episodes=5)
+        cls.team = Group.objects.create(name='Team')
+        cls.user = UserModel.objects.create(username='moderator', email='moderator@example.com')
+
+    def setUp(self):
+        self.voiceovers = [
+            Voiceover.objects.create(
+                episode=episode, team=self.team, type=VoiceoverTypes.VOICEOVER, status=VoiceoverStatuses.WAIT,
+                url='https://example.com/'
+            )
+            for episode in self.anime.episode_set.all()
+        ]
+
+    def test_state_machine(self):
+        for events, expected in (
+            ([], VoiceoverStatuses.CREATED),
+            ([VoiceoverHistoryEvents.CREATED, VoiceoverHistoryEvents.WAIT], VoiceoverStatuses.WAIT),
+            ([VoiceoverHistoryEvents.APPROVED, VoiceoverHistoryEvents.COMMENT], VoiceoverStatuses.APPROVED),
+            ([VoiceoverHistoryEvents.DECLINED, VoiceoverHistoryEvents.APPROVED], VoiceoverStatuses.DECLINED),
+        ):
+            with self.subTest(events=events):
+                self.assertEqual(VoiceoverStateMachine.get_status(events), expected)
+        self.assertEqual(VoiceoverStateMachine.get_next_status('', VoiceoverHistoryEvents.COMMENT),
+                         VoiceoverStatuses.CREATED)
+
+    def test_single_event_queries(self):
+        voiceover = self.voiceovers[0]
+        with self.assertNumQueries(1):  # the status is not changed, the history only
+            voiceover.process_new_history_event(event=VoiceoverHistoryEvents.COMMENT, message='note')
+
+        history = voiceover.process_new_history_event(event=VoiceoverHistoryEvents.APPROVED, user=self.user)
+        voiceover.refresh_from_db()
+        self.assertEqual((voiceover.status, history.status), (VoiceoverStatuses.APPROVED, VoiceoverStatuses.APPROVED))
+
+        voiceover.revaluate_status()
+        self.assertEqual(voiceover.status, VoiceoverStatuses.APPROVED)
+
+    def test_single_event_rereads_the_status(self):
+        stale = Voiceover.objects.get(pk=self.voiceovers[0].pk)
+        self.voiceovers[0].process_new_history_event(event=VoiceoverHistoryEvents.DECLINED)
+
+        history = stale.process_new_history_event(event=VoiceoverHistoryEvents.APPROVED, user=self.user)
+
+        self.assertEqual((stale.status, history.status), (VoiceoverStatuses.DECLINED, ''))
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, VoiceoverStatuses.DECLINED)
+
+    def test_batch_event(self):
+        self.voiceovers[0].process_new_history_event(event=VoiceoverHistoryEvents.DECLINED)
+        queryset = Voiceover.objects.filter(episode__anime=self.anime)
+
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(PublishedVoiceover.objects, 'rebuild', wraps=PublishedVoiceover.objects.rebuild) \
+                as rebuild:
+            count = queryset.process_new_history_event(event=VoiceoverHistoryEvents.APPROVED, user=self.user)
+        rebuild.assert_called_once()  # after the commit, as on saves of voiceovers
+        self.assertIn(self.anime.pk, rebuild.call_args.kwargs['anime_ids'])
+
+        self.assertEqual(count, 4)
+        self.assertEqual(
+            sorted(queryset.values_list('status', flat=True)),
+            [VoiceoverStatuses.APPROVED] * 4 + [VoiceoverStatuses.DECLINED],
+        )
+        self.assertEqual(VoiceoverHistory.objects.filter(event=VoiceoverHistoryEvents.APPROVED).count(), 5)
+        self.assertEqual(
+            PublishedVoiceover.objects.get(anime=self.anime).episodes, [1, 2, 3, 4]
+        )
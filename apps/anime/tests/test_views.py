@@ -0,0 +1,578 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase, APIRequestFactory
+
+from apps.anime.autocomplete import AnimePrefixIndex, anime_prefix_index
+from apps.anime.models import Anime, Poster, Genre, Studio, Director, Voiceover, Episode, Reaction
+from apps.anime.choices import VoiceoverTypes, VoiceoverStatuses, AnimeTypes, ReactionChoices
+from apps.anime.views import AnimeTOP100APIView
+from apps.anime.facets import get_anime_filter_facets
+from apps.anime.random_anime import local_random_anime_ids
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.user.models import Group, GroupSettings
+
+
+class AnimeListQueriesMixin(AnimeProviderMixin):
+    count_anime = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime_list = [
+            cls.create_anime(title=f'Anime {index}', episodes=index % 4, is_top=True)
+            for index in range(cls.count_anime)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def assertPageQueries(self, url: str, num: int, page_sizes=(1, 12), data: dict = None):
+        for page_size in page_sizes:
+            with self.subTest(page_size=page_size), self.assertNumQueries(num):
+                response = self.client.get(url, data={**(data or {}), 'page_size': page_size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['results']), page_size)
+
+
+class AnimeListAPIViewQueriesTest(AnimeListQueriesMixin, APITestCase):
+    def test_list_queries_do_not_depend_on_page_size(self):
+        # count + page
+        self.assertPageQueries(reverse('anime:get_anime_list'), 2)
+
+    def test_list_count_episodes(self):
+        response = self.client.get(reverse('anime:get_anime_list'), data={'page_size': self.count_anime})
+        count_episodes = {anime['id']: anime['count_episodes'] for anime in response.json()['results']}
+        self.assertEqual(count_episodes, {anime.id: anime.episode_set.count() for anime in self.anime_list})
+
+
+class AnimeListVoiceoverFilterTest(AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = Group.objects.create(name='Team')
+        cls.voiced = cls.create_anime(title='Voiced', episodes=3)
+        cls.waiting = cls.create_anime(title='Waiting', episodes=1)
+        cls.create_anime(title='Other', episodes=1)
+        with cls.captureOnCommitCallbacks(execute=True):
+            for episode in cls.voiced.episode_set.all():
+                for voiceover_type in VoiceoverTypes.values:
+                    Voiceover.objects.create(
+                        episode=episode, team=cls.team, type=voiceover_type,
+                        status=VoiceoverStatuses.APPROVED, url='https://example.com/'
+                    )
+        Voiceover.objects.create(
+            episode=cls.waiting.episode_set.get(), team=cls.team, type=VoiceoverTypes.VOICEOVER,
+            status=VoiceoverStatuses.WAIT, url='https://example.com/'
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_published_anime_once(self):
+        response = self.client.get(reverse('anime:get_anime_list'), data={'voiceover': self.team.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([anime['id'] for anime in response.json()['results']], [self.voiced.pk])
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_facet_counts(self):
+        facets = get_anime_filter_facets(with_counts=True)
+        self.assertEqual(facets['voiceover']['counts'], {str(self.team.pk): 1})
+
+
+class AnimeSearchAPIViewQueriesTest(AnimeListQueriesMixin, APITestCase):
+    def test_search_queries_do_not_depend_on_page_size(self):
+        # exists (typo fallback) + count + page
+        self.assertPageQueries(reverse('anime:search_anime'), 3, data={'search': 'anime'})
+
+
+class AnimeSearchAPIViewTest(AnimeProviderMixin, APITestCase):
+    url = reverse('anime:search_anime')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.naruto = cls.create_anime(title='Naruto Shippuden', other_title='Наруто')
+        cls.attack = cls.create_anime(title='Attack on Titan', other_title='Атака титанів')
+        cls.mention = cls.create_anime(title='Bleach', description='Not Naruto, but similar to it')
+
+    def search(self, text: str) -> list:
+        response = self.client.get(self.url, data={'search': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [anime['id'] for anime in response.json()['results']]
+
+    def test_title_is_ranked_above_description(self):
+        self.assertEqual(self.search('naruto'), [self.naruto.id, self.mention.id])
+
+    def test_other_title(self):
+        self.assertEqual(self.search('титанів'), [self.attack.id])
+
+    def test_prefix(self):
+        self.assertEqual(self.search('attack on tit'), [self.attack.id])
+
+    def test_typo(self):
+        self.assertEqual(self.search('shipuden'), [self.naruto.id])
+
+    def test_vector_follows_title_change(self):
+        self.attack.title = 'Shingeki no Kyojin'
+        self.attack.save()
+        self.assertEqual(self.search('kyojin'), [self.attack.id])
+        self.assertEqual(self.search('titan'), [])
+
+    def test_empty_search(self):
+        self.assertEqual(len(self.search('')), 3)
+        self.assertEqual(self.search('!!!'), [])
+
+
+class AnimeAutocompleteAPIViewTest(AnimeProviderMixin, APITestCase):
+    url = reverse('anime:autocomplete_anime')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.naruto = cls.create_anime(title='Naruto', other_title='Наруто')
+        cls.attack = cls.create_anime(title='Attack on Titan', other_title='Атака титанів')
+        cls.titanic = cls.create_anime(title='Titanic Story')
+
+    def tearDown(self):
+        cache.clear()
+
+    def autocomplete(self, search: str, **params) -> list:
+        response = self.client.get(self.url, data={'search': search, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [anime['id'] for anime in response.json()]
+
+    def test_fields(self):
+        response = self.client.get(self.url, data={'search': 'nar'})
+        self.assertEqual(response.json(), [{'id': self.naruto.id, 'slug': self.naruto.slug, 'title': 'Naruto'}])
+
+    def test_title_before_inner_word(self):
+        self.assertEqual(self.autocomplete('titan'), [self.titanic.id, self.attack.id])
+        self.assertEqual(self.autocomplete('titan', limit=1), [self.titanic.id])
+
+    def test_transliteration(self):
+        self.assertEqual(self.autocomplete('Атака тит'), [self.attack.id])
+        self.assertEqual(self.autocomplete('ataka'), [self.attack.id])
+        self.assertEqual(self.autocomplete('нар'), [self.naruto.id])
+
+    def test_index_follows_anime_changes(self):
+        self.assertEqual(self.autocomplete('bleach'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            bleach = self.create_anime(title='Bleach')
+        self.assertEqual(self.autocomplete('bleach'), [bleach.id])
+
+    def test_warm_index_without_queries(self):
+        anime_prefix_index.warm_up()
+        with self.assertNumQueries(0):
+            self.autocomplete('att')
+
+    def test_changes_are_merged_without_rebuild(self):
+        self.autocomplete('nar')
+        self.naruto.title = 'Boruto'
+        with mock.patch.object(anime_prefix_index, 'build', wraps=anime_prefix_index.build) as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.naruto.save()
+                bleach = self.create_anime(title='Bleach')
+            # the changed anime and the count and the sum of anime ids
+            with self.assertNumQueries(2):
+                self.assertEqual(self.autocomplete('bor'), [self.naruto.id])
+            self.assertEqual(self.autocomplete('ble'), [bleach.id])
+            self.assertEqual(self.autocomplete('titan'), [self.titanic.id, self.attack.id])
+        build.assert_not_called()
+
+    def test_deleted_anime_rebuild_index(self):
+        self.autocomplete('titan')
+        with self.captureOnCommitCallbacks(execute=True):
+            Anime.objects.filter(pk=self.titanic.pk).delete()
+
+        self.assertEqual(self.autocomplete('titan'), [self.attack.id])
+
+    def test_deleted_and_created_anime_rebuild_index(self):
+        self.autocomplete('titan')
+        with self.captureOnCommitCallbacks(execute=True):
+            Anime.objects.filter(pk=self.titanic.pk).delete()
+            bleach = self.create_anime(title='Bleach')
+
+        self.assertEqual(self.autocomplete('titan'), [self.attack.id])
+        self.assertEqual(self.autocomplete('ble'), [bleach.id])
+
+    def test_invalid_params(self):
+        for params in ({}, {'search': 'nar', 'limit': 100}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, data=params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnimePrefixIndexTest(SimpleTestCase):
+    rows = [(1, 'naruto', 'Naruto', 'Наруто'), (2, 'bleach', 'Bleach', ''), (3, 'one-piece', 'One Piece', 'Ван Піс')]
+    changes = [(2, 'bleach', 'Bleach: Thousand-Year Blood War', ''), (4, 'boruto', 'Boruto', 'Naruto Next')]
+
+    def test_update_equals_build(self):
+        expected = AnimePrefixIndex()
+        expected.build(self.rows[:1] + self.rows[2:] + self.changes)
+        for max_inserted_entries in (200, 0):  # inserts and merge
+            with self.subTest(max_inserted_entries=max_inserted_entries):
+                index = AnimePrefixIndex()
+                index.max_inserted_entries = max_inserted_entries
+                index.build(self.rows)
+
+                index.update(self.changes)
+
+                self.assertEqual(index.data, expected.data)
+
+    def test_benchmark_command(self):
+        output = StringIO()
+        call_command('benchmark_autocomplete', '--titles', '50', '--iterations', '10', stdout=output)
+        self.assertIn('search: count=10', output.getvalue())
+
+
+class AnimeRandomAPIViewTest(AnimeProviderMixin, APITestCase):
+    url = reverse('anime:get_random_anime')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = Genre.objects.create(name='Drama')
+        cls.serial = cls.create_anime(title='Serial', episodes=1)
+        cls.serial.genres.add(cls.genre)
+        cls.film = cls.create_anime(title='Film', type=AnimeTypes.FILM)
+        cls.ova = cls.create_anime(title='OVA', type=AnimeTypes.OVA, episodes=2)
+        Episode.objects.filter(anime=cls.ova, order=2).update(is_accessible=True)
+
+    def tearDown(self):
+        cache.clear()
+
+    def random(self, **params) -> int:
+        response = self.client.get(self.url, data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['id']
+
+    def test_random(self):
+        self.assertIn(self.random(), {self.serial.id, self.film.id, self.ova.id})
+
+    def test_queries(self):
+        with self.assertNumQueries(2):  # ids + slug
+            self.random()
+        with self.assertNumQueries(1):
+            self.random()
+
+    def test_ids_are_kept_by_process(self):
+        self.random()
+        with mock.patch('apps.anime.random_anime.cache') as shared_cache:
+            self.random()
+        shared_cache.get.assert_not_called()
+
+    def test_filters(self):
+        self.assertEqual(self.random(type=AnimeTypes.FILM), self.film.id)
+        self.assertEqual(self.random(genre=self.genre.id), self.serial.id)
+        self.assertEqual(self.random(accessible=True), self.ova.id)
+
+    def test_unknown_genre(self):
+        response = self.client.get(self.url, data={'genre': self.genre.id + 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ids_kept_by_process_are_limited(self):
+        with mock.patch('apps.anime.random_anime.LOCAL_RANDOM_ANIME_IDS_LIMIT', 2):
+            for anime_type in (AnimeTypes.FILM, AnimeTypes.OVA, AnimeTypes.SERIAL):
+                self.random(type=anime_type)
+            self.assertEqual(len(local_random_anime_ids), 2)
+
+    def test_no_repeat(self):
+        ids = [self.random(no_repeat=True) for _ in range(3)]
+        self.assertEqual(set(ids), {self.serial.id, self.film.id, self.ova.id})
+        self.random(no_repeat=True)  # the next cycle
+
+    def test_ids_follow_catalog_changes(self):
+        response = self.client.get(self.url, data={'type': AnimeTypes.ONA})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with self.captureOnCommitCallbacks(execute=True):
+            ona = self.create_anime(title='ONA', type=AnimeTypes.ONA)
+        self.assertEqual(self.random(type=AnimeTypes.ONA), ona.id)
+
+
+class AnimeEpisodesAPIViewTest(AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime = cls.create_anime(episodes=6)
+        teams = [Group.objects.create(name=f'Team {index}') for index in range(3)]
+        with cls.captureOnCommitCallbacks(execute=True):
+            for episode in Episode.objects.filter(anime=cls.anime):
+                for team in teams:
+                    Voiceover.objects.create(
+                        episode=episode, team=team, type=VoiceoverTypes.VOICEOVER,
+                        status=VoiceoverStatuses.APPROVED, url='https://example.com/'
+                    )
+                Voiceover.objects.create(
+                    episode=episode, team=teams[0], type=VoiceoverTypes.SUBTITLES,
+                    status=VoiceoverStatuses.APPROVED, url='https://example.com/'
+                )
+                Voiceover.objects.create(
+                    episode=episode, team=teams[1], type=VoiceoverTypes.VOICEOVER,
+                    status=VoiceoverStatuses.WAIT, url='https://example.com/'
+                )
+        cls.url = reverse('anime:get_anime_episodes', kwargs={'anime_pk': cls.anime.pk, 'anime_slug': cls.anime.slug})
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_episodes(self):
+        with self.assertNumQueries(3):  # episodes + voiceovers + subtitles
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        episodes = response.json()
+        self.assertEqual([episode['order'] for episode in episodes], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(len(episodes[0]['voiceover']), 3)
+        self.assertEqual(episodes[0]['subtitles'], [{'value': 'Team 0', 'url': 'https://example.com/'}])
+
+    def test_range_and_fields(self):
+        response = self.client.get(self.url, data={'order_gte': 2, 'order_lte': 3, 'fields': 'order,title'})
+        self.assertEqual(response.json(), [
+            {'order': 2, 'title': 'Episode 2'},
+            {'order': 3, 'title': 'Episode 3'},
+        ])
+
+    def test_unknown_fields(self):
+        response = self.client.get(self.url, data={'fields': 'order,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        team = Group.objects.get(name='Team 0')
+        team.name = 'Team Zero'
+        with self.captureOnCommitCallbacks(execute=True):
+            team.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_episode_queries_do_not_depend_on_voiceovers(self):
+        url = reverse('anime:get_anime_episode', kwargs={
+            'anime_pk': self.anime.pk, 'anime_slug': self.anime.slug, 'order': 1
+        })
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['voiceover']), 3)
+
+
+class AnimeTOP100APIViewQueriesTest(AnimeListQueriesMixin, APITestCase):
+    def test_top_queries_do_not_depend_on_page_size(self):
+        view = AnimeTOP100APIView.as_view()
+        for page_size in (1, 12):
+            request = APIRequestFactory().get('/', data={'page_size': page_size})
+            with self.subTest(page_size=page_size), self.assertNumQueries(2):
+                response = view(request)
+            self.assertEqual(len(response.data['results']), page_size)
+
+
+class PostersAnimeAPIViewQueriesTest(AnimeListQueriesMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for anime in cls.anime_list[:4]:
+            Poster.objects.create(anime=anime)
+
+    def test_posters_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('anime:get_anime_posters'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(poster['anime']['count_episodes'] for poster in response.json()),
+            sorted(anime.count_episodes for anime in self.anime_list[:4]),
+        )
+
+
+class AnimeAPIViewQueriesTest(AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genres = [Genre.objects.create(name=name) for name in ('Action', 'Drama', 'Comedy')]
+        studios = [Studio.objects.create(name=name) for name in ('Studio A', 'Studio B')]
+        director = Director.objects.create(first_name='First', last_name='Last')
+
+        cls.anime = cls.create_anime(title='Main', episodes=4, director=director, country='JP')
+        cls.anime.genres.set(genres)
+        cls.anime.studio.set(studios)
+
+        for index in range(8):
+            similar = cls.create_anime(title=f'Similar {index}')
+            similar.genres.set(genres[:index % 3 + 1])
+        cls.create_anime(title='Not similar')
+
+        episodes = list(cls.anime.episode_set.all())
+        with cls.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                team = Group.objects.create(name=f'Team {index}')
+                if index:
+                    GroupSettings.objects.create(group=team)
+                for episode in episodes:
+                    Voiceover.objects.create(
+                        episode=episode, team=team, type=VoiceoverTypes.VOICEOVER,
+                        status=VoiceoverStatuses.APPROVED, url='https://example.com/'
+                    )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_detail_queries_are_fixed(self):
+        url = reverse('anime:get_anime', args=(self.anime.id, self.anime.slug))
+        # anime + director, genres, studio, related, episodes, preview images, teams + settings, similar
+        with self.assertNumQueries(8):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        self.assertEqual(len(data['voiceovers']), 3)
+        self.assertEqual(data['count_episodes'], {'value': 4, 'get_params': 'episode_lte=4'})
+        self.assertEqual(data['reactions'], {'LIKE': 0, 'DISLIKE': 0})
+
+    def test_similar_excludes_itself_and_is_ranked_by_shared_genres(self):
+        url = reverse('anime:get_anime', args=(self.anime.id, self.anime.slug))
+        similar = self.client.get(url).json()['similar']
+
+        self.assertEqual(len(similar), 6)
+        titles = [anime['title'] for anime in similar]
+        self.assertNotIn('Main', titles)
+        self.assertNotIn('Not similar', titles)
+        self.assertEqual(set(titles[:2]), {'Similar 2', 'Similar 5'})
+
+
+class AnimeResponseCacheTest(AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime = cls.create_anime(title='Cached', episodes=2)
+
+    def setUp(self):
+        self.url = reverse('anime:get_anime', args=(self.anime.id, self.anime.slug))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cached_response_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+
+    def test_query_params_are_normalized(self):
+        list_url = reverse('anime:get_anime_list')
+        self.client.get(list_url, data={'page_size': 5, 'type': ''})
+        with self.assertNumQueries(0):
+            self.client.get(list_url, data={'type': '', 'page_size': 5, 'status': ''})
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_model_change_invalidates_response(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['count_episodes']['value'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Episode.objects.create(title='Episode 3', anime=self.anime, order=3, status='RELEASED')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['count_episodes']['value'], 3)
+
+    def test_version_is_bumped_after_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Episode.objects.create(title='Episode 3', anime=self.anime, order=3, status='RELEASED')
+            # a response built before the commit is cached under the old version
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url)
+            self.assertEqual(response.json()['count_episodes']['value'], 2)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['count_episodes']['value'], 3)
+
+    def test_reaction_invalidates_popular_list(self):
+        list_url = reverse('anime:get_anime_list')
+        self.create_anime(title='Other')
+        user = get_user_model().objects.create(username='fan', email='fan@example.com')
+        response = self.client.get(list_url, data={'order_by': '-is_popular'})
+        last = response.json()['results'][-1]['id']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(user=user, anime_id=last, reaction=ReactionChoices.LIKE)
+
+        response = self.client.get(list_url, data={'order_by': '-is_popular'})
+        self.assertEqual(response.json()['results'][0]['id'], last)
+
+    def test_host_is_part_of_the_key(self):
+        with self.settings(ALLOWED_HOSTS=['testserver', 'mirror.example.com']):
+            self.client.get(self.url)
+            # absolute URLs of images are built from the host
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, HTTP_HOST='mirror.example.com')
+        self.assertTrue(queries.captured_queries)
+
+    def test_m2m_change_invalidates_response(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.anime.genres.add(Genre.objects.create(name='Drama'))
+
+        response = self.client.get(self.url)
+        self.assertEqual([genre['value'] for genre in response.json()['genres']], ['Drama'])
+
+
+class FiltersAnimeAPIViewTest(AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = Genre.objects.create(name='Drama')
+        for index, country in enumerate(['JP', 'JP', 'UA', '']):
+            anime = cls.create_anime(title=f'Anime {index}', country=country)
+            if index % 2:
+                anime.genres.add(cls.genre)
+
+    def setUp(self):
+        self.url = reverse('anime:get_anime_filters')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_filters(self):
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(list(data['genres'].items()), [('', 'Всі'), (str(self.genre.id), 'Drama')])
+        self.assertEqual(set(data['countries']), {'', 'JP', 'UA'})
+        self.assertNotIn('counts', data)
+
+    def test_filters_with_counts(self):
+        counts = self.client.get(self.url, data={'with_counts': 'true'}).json()['counts']
+
+        self.assertEqual(counts['genres'], {str(self.genre.id): 2})
+        self.assertEqual(counts['countries'], {'JP': 2, 'UA': 1})
+        self.assertEqual(counts['type'], {'SERIAL': 4})
+
+    def test_facets_are_rebuilt_only_for_changed_models(self):
+        get_anime_filter_facets(with_counts=True)
+        with self.assertNumQueries(0):
+            get_anime_filter_facets(with_counts=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name='Comedy')
+        # options and counts of the genres facet only
+        with self.assertNumQueries(2):
+            facets = get_anime_filter_facets(with_counts=True)
+        self.assertEqual(len(facets['genres']['options']), 2)
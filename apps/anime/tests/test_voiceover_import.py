@@ -0,0 +1,100 @@
+import json
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.anime.choices import VoiceoverHistoryEvents, VoiceoverStatuses, VoiceoverTypes
+from apps.anime.models import Voiceover, VoiceoverHistory
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.anime.voiceover_import import VoiceoverImporter
+from apps.user.models import Group, User
+
+
+class VoiceoverImporterTest(AnimeProviderMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime = cls.create_anime(title='Naruto', episodes=24)
+        cls.team = Group.objects.create(name='Team')
+        cls.user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+
+    def get_rows(self, count: int = 24) -> list:
+        return [
+            {'anime': 'naruto', 'order': order, 'team': 'Team', 'type': 'voiceover', 'url': f'https://e.com/{order}'}
+            for order in range(1, count + 1)
+        ]
+
+    def test_import(self):
+        # anime, teams, episodes, existing voiceovers, savepoint, voiceovers, history, release
+        with self.assertNumQueries(8):
+            result = VoiceoverImporter(user=self.user).run(self.get_rows())
+
+        self.assertEqual((result.created, result.errors), (24, []))
+        voiceovers = Voiceover.objects.filter(episode__anime=self.anime)
+        self.assertEqual(set(voiceovers.values_list('status', 'type', 'user')),
+                         {(VoiceoverStatuses.WAIT, VoiceoverTypes.VOICEOVER, self.user.pk)})
+        history = VoiceoverHistory.objects.filter(voiceover=voiceovers.first()).order_by('id')
+        self.assertEqual(list(history.values_list('event', 'status')), [
+            (VoiceoverHistoryEvents.CREATED, VoiceoverStatuses.CREATED),
+            (VoiceoverHistoryEvents.WAIT, VoiceoverStatuses.WAIT),
+        ])
+
+    def test_row_errors(self):
+        rows = self.get_rows(2) + [
+            {'anime': str(self.anime.pk), 'order': 2, 'team': str(self.team.pk), 'type': 'VOICEOVER',
+             'url': 'https://example.com/'},
+            {'anime': 'naruto', 'order': 25, 'team': 'Team', 'type': 'VOICEOVER', 'url': 'https://example.com/'},
+            {'anime': 'bleach', 'order': 1, 'team': 'Team', 'type': 'VOICEOVER', 'url': 'https://example.com/'},
+            {'anime': 'naruto', 'order': 1, 'team': 'Unknown', 'type': 'VOICEOVER', 'url': 'https://example.com/'},
+            {'anime': 'naruto', 'order': 'first', 'team': 'Team', 'type': 'VOICEOVER', 'url': 'https://example.com/'},
+            {'anime': 'naruto', 'order': 3, 'team': 'Team', 'type': 'DUB', 'url': 'https://example.com/'},
+            {'anime': 'naruto', 'order': 3, 'team': 'Team', 'type': 'VOICEOVER', 'url': 'not a url'},
+            {'anime': 'naruto', 'order': 3, 'team': 'Team'},
+        ]
+
+        result = VoiceoverImporter().run(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row_number for row_number, _ in result.errors], list(range(3, 11)))
+        self.assertEqual(result.errors[0][1], 'Voiceover already exists')
+
+    def test_digit_values(self):
+        anime = self.create_anime(title='86', episodes=1)
+        Group.objects.create(name=str(self.team.pk))
+        row = {'anime': anime.slug, 'order': 1, 'type': 'VOICEOVER', 'url': 'https://example.com/'}
+
+        result = VoiceoverImporter().run([dict(row, team=str(self.team.pk)), dict(row, team='Team')])
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            (1, f'Team "{self.team.pk}" is ambiguous: the id and the name of different teams'),
+        ])
+        self.assertEqual(Voiceover.objects.get().episode.anime_id, anime.pk)
+
+    def test_dry_run(self):
+        result = VoiceoverImporter().run(self.get_rows(), dry_run=True)
+        self.assertEqual(result.created, 24)
+        self.assertFalse(Voiceover.objects.exists())
+
+    def test_command(self):
+        with NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(self.get_rows(), file)
+            file.flush()
+            call_command('import_voiceovers', file.name, user='admin', stdout=StringIO())
+        self.assertEqual(Voiceover.objects.filter(user=self.user).count(), 24)
+
+    def test_admin_upload(self):
+        content = 'anime,order,team,type,url\nnaruto,1,Team,VOICEOVER,https://example.com/\nnaruto,1,Team,VOICEOVER,x\n'
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse('admin:voiceover_import'), data={
+            'file': SimpleUploadedFile('voiceovers.csv', content.encode(), content_type='text/csv'),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 1)
+        self.assertEqual(response.context['result'].errors, [(2, 'Invalid URL "x"')])
+        self.assertEqual(Voiceover.objects.count(), 1)
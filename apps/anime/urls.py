@@ -2,7 +2,8 @@ from django.urls import path
 from apps.anime.views import (
     AnimeAPIView, AnimeListAPIView, AnimeSearchAPIView,
     PostersAnimeAPIView, FiltersAnimeAPIView, AnimeRandomAPIView,
-    EpisodeAPIView, CommentAnimeAPIView, AnimeArchAPIView, AnimeReactAPIView
+    EpisodeAPIView, CommentAnimeAPIView, AnimeArchAPIView, AnimeReactAPIView, AnimeAutocompleteAPIView,
+    AnimeEpisodesAPIView,
 )
 
 
@@ -14,9 +15,11 @@ urlpatterns = [
     path('<int:pk>/<str:slug>/comments/', CommentAnimeAPIView.as_view(), name='get_anime_comments'),
     path('<int:anime_pk>/<str:anime_slug>/episode/<int:order>/', EpisodeAPIView.as_view(),
          name='get_anime_episode'),
+    path('<int:anime_pk>/<str:anime_slug>/episodes/', AnimeEpisodesAPIView.as_view(), name='get_anime_episodes'),
     path('list/', AnimeListAPIView.as_view(), name='get_anime_list'),
     path('random/', AnimeRandomAPIView.as_view(), name='get_random_anime'),
     path('search/', AnimeSearchAPIView.as_view(), name='search_anime'),
+    path('autocomplete/', AnimeAutocompleteAPIView.as_view(), name='autocomplete_anime'),
     path('posters/', PostersAnimeAPIView.as_view(), name='get_anime_posters'),
     path('filters/', FiltersAnimeAPIView.as_view(), name='get_anime_filters'),
     path('<int:pk>/<str:slug>/arch/', AnimeArchAPIView.as_view(), name='get_anime_arch'),
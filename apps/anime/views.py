@@ -2,9 +2,9 @@ import logging
 from typing import Union, List, Tuple
 from collections import OrderedDict
 
-from rest_framework.generics import RetrieveAPIView, ListAPIView, GenericAPIView
+from rest_framework.generics import RetrieveAPIView, ListAPIView, GenericAPIView, get_object_or_404
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter
 from rest_framework import permissions, status
 from django_filters.rest_framework import DjangoFilterBackend
 from django_countries.data import COUNTRIES
@@ -12,38 +12,48 @@ from rest_framework.permissions import IsAuthenticated
 
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Prefetch
 
 from apps.anime.serializers import (
     ResponseAnimeSerializer, ResponseAnimeListSerializer,
     ResponsePostersSerializer, ResponseFiltersAnimeSerializer, ResponseAnimeRandomSerializer,
     ResponseAnimeEpisodeSerializer, ResponseCommentAnimeSerializer, ResponseAnimeArchSerializer,
-    AnimeReactSerializer,
+    AnimeReactSerializer, RequestAnimeAutocompleteSerializer, RequestAnimeRandomSerializer,
+    ResponseAnimeEpisodesSerializer, RequestAnimeEpisodesSerializer,
 )
 from apps.core.utils import swagger_auto_schema_wrapper
 from apps.anime.swagger_views_docs import (
     AnimeAPIViewDoc, AnimeListAPIViewDoc, AnimeSearchAPIViewDoc,
     AnimeTOP100APIViewDoc, PostersAnimeAPIViewDoc, FiltersAnimeAPIViewDoc,
     AnimeRandomAPIViewDoc, ResponseAnimeEpisodeAPIViewDoc, CommentAnimeAPIViewDoc,
-    AnimeArchAPIViewDoc, AnimeReactAPIViewDoc
+    AnimeArchAPIViewDoc, AnimeReactAPIViewDoc, AnimeAutocompleteAPIViewDoc, AnimeEpisodesAPIViewDoc
+)
+from apps.anime.models import (
+    Director, Studio, Anime, Poster, Episode, Genre, Arch, Voiceover, Reaction, PreviewImage, PublishedVoiceover,
 )
-from apps.anime.models import Director, Studio, Anime, Poster, Episode, Genre, Arch, Voiceover, Reaction
-from apps.anime.choices import VoiceoverStatuses, VoiceoverTypes
 from apps.anime.paginators import AnimeListPaginator
-from apps.anime.filtersets import AnimeListFilterSet
-from apps.anime.choices import AnimeStatuses, AnimeTypes, SeasonTypes
+from apps.anime.filtersets import AnimeListFilterSet, AnimeSearchFilter
+from apps.anime.facets import get_anime_filter_facets, FACET_MODELS
+from apps.anime.autocomplete import anime_prefix_index
+from apps.anime.random_anime import pick_random_anime_id
 
 from apps.comment.paginators import CommentAnimeListPaginator
 from apps.comment.models import Comment
 from apps.core.utils import validate_request_data
+from apps.core.mixins import ResponseCacheMixin
+from anime_on.utils import to_bool
+from apps.user.models import GroupSettings
 
 
 logger = logging.getLogger()
 
 
-class AnimeAPIView(RetrieveAPIView):
-    queryset = Anime.objects.prefetch_related(
-        'genres', 'director', 'studio', 'episode_set', 'previewimage_set'
+class AnimeAPIView(ResponseCacheMixin, RetrieveAPIView):
+    cache_models = (
+        Anime, Episode, Voiceover, Reaction, Genre, Studio, Director, PreviewImage, PublishedVoiceover, Group,
+        GroupSettings,
+    )
+    queryset = Anime.objects.select_related('director').prefetch_related(
+        'genres', 'studio', 'related', 'episode_set', 'previewimage_set'
     ).all()
     serializer_class = ResponseAnimeSerializer
 
@@ -56,12 +66,11 @@ class AnimeAPIView(RetrieveAPIView):
 
 
 class AnimeSearchAPIView(ListAPIView):
-    queryset = Anime.objects.prefetch_related('episode_set').all()
+    queryset = Anime.objects.defer('search_vector')
     serializer_class = ResponseAnimeListSerializer
     pagination_class = AnimeListPaginator
 
-    filter_backends = (SearchFilter,)
-    search_fields = ['title']
+    filter_backends = (AnimeSearchFilter,)
 
     @swagger_auto_schema_wrapper(
         doc=AnimeSearchAPIViewDoc,
@@ -71,10 +80,12 @@ class AnimeSearchAPIView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class AnimeListAPIView(ListAPIView):
+class AnimeListAPIView(ResponseCacheMixin, ListAPIView):
+    # 'count_like' of popular anime is updated by reactions without signals of Anime
+    cache_models = (Anime, Episode, Voiceover, Reaction, Genre, Studio, PublishedVoiceover)
     permission_classes = [permissions.AllowAny]
 
-    queryset = Anime.objects.prefetch_related('episode_set').all()
+    queryset = Anime.objects.all()
     serializer_class = ResponseAnimeListSerializer
     pagination_class = AnimeListPaginator
 
@@ -97,23 +108,50 @@ class AnimeListAPIView(ListAPIView):
             return super().get_queryset()
 
 
-class AnimeRandomAPIView(RetrieveAPIView):
-    queryset = Anime.objects.all().order_by('?')
+class AnimeRandomAPIView(GenericAPIView):
+    queryset = Anime.objects.only('id', 'slug')
     serializer_class = ResponseAnimeRandomSerializer
-
-    def get_object(self):
-        return self.get_queryset().first()
+    request_serializer = RequestAnimeRandomSerializer
 
     @swagger_auto_schema_wrapper(
         doc=AnimeRandomAPIViewDoc,
         operation_id='get_random_anime',
+        query_serializer=request_serializer,
     )
-    def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+    @validate_request_data(serializer_cls=request_serializer, method='GET')
+    def get(self, request, serializer: RequestAnimeRandomSerializer, *args, **kwargs):
+        genre = serializer.validated_data.get('genre')
+        anime_id = pick_random_anime_id(
+            request.session if serializer.validated_data['no_repeat'] else None,
+            genre=genre.pk if genre else None,
+            anime_type=serializer.validated_data.get('type'),
+            accessible=serializer.validated_data['accessible'],
+        )
+        if anime_id is None:
+            raise NotFound('Аніме не знайдено')
+        anime = get_object_or_404(self.get_queryset(), pk=anime_id)
+        return Response(data=self.get_serializer(anime).data, status=status.HTTP_200_OK)
+
+
+class AnimeAutocompleteAPIView(GenericAPIView):
+    permission_classes = [permissions.AllowAny]
+    request_serializer = RequestAnimeAutocompleteSerializer
+
+    @swagger_auto_schema_wrapper(
+        doc=AnimeAutocompleteAPIViewDoc,
+        operation_id='autocomplete_anime',
+        query_serializer=request_serializer,
+    )
+    @validate_request_data(serializer_cls=request_serializer, method='GET')
+    def get(self, request, serializer: RequestAnimeAutocompleteSerializer, *args, **kwargs):
+        anime_prefix_index.refresh()
+        data = anime_prefix_index.search(serializer.validated_data['search'], serializer.validated_data['limit'])
+        return Response(data=data, status=status.HTTP_200_OK)
 
 
-class AnimeTOP100APIView(ListAPIView):
-    queryset = Anime.objects.prefetch_related('episode_set').filter(is_top=True)
+class AnimeTOP100APIView(ResponseCacheMixin, ListAPIView):
+    cache_models = (Anime, Episode)
+    queryset = Anime.objects.filter(is_top=True)
     serializer_class = ResponseAnimeListSerializer
     pagination_class = AnimeListPaginator
 
@@ -125,10 +163,9 @@ class AnimeTOP100APIView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class PostersAnimeAPIView(ListAPIView):
-    queryset = Poster.objects.prefetch_related(
-        'anime', 'anime__episode_set'
-    ).order_by('-created').all()[:4]
+class PostersAnimeAPIView(ResponseCacheMixin, ListAPIView):
+    cache_models = (Poster, Anime, Episode)
+    queryset = Poster.objects.select_related('anime').order_by('-created').all()[:4]
     serializer_class = ResponsePostersSerializer
 
     @swagger_auto_schema_wrapper(
@@ -139,7 +176,8 @@ class PostersAnimeAPIView(ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class FiltersAnimeAPIView(GenericAPIView):
+class FiltersAnimeAPIView(ResponseCacheMixin, GenericAPIView):
+    cache_models = FACET_MODELS
     default_all = {'': 'Всі'}
     response_serializer = ResponseFiltersAnimeSerializer
 
@@ -156,42 +194,19 @@ class FiltersAnimeAPIView(GenericAPIView):
         operation_id='get_anime_filters',
     )
     def get(self, request, *args, **kwargs):
-        directors = list((director.id, director.full_name) for director in Director.objects.all())
-        genres = list((genre.id, genre.name) for genre in Genre.objects.all())
-        studios = list((studio.id, studio.name) for studio in Studio.objects.all())
-        voiceover = list((group.id, group.name) for group in Group.objects.all())
-        anime_countries = Anime.objects.all().only('country')
-        countries = list(set((anime.country.code, anime.country.name ) for anime in anime_countries))
-        response = self.response_serializer({
-            'directors': self.add_option_all(directors),
-            'genres': self.add_option_all(genres),
-            'studios': self.add_option_all(studios),
-            'countries': self.add_option_all(countries),
-            'voiceover': self.add_option_all(voiceover),
-            'status': self.add_option_all(list(AnimeStatuses.choices)),
-            'type': self.add_option_all(list(AnimeTypes.choices)),
-            'season': self.add_option_all(list(SeasonTypes.choices)),
-        }).data
+        with_counts = to_bool(request.GET.get('with_counts'))
+        facets = get_anime_filter_facets(with_counts=with_counts)
+        data = {name: self.add_option_all(facet['options']) for name, facet in facets.items()}
+        if with_counts:
+            data['counts'] = {name: facet['counts'] for name, facet in facets.items()}
+        response = self.response_serializer(data).data
         return Response(data=response, status=status.HTTP_200_OK)
 
 
 class EpisodeAPIView(RetrieveAPIView):
     lookup_field = 'anime_id'
     lookup_url_kwarg = 'anime_pk'
-    queryset = Episode.objects.prefetch_related(
-        Prefetch(
-            lookup='voiceover_set',
-            queryset=Voiceover.objects.filter(
-                status=VoiceoverStatuses.APPROVED, type=VoiceoverTypes.VOICEOVER),
-            to_attr='public_voiceovers'
-        ),
-        Prefetch(
-            lookup='voiceover_set',
-            queryset=Voiceover.objects.filter(
-                status=VoiceoverStatuses.APPROVED, type=VoiceoverTypes.SUBTITLES),
-            to_attr='public_subtitles'
-        )
-    ).all()
+    queryset = Episode.objects.with_public_voiceovers()
     serializer_class = ResponseAnimeEpisodeSerializer
 
     def get_queryset(self):
@@ -212,6 +227,28 @@ class EpisodeAPIView(RetrieveAPIView):
         return super().get(request)
 
 
+class AnimeEpisodesAPIView(ResponseCacheMixin, GenericAPIView):
+    cache_models = (Episode, Voiceover, Group)
+    queryset = Episode.objects.with_public_voiceovers().order_by('order')
+    serializer_class = ResponseAnimeEpisodesSerializer
+    request_serializer = RequestAnimeEpisodesSerializer
+
+    @swagger_auto_schema_wrapper(
+        doc=AnimeEpisodesAPIViewDoc,
+        operation_id='get_anime_episodes',
+        query_serializer=request_serializer,
+    )
+    @validate_request_data(serializer_cls=request_serializer, method='GET')
+    def get(self, request, serializer: RequestAnimeEpisodesSerializer, *args, **kwargs):
+        queryset = self.get_queryset().filter(anime_id=self.kwargs['anime_pk'])
+        if 'order_gte' in serializer.validated_data:
+            queryset = queryset.filter(order__gte=serializer.validated_data['order_gte'])
+        if 'order_lte' in serializer.validated_data:
+            queryset = queryset.filter(order__lte=serializer.validated_data['order_lte'])
+        response_serializer = self.get_serializer(queryset, many=True, fields=serializer.validated_data.get('fields'))
+        return Response(data=response_serializer.data, status=status.HTTP_200_OK)
+
+
 class CommentAnimeAPIView(ListAPIView):
     lookup_field = 'pk'
     lookup_url_kwarg = 'pk'
@@ -244,7 +281,8 @@ class CommentAnimeAPIView(ListAPIView):
         return queryset.filter_parents()
 
 
-class AnimeArchAPIView(ListAPIView):
+class AnimeArchAPIView(ResponseCacheMixin, ListAPIView):
+    cache_models = (Arch, Episode)
     lookup_field = 'pk'
     lookup_url_kwarg = 'pk'
 
@@ -266,7 +304,7 @@ class AnimeArchAPIView(ListAPIView):
             return Arch.objects.none()
 
         lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
-        return Arch.objects.prefetch_related('anime__episode_set').filter(
+        return Arch.objects.prefetch_related('episode_set').filter(
             anime_id=self.kwargs[lookup_url_kwarg]
         ).order_by('order')
 
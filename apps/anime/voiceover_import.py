@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.db.models import Q
+
+from apps.anime.choices import VoiceoverHistoryEvents, VoiceoverStatuses, VoiceoverTypes
+from apps.anime.models import Anime, Episode, Voiceover, VoiceoverHistory
+from apps.core.cache import bump_cache_version
+from apps.user.models import Group
+
+
+VOICEOVER_IMPORT_FIELDS = ('anime', 'order', 'team', 'type', 'url')
+VOICEOVER_IMPORT_FORMATS = ('csv', 'json')
+
+
+def read_voiceover_rows(content: bytes, file_format: str) -> List[dict]:
+    """
+    :param content: CSV with the header of 'VOICEOVER_IMPORT_FIELDS' or a JSON list of objects with these keys
+    :return: list. For example, [{"anime": "naruto", "order": "1", "team": "Team", "type": "VOICEOVER", "url": "..."}]
+    """
+    text = content.decode('utf-8-sig')
+    if file_format == 'json':
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('JSON should be a list of objects')
+        return rows
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+class VoiceoverImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors: List[Tuple[int, str]] = []  # (row number starting from 1, message)
+
+    def add_error(self, row_number: int, message: str):
+        self.errors.append((row_number, message))
+
+
+class VoiceoverImporter:
+    """
+    Bulk import of voiceovers of dubbing teams. Anime (id or slug), teams (id or name), episodes by
+    (anime, order) and already existing voiceovers are resolved with one query each, then voiceovers and
+    their history (CREATED and WAIT, as for voiceovers added in admin) are inserted by batches in a transaction.
+    Invalid rows are reported and skipped, the other rows are imported.
+    """
+    def __init__(self, user=None, batch_size: int = 1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.url_validator = URLValidator()
+
+    def run(self, rows: Iterable[dict], dry_run: bool = False) -> VoiceoverImportResult:
+        result = VoiceoverImportResult()
+        rows = list(enumerate(rows, start=1))
+
+        parsed = [(number, self.parse_row(number, row, result)) for number, row in rows]
+        parsed = [(number, row) for number, row in parsed if row is not None]
+        anime_ids = self.get_anime_ids([row['anime'] for _, row in parsed])
+        team_ids = self.get_team_ids([row['team'] for _, row in parsed])
+        episode_ids = self.get_episode_ids([
+            (anime_ids[row['anime']], row['order']) for _, row in parsed if anime_ids.get(row['anime'])
+        ])
+        existing = self.get_existing(episode_ids.values(), team_ids.values())
+
+        voiceovers = []
+        for number, row in parsed:
+            if row['anime'] not in anime_ids:
+                result.add_error(number, f'Anime "{row["anime"]}" does not exist')
+                continue
+            if anime_ids[row['anime']] is None:
+                result.add_error(number, f'Anime "{row["anime"]}" is ambiguous: the id and the slug of different anime')
+                continue
+            if row['team'] not in team_ids:
+                result.add_error(number, f'Team "{row["team"]}" does not exist')
+                continue
+            if team_ids[row['team']] is None:
+                result.add_error(number, f'Team "{row["team"]}" is ambiguous: the id and the name of different teams')
+                continue
+            episode_id = episode_ids.get((anime_ids[row['anime']], row['order']))
+            if episode_id is None:
+                result.add_error(number, f'Episode {row["order"]} of anime "{row["anime"]}" does not exist')
+                continue
+            key = (episode_id, team_ids[row['team']], row['type'])
+            if key in existing:
+                result.add_error(number, 'Voiceover already exists')
+                continue
+            existing.add(key)  # duplicates in the file
+            voiceovers.append(Voiceover(
+                episode_id=episode_id, team_id=key[1], type=row['type'], url=row['url'], user=self.user,
+                status=VoiceoverStatuses.WAIT,
+            ))
+
+        if voiceovers and not dry_run:
+            self.create(voiceovers)
+        result.created = len(voiceovers)
+        result.errors.sort()
+        return result
+
+    def parse_row(self, number: int, row: dict, result: VoiceoverImportResult) -> Optional[dict]:
+        missing = [field for field in VOICEOVER_IMPORT_FIELDS if str(row.get(field) or '').strip() == '']
+        if missing:
+            result.add_error(number, f'Missing fields: {", ".join(missing)}')
+            return None
+        row = {field: str(row[field]).strip() for field in VOICEOVER_IMPORT_FIELDS}
+        try:
+            row['order'] = int(row['order'])
+        except ValueError:
+            result.add_error(number, f'Invalid episode order "{row["order"]}"')
+            return None
+        row['type'] = row['type'].upper()
+        if row['type'] not in VoiceoverTypes.values:
+            result.add_error(number, f'Invalid type "{row["type"]}", expected {" or ".join(VoiceoverTypes.values)}')
+            return None
+        try:
+            self.url_validator(row['url'])
+        except ValidationError:
+            result.add_error(number, f'Invalid URL "{row["url"]}"')
+            return None
+        return row
+
+    @staticmethod
+    def resolve_ids(queryset, field: str, values: Iterable[str]) -> Dict[str, Optional[int]]:
+        """
+        Digit values match both the id and the field, for example, the slug of the anime "86".
+        :return: dict. Ids of rows by the given id or value of the field, None if the value matches
+            different rows by the id and by the field
+        """
+        values = set(values)
+        values_by_id = {}
+        for value in values:
+            if value.isdigit():
+                values_by_id.setdefault(int(value), []).append(value)
+        matches: Dict[str, set] = {}
+        rows = queryset.filter(Q(pk__in=values_by_id) | Q(**{f'{field}__in': values})).values_list('id', field)
+        for pk, key in rows:
+            for value in values_by_id.get(pk, []) + ([key] if key in values else []):
+                matches.setdefault(value, set()).add(pk)
+        return {value: next(iter(ids)) if len(ids) == 1 else None for value, ids in matches.items()}
+
+    def get_anime_ids(self, values: List[str]) -> Dict[str, Optional[int]]:
+        """
+        :return: dict. Ids of anime by the given id or slug
+        """
+        return self.resolve_ids(Anime.objects.all(), 'slug', values) if values else {}
+
+    def get_team_ids(self, values: List[str]) -> Dict[str, Optional[int]]:
+        """
+        :return: dict. Ids of teams by the given id or name
+        """
+        return self.resolve_ids(Group.objects.all(), 'name', values) if values else {}
+
+    @staticmethod
+    def get_episode_ids(keys: List[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+        """
+        :return: dict. Ids of episodes by (anime id, order), a few extra episodes are read instead of OR-ing pairs
+        """
+        if not keys:
+            return {}
+        keys = set(keys)
+        rows = Episode.objects.filter(
+            anime_id__in={anime_id for anime_id, _ in keys}, order__in={order for _, order in keys}
+        ).values_list('anime_id', 'order', 'id')
+        return {(anime_id, order): pk for anime_id, order, pk in rows if (anime_id, order) in keys}
+
+    @staticmethod
+    def get_existing(episode_ids: Iterable[int], team_ids: Iterable[int]) -> set:
+        episode_ids = set(episode_ids)
+        if not episode_ids:
+            return set()
+        return set(Voiceover.objects.filter(
+            episode_id__in=episode_ids, team_id__in=set(team_ids)
+        ).values_list('episode_id', 'team_id', 'type'))
+
+    def create(self, voiceovers: List[Voiceover]):
+        """
+        Signals are not sent by bulk_create, waiting voiceovers are not published, so only the cache version
+        of Voiceover is bumped.
+        """
+        with transaction.atomic():
+            Voiceover.objects.bulk_create(voiceovers, batch_size=self.batch_size)
+            history = []
+            for voiceover in voiceovers:
+                history.append(VoiceoverHistory(
+                    voiceover=voiceover, event=VoiceoverHistoryEvents.CREATED, status=VoiceoverStatuses.CREATED,
+                    user=self.user,
+                ))
+                history.append(VoiceoverHistory(
+                    voiceover=voiceover, event=VoiceoverHistoryEvents.WAIT, status=VoiceoverStatuses.WAIT,
+                ))
+            VoiceoverHistory.objects.bulk_create(history, batch_size=self.batch_size)
+        bump_cache_version(Voiceover)
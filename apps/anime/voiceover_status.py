@@ -0,0 +1,36 @@
+from apps.anime.choices import VoiceoverStatuses, VoiceoverHistoryEvents
+
+
+class VoiceoverStateMachine:
+    """
+    Status of a voiceover is the strongest status among events of its history:
+    DECLINED > APPROVED > WAIT > CREATED. So the next status depends only on the current status
+    and the new event, the history is not read.
+    """
+    statuses = (VoiceoverStatuses.CREATED, VoiceoverStatuses.WAIT, VoiceoverStatuses.APPROVED,
+                VoiceoverStatuses.DECLINED)
+    event_statuses = {
+        VoiceoverHistoryEvents.WAIT: VoiceoverStatuses.WAIT,
+        VoiceoverHistoryEvents.APPROVED: VoiceoverStatuses.APPROVED,
+        VoiceoverHistoryEvents.DECLINED: VoiceoverStatuses.DECLINED,
+    }
+
+    @classmethod
+    def get_rank(cls, status: str) -> int:
+        # a new voiceover has no status yet, any event makes it CREATED at least
+        return cls.statuses.index(status) if status in cls.statuses else -1
+
+    @classmethod
+    def get_next_status(cls, status: str, event: str) -> str:
+        event_status = cls.event_statuses.get(event, VoiceoverStatuses.CREATED)
+        return event_status if cls.get_rank(event_status) > cls.get_rank(status) else status
+
+    @classmethod
+    def get_status(cls, events) -> str:
+        """
+        Status of the whole history, for example, ['CREATED', 'WAIT', 'APPROVED'] -> 'APPROVED'.
+        """
+        status = VoiceoverStatuses.CREATED
+        for event in events:
+            status = cls.get_next_status(status, event)
+        return status
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_type', 'object_id', '-is_pinned', '-created', '-id'], name='comment_object_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', '-is_pinned', '-created', '-id'], name='comment_parent_created_idx'),
+        ),
+    ]
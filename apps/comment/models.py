@@ -26,6 +26,13 @@ class Comment(CreatedDateTimeMixin, models.Model):
 
     class Meta:
         ordering = ('-is_pinned', '-created')
+        indexes = [
+            # keys of the cursor pagination of comments and replies
+            models.Index(
+                fields=['content_type', 'object_id', '-is_pinned', '-created', '-id'], name='comment_object_created_idx'
+            ),
+            models.Index(fields=['parent', '-is_pinned', '-created', '-id'], name='comment_parent_created_idx'),
+        ]
 
     def __str__(self):
         if not self.parent:
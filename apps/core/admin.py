@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.contrib import admin
 
+from apps.core.models import ScheduledJob, ScheduledTask
+
 
 admin.site.site_header = f'AnimeON {settings.PROJECT_VERSION}'
 admin.site.site_title = 'AnimeON'
@@ -32,3 +34,31 @@ class OnlyAddPermissionMixin:
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ScheduledTask)
+class ScheduledTaskAdmin(admin.ModelAdmin):
+    # only deleted, then 'schedule_command' schedules the task again
+    list_display = ['command', 'schedule_expression', 'run_at', 'created', 'updated']
+    search_fields = ['command']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    # jobs of 'DatabaseScheduler' are created by 'schedule_command', a deleted job doesn't run anymore
+    list_display = ['name', 'schedule_expression', 'next_run_at', 'leased_by', 'runs', 'failures', 'last_run_at',
+                    'last_duration_ms', 'last_ok']
+    list_filter = ['last_ok']
+    search_fields = ['name']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,103 @@
+import json
+import time
+from typing import Callable, List, Dict, Optional
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(timings: List[float], total_time: Optional[float] = None) -> Dict[str, float]:
+    """
+    :param timings: durations in seconds
+    :return: dict. For example,
+        {"count": 1000, "mean_ms": 0.2, "p50_ms": 0.1, "p95_ms": 0.4, "p99_ms": 0.9, "ops_per_sec": 5000.0}
+    """
+    count = len(timings)
+    total_time = total_time if total_time is not None else sum(timings)
+    return {
+        'count': count,
+        'mean_ms': round(sum(timings) / count * 1000, 4) if count else 0.0,
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p95_ms': round(percentile(timings, 95) * 1000, 4),
+        'p99_ms': round(percentile(timings, 99) * 1000, 4),
+        'ops_per_sec': round(count / total_time, 2) if total_time else 0.0,
+    }
+
+
+def compare_results(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+                    min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Regressions of the results against the baseline: any growth of 'queries', or growth of 'p95_ms' by more
+    than 'threshold' percent and more than 'min_delta_ms' (to ignore the noise of fast calls).
+    :return: list. For example, ["anime:get_anime_list: queries 3 -> 23"]
+    """
+    regressions = []
+    for name, summary in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if 'queries' in base and summary.get('queries', 0) > base['queries']:
+            regressions.append(f'{name}: queries {base["queries"]} -> {summary["queries"]}')
+        p95, base_p95 = summary.get('p95_ms', 0.0), base.get('p95_ms', 0.0)
+        if p95 > base_p95 * (1 + threshold / 100) and p95 - base_p95 > min_delta_ms:
+            regressions.append(f'{name}: p95 {base_p95} ms -> {p95} ms')
+    return regressions
+
+
+def measure(func: Callable[[int], object], iterations: int, warmup: int = 0) -> Dict[str, float]:
+    """
+    Call 'func(iteration)' the given number of times and summarize durations of the calls.
+    """
+    for iteration in range(warmup):
+        func(iteration)
+
+    timings = []
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        call_started = time.perf_counter()
+        func(iteration)
+        timings.append(time.perf_counter() - call_started)
+    return summarize(timings, time.perf_counter() - started)
+
+
+def get_allowed_host() -> str:
+    """
+    Host of requests made by benchmarks out of the test runner, which adds 'testserver' to 'ALLOWED_HOSTS'.
+    :raise CommandError: if no host is allowed
+    """
+    allowed_hosts = settings.ALLOWED_HOSTS or (['localhost'] if settings.DEBUG else [])
+    if '*' in allowed_hosts or 'testserver' in allowed_hosts:
+        return 'testserver'
+    if not allowed_hosts:
+        raise CommandError('ALLOWED_HOSTS is empty, requests of the benchmark would be rejected')
+    # '.example.com' allows the domain and its subdomains
+    return allowed_hosts[0].lstrip('.')
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Base command for benchmarks: adds '--iterations' and '--output' options and prints the results table.
+    """
+    default_iterations = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=self.default_iterations,
+                            help='Number of measured iterations')
+        parser.add_argument('--output', type=str, help='Path of a JSON file to write the results to')
+
+    def write_results(self, results: Dict[str, Dict[str, float]], output: Optional[str] = None):
+        for name, summary in results.items():
+            values = ', '.join(f'{key}={value}' for key, value in summary.items())
+            self.stdout.write(f'{name}: {values}')
+        if output:
+            with open(output, 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results have been written to {output}'))
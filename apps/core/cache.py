@@ -0,0 +1,109 @@
+import math
+import time
+from hashlib import md5
+from typing import Dict, Iterable, List, Type
+
+from django.core.cache import cache
+from django.db import models, transaction
+
+
+CacheVersionKey = 'cache.version.{model}'
+ResponseCacheKey = 'response.{request_hash}.{versions_hash}'
+
+versioned_models = set()
+
+
+def get_model_label(model: Type[models.Model]) -> str:
+    return model._meta.concrete_model._meta.label_lower
+
+
+def register_versioned_model(*model_list: Type[models.Model]):
+    """
+    Changes of registered models bump their cache version (see 'apps.core.signals').
+    """
+    versioned_models.update(get_model_label(model) for model in model_list)
+
+
+def is_versioned_model(model: Type[models.Model]) -> bool:
+    return get_model_label(model) in versioned_models
+
+
+def get_cache_versions(model_list: Iterable[Type[models.Model]]) -> Dict[str, int]:
+    keys = {CacheVersionKey.format(model=get_model_label(model)) for model in model_list}
+    versions = cache.get_many(keys)
+    for key in keys - versions.keys():
+        # a missing key must not restart from a value which was already used for stored responses
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+    return versions
+
+
+def incr_cache_version(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_cache_version(model: Type[models.Model]):
+    """
+    The version is bumped after the commit of the current transaction (at once outside of transactions),
+    otherwise a concurrent request could cache the data before the commit under the new version.
+    """
+    key = CacheVersionKey.format(model=get_model_label(model))
+    transaction.on_commit(lambda: incr_cache_version(key))
+
+
+def get_response_cache_key(request, model_list: Iterable[Type[models.Model]]) -> str:
+    """
+    The key is built from scheme and host (absolute URLs of responses), path, normalized query params,
+    negotiated media type and versions of models.
+    """
+    query = sorted(
+        (key, value) for key, values in request.GET.lists() for value in values if value != ''
+    )
+    request_data = (
+        f'{request.scheme}://{request.get_host()}{request.path}?{query}#{request.META.get("HTTP_ACCEPT", "")}'
+    )
+    versions = sorted(get_cache_versions(model_list).items())
+    return ResponseCacheKey.format(
+        request_hash=md5(request_data.encode(), usedforsecurity=False).hexdigest(),
+        versions_hash=md5(str(versions).encode(), usedforsecurity=False).hexdigest(),
+    )
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding log of the last hits: a hit takes one of 'limit' slots with an atomic ADD and the slot expires
+    'window' seconds after the hit. The limit is exact at any moment and shared by all workers and nodes
+    which use the same cache.
+    """
+    key_template = '{key}.{slot}'
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+
+    def get_slot_keys(self, key: str) -> List[str]:
+        return [self.key_template.format(key=key, slot=slot) for slot in range(self.limit)]
+
+    def hit(self, key: str) -> bool:
+        """
+        Register a hit and return False when all slots are taken (such hits are not counted).
+        """
+        slot_keys = self.get_slot_keys(key)
+        taken = cache.get_many(slot_keys)
+        for slot_key in slot_keys:
+            # ADD fails if a concurrent hit has taken the slot after 'get_many'
+            if slot_key not in taken and cache.add(slot_key, time.time(), timeout=self.window):
+                return True
+        return False
+
+    def get_retry_after(self, key: str) -> int:
+        """
+        :return: int. Seconds until the oldest slot is released, at least 1
+        """
+        hits = cache.get_many(self.get_slot_keys(key)).values()
+        if not hits:
+            return 1
+        return max(math.ceil(min(hits) + self.window - time.time()), 1)
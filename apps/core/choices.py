@@ -0,0 +1,6 @@
+from django.db import models
+
+
+class TaskCoalescing(models.TextChoices):
+    SKIP = 'SKIP', 'Skip the task if the same one is pending'
+    DEBOUNCE = 'DEBOUNCE', 'Replace the pending schedule of the same task'
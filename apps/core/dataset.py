@@ -0,0 +1,353 @@
+import io
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+from faker import Faker
+
+from apps.anime.catalog_import import CatalogImporter
+from apps.anime.choices import ReactionChoices, VoiceoverHistoryEvents, VoiceoverStatuses, VoiceoverTypes
+from apps.anime.models import Anime, Episode, PublishedVoiceover, Reaction, Voiceover, VoiceoverHistory
+from apps.comment.models import Comment, Reaction as CommentReaction
+from apps.core.cache import bump_cache_version
+from apps.user.choices import UserAnimeChoices
+from apps.user.models import Group, User, UserAnime, UserEpisodeViewed
+
+
+# dates of generated rows are offsets from a fixed moment, so the same seed gives the same rows
+DATASET_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+DATASET_USERNAME = 'dataset_{id}'
+DATASET_TEAM_NAME = 'Dataset team {index}'
+COMMENT_PHRASES = [
+    'Найкраще аніме сезону', 'Озвучка просто топ', 'Чекаю на наступну серію', 'Кінцівка трохи розчарувала',
+    'Дякую за переклад', 'Цей опенінг я слухаю щодня', 'Манга краща', 'Переглянув за один вечір',
+    'Головний герой дратує', 'Графіка неймовірна', 'Хто ще тут після манги?', 'Саундтрек шедевр',
+]
+USER_ANIME_ACTIONS = [
+    (UserAnimeChoices.VIEWED, 40), (UserAnimeChoices.PLANNED, 25), (UserAnimeChoices.WATCHING, 20),
+    (UserAnimeChoices.DROPPED, 10), (UserAnimeChoices.FAVORITE, 5),
+]
+VOICEOVER_STATUSES = [(VoiceoverStatuses.APPROVED, 90), (VoiceoverStatuses.WAIT, 7), (VoiceoverStatuses.DECLINED, 3)]
+
+
+def format_copy_value(value) -> str:
+    """
+    Value in the text format of COPY, ints and plain strings go first as the most frequent ones.
+    """
+    if type(value) is int:
+        return str(value)
+    if type(value) is str:
+        if '\\' in value or '\t' in value or '\n' in value or '\r' in value:
+            return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+        return value
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return format_copy_value(str(value))
+
+
+def copy_rows(model, fields: Sequence[str], rows: Iterable[tuple], chunk_size: int = 100_000) -> int:
+    """
+    Insert rows with 'COPY ... FROM STDIN' by chunks, it is several times faster than bulk_create for big tables.
+    Values are given by columns of 'fields' (attnames, for example, 'user_id'). No signals are sent.
+    :return: int. Number of inserted rows
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field) for field in fields)
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    count = 0
+    buffer = io.StringIO()
+    with connection.cursor() as cursor:
+        for count, row in enumerate(rows, start=1):
+            buffer.write('\t'.join(format_copy_value(value) for value in row))
+            buffer.write('\n')
+            if count % chunk_size == 0:
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                buffer = io.StringIO()
+        if buffer.tell():
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    return count
+
+
+def reserve_ids(model, count: int) -> range:
+    """
+    Reserve a range of ids of the model, rows can reference each other before they are inserted.
+    The table is locked against inserts until the end of the transaction.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {connection.ops.quote_name(table)} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, model._meta.pk.column])
+        sequence = cursor.fetchone()[0]
+        cursor.execute('SELECT nextval(%s)', [sequence])
+        start = cursor.fetchone()[0]
+        if count > 1:
+            cursor.execute('SELECT setval(%s, %s)', [sequence, start + count - 1])
+    return range(start, start + count)
+
+
+class ZipfSampler:
+    """
+    Random items where the item of rank k is chosen with the weight 1 / k ** exponent.
+    Ranks are shuffled, so popularity doesn't follow the order of ids.
+    """
+    def __init__(self, items: Sequence, exponent: float, rng: random.Random):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.weights = [1 / rank ** exponent for rank in range(1, len(self.items) + 1)]
+        self.cum_weights = list(accumulate(self.weights))
+
+    def share(self, index: int) -> float:
+        """
+        Share of the item at the index of 'items' among all choices.
+        """
+        return self.weights[index] / self.cum_weights[-1]
+
+    def choice(self):
+        return self.items[bisect_left(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+    def sample(self, count: int) -> List:
+        """
+        Up to 'count' distinct items, popular ones are more likely.
+        """
+        count = min(count, len(self.items))
+        result = {}
+        for _ in range(count * 3):
+            result[self.choice()] = None
+            if len(result) >= count:
+                break
+        return list(result)
+
+
+class DatasetGenerator:
+    """
+    Reproducible dataset of the whole site for load tests: users, anime lists, viewed episodes, reactions,
+    comments with reply trees and their reactions, and voiceovers of teams with their history.
+    Popularity of anime and activity of users follow Zipf's law, the number of comments of an anime
+    is proportional to its popularity. Rows are inserted with COPY in one transaction, the same seed
+    gives the same rows on the same catalog (except ids).
+    """
+    def __init__(self, users: int = 10_000, anime: int = 2000, comments_per_anime: int = 200,
+                 episodes_per_anime: int = 12, teams: int = 20, reply_depth: int = 4, reply_ratio: float = 0.4,
+                 anime_per_user: float = 20, reactions_per_comment: float = 1, zipf_exponent: float = 1.1,
+                 seed: int = 0, log=None):
+        self.num_users = users
+        self.num_anime = anime
+        self.comments_per_anime = comments_per_anime
+        self.episodes_per_anime = episodes_per_anime
+        self.num_teams = teams
+        self.reply_depth = reply_depth
+        self.reply_ratio = reply_ratio
+        self.anime_per_user = anime_per_user
+        self.reactions_per_comment = reactions_per_comment
+        self.zipf_exponent = zipf_exponent
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.counts: Dict[str, int] = {}
+
+    def generate(self) -> Dict[str, int]:
+        """
+        :return: dict. Numbers of inserted rows by model, for example, {"user.User": 10000, ...}
+        """
+        with transaction.atomic():
+            anime_ids = self.get_anime_ids()
+            episode_ids = self.get_episode_ids(anime_ids)
+            user_ids = reserve_ids(User, self.num_users)
+            self.copy(User, ('id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'is_staff',
+                             'email', 'is_active', 'date_joined'), self.generate_users(user_ids))
+
+            anime = ZipfSampler(anime_ids, self.zipf_exponent, self.rng)
+            users = ZipfSampler(user_ids, self.zipf_exponent, self.rng)
+            self.generate_user_anime(anime, user_ids, episode_ids)
+            self.generate_comments(anime, users, user_ids)
+            self.generate_voiceovers(anime, episode_ids, user_ids)
+
+            Anime.objects.filter(pk__in=anime_ids).refresh_counters(episodes=False)
+            PublishedVoiceover.objects.rebuild(anime_ids)
+            with connection.cursor() as cursor:
+                for model in (User, UserAnime, UserEpisodeViewed, Reaction, Comment, CommentReaction, Voiceover,
+                              VoiceoverHistory):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        for model in (User, UserAnime, UserEpisodeViewed, Anime, Reaction, Comment, CommentReaction, Voiceover,
+                      VoiceoverHistory, Group):
+            bump_cache_version(model)
+        return self.counts
+
+    def copy(self, model, fields: Sequence[str], rows: Iterable[tuple]):
+        count = copy_rows(model, fields, rows)
+        label = model._meta.label
+        self.counts[label] = self.counts.get(label, 0) + count
+        self.log(f'{label}: {count} rows')
+
+    def get_anime_ids(self) -> List[int]:
+        """
+        Ids of the first 'num_anime' anime, missing anime are generated by the catalog importer.
+        """
+        from apps.anime.management.commands.generate_tests_anime import Command as GenerateAnimeCommand
+
+        existing = Anime.objects.count()
+        if existing < self.num_anime:
+            missing = self.num_anime - existing
+            Faker.seed(self.seed)
+            stats = CatalogImporter().run(GenerateAnimeCommand.generate_anime(
+                missing, missing * self.episodes_per_anime, start=existing,
+            ))
+            self.counts[Anime._meta.label] = stats.created
+            self.counts[Episode._meta.label] = stats.episodes
+            self.log(f'{Anime._meta.label}: {stats.created} rows, {stats.episodes} episodes')
+        return list(Anime.objects.order_by('id').values_list('id', flat=True)[:self.num_anime])
+
+    @staticmethod
+    def get_episode_ids(anime_ids: List[int]) -> Dict[int, List[int]]:
+        result = {anime_id: [] for anime_id in anime_ids}
+        rows = Episode.objects.filter(anime_id__in=anime_ids).order_by('anime_id', 'order').values_list(
+            'anime_id', 'id'
+        )
+        for anime_id, episode_id in rows.iterator(chunk_size=10_000):
+            result[anime_id].append(episode_id)
+        return result
+
+    def random_date(self, max_days: int = 365) -> datetime:
+        return DATASET_EPOCH + timedelta(seconds=self.rng.randrange(max_days * 86400))
+
+    def random_count(self, mean: float) -> int:
+        # exponentially distributed: most rows have a few related rows and a few have many
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def weighted_choice(self, choices: List[Tuple[str, int]]) -> str:
+        return self.rng.choices([value for value, _ in choices], weights=[weight for _, weight in choices])[0]
+
+    def generate_users(self, user_ids: range) -> Iterator[tuple]:
+        for user_id in user_ids:
+            username = DATASET_USERNAME.format(id=user_id)
+            # '!' is an unusable password, generated users can't log in
+            yield (user_id, '!', False, username, '', '', False, f'{username}@example.com', True, self.random_date())
+
+    def generate_user_anime(self, anime: ZipfSampler, user_ids: range, episode_ids: Dict[int, List[int]]):
+        """
+        Anime lists of users, episodes of viewed and watched anime, and reactions to viewed anime.
+        """
+        user_anime, reactions = [], []  # viewed episodes are taken from the numbers of episodes in 'user_anime'
+        for user_id in user_ids:
+            for anime_id in anime.sample(self.random_count(self.anime_per_user)):
+                action = self.weighted_choice(USER_ANIME_ACTIONS)
+                count_episodes = len(episode_ids[anime_id])
+                if action == UserAnimeChoices.VIEWED:
+                    if self.rng.random() < 0.3:
+                        reaction = ReactionChoices.LIKE if self.rng.random() < 0.8 else ReactionChoices.DISLIKE
+                        reactions.append((user_id, anime_id, reaction))
+                elif action in (UserAnimeChoices.WATCHING, UserAnimeChoices.DROPPED):
+                    count_episodes = self.rng.randrange(count_episodes + 1)
+                else:
+                    count_episodes = 0
+                user_anime.append((user_id, anime_id, action, self.random_date(), count_episodes))
+        self.copy(UserAnime, ('user_id', 'anime_id', 'action', 'date'), (row[:4] for row in user_anime))
+        self.copy(UserEpisodeViewed, ('user_id', 'episode_id', 'date'), (
+            (user_id, episode_id, date)
+            for user_id, anime_id, _, date, count_episodes in user_anime
+            for episode_id in episode_ids[anime_id][:count_episodes]
+        ))
+        self.copy(Reaction, ('user_id', 'anime_id', 'reaction'), reactions)
+
+    def get_comment_counts(self, anime: ZipfSampler) -> List[Tuple[int, int]]:
+        total = self.comments_per_anime * len(anime.items)
+        return [
+            (anime_id, int(total * anime.share(index) + self.rng.random()))
+            for index, anime_id in enumerate(anime.items)
+        ]
+
+    def generate_comments(self, anime: ZipfSampler, users: ZipfSampler, user_ids: range):
+        """
+        Comments of anime with reply trees up to 'reply_depth' levels: replies go to older comments of
+        the anime, early comments collect more replies. Then reactions to comments.
+        """
+        comment_counts = self.get_comment_counts(anime)
+        comment_ids = reserve_ids(Comment, sum(count for _, count in comment_counts))
+        content_type_id = ContentType.objects.get_for_model(Anime).pk
+
+        def generate_rows():
+            next_ids = iter(comment_ids)
+            for anime_id, count in comment_counts:
+                created = self.random_date(max_days=300)
+                parents = []  # (id, depth) of comments which can get replies
+                for _ in range(count):
+                    comment_id = next(next_ids)
+                    parent_id, depth = None, 0
+                    if parents and self.rng.random() < self.reply_ratio:
+                        parent_id, depth = parents[int(len(parents) * self.rng.random() ** 3)]
+                        depth += 1
+                    if depth < self.reply_depth:
+                        parents.append((comment_id, depth))
+                    created += timedelta(seconds=self.rng.randrange(1, 3600))
+                    content = self.rng.choice(COMMENT_PHRASES)
+                    yield (
+                        comment_id, users.choice(), content, content, parent_id, self.rng.random() < 0.05, False,
+                        f'd{comment_id}', created, created, content_type_id, anime_id,
+                    )
+
+        self.copy(Comment, ('id', 'user_id', 'content_main', 'content', 'parent_id', 'is_spoiler', 'is_pinned',
+                            'urlhash', 'updated', 'created', 'content_type_id', 'object_id'), generate_rows())
+
+        def generate_reactions():
+            for comment_id in comment_ids:
+                for user_id in self.rng.sample(user_ids, min(len(user_ids), self.random_count(
+                        self.reactions_per_comment))):
+                    reaction = ReactionChoices.LIKE if self.rng.random() < 0.7 else ReactionChoices.DISLIKE
+                    yield user_id, comment_id, reaction
+
+        self.copy(CommentReaction, ('user_id', 'comment_id', 'reaction'), generate_reactions())
+
+    def get_teams(self) -> List[int]:
+        names = [DATASET_TEAM_NAME.format(index=index) for index in range(1, self.num_teams + 1)]
+        existing = set(Group.objects.filter(name__in=names).values_list('name', flat=True))
+        Group.objects.bulk_create([Group(name=name) for name in names if name not in existing])
+        return list(Group.objects.filter(name__in=names).order_by('id').values_list('id', flat=True))
+
+    def generate_voiceovers(self, anime: ZipfSampler, episode_ids: Dict[int, List[int]], user_ids: range):
+        """
+        Popular anime are voiced by more teams, a team voices every episode of the anime.
+        """
+        teams = self.get_teams()
+        if not teams:
+            return
+        voiceovers = []
+        for index, anime_id in enumerate(anime.items):
+            popularity = anime.share(index) * len(anime.items)  # 1 is the mean popularity
+            count_teams = min(len(teams), 1 + self.random_count(popularity))
+            for team_id in self.rng.sample(teams, count_teams):
+                voiceover_type = self.rng.choice(VoiceoverTypes.values)
+                status = self.weighted_choice(VOICEOVER_STATUSES)
+                user_id = self.rng.choice(user_ids)
+                for episode_id in episode_ids[anime_id]:
+                    voiceovers.append((episode_id, team_id, voiceover_type, status, user_id))
+        voiceover_ids = reserve_ids(Voiceover, len(voiceovers))
+        created = DATASET_EPOCH
+
+        self.copy(Voiceover, ('id', 'type', 'episode_id', 'team_id', 'user_id', 'status', 'url', 'created',
+                              'updated'), (
+            (voiceover_id, voiceover_type, episode_id, team_id, user_id, status,
+             f'https://example.com/voiceover/{voiceover_id}', created, created)
+            for voiceover_id, (episode_id, team_id, voiceover_type, status, user_id) in zip(voiceover_ids, voiceovers)
+        ))
+
+        def generate_history():
+            for voiceover_id, (_, _, _, status, user_id) in zip(voiceover_ids, voiceovers):
+                yield voiceover_id, VoiceoverHistoryEvents.CREATED, VoiceoverStatuses.CREATED, '', user_id, created
+                yield voiceover_id, VoiceoverHistoryEvents.WAIT, VoiceoverStatuses.WAIT, '', None, created
+                if status != VoiceoverStatuses.WAIT:
+                    yield voiceover_id, status, status, '', None, created
+
+        self.copy(VoiceoverHistory, ('voiceover_id', 'event', 'status', 'message', 'user_id', 'created'),
+                  generate_history())
@@ -0,0 +1,154 @@
+import json
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from apps.anime.models import Anime, Episode
+from apps.comment.models import Comment
+from apps.core.benchmark import BenchmarkCommand, compare_results, get_allowed_host, summarize
+from apps.user.models import UserAnime
+
+
+# namespaces of 'apps/*/urls.py'
+API_NAMESPACES = ('core', 'user', 'support', 'authentication', 'anime', 'comment')
+# query params of endpoints which don't work without them
+ENDPOINT_QUERY_PARAMS = {
+    'anime:search_anime': {'search': 'наруто'},
+    'anime:autocomplete_anime': {'search': 'на'},
+    'core:country-list-autocomplete': {'q': 'ук'},
+}
+
+
+class Command(BenchmarkCommand):
+    help = ('Measure latency, queries and response bytes of every GET endpoint of the API with the test client '
+            'on the current database (see generate_dataset). Compare with a baseline to catch regressions')
+    default_iterations = 20
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--baseline', type=str, help='Path of JSON results of a previous run to compare with')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Allowed growth of p95 latency against the baseline, percent')
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the response cache between requests, it is cleared before every one by default')
+        parser.add_argument('--endpoint', type=str, nargs='*', help='Names of measured endpoints, all by default')
+
+    def handle(self, *args, **options):
+        results = {}
+        host = get_allowed_host()
+        # views may write (sessions, spam counters), nothing is kept
+        with transaction.atomic():
+            params = self.get_params()
+            for name, url_kwargs, authenticated in self.get_endpoints():
+                if options['endpoint'] and name not in options['endpoint']:
+                    continue
+                if authenticated and not params['user']:
+                    self.stdout.write(self.style.WARNING(f'{name}: skipped, there are no users'))
+                    continue
+                try:
+                    url = reverse(name, kwargs=self.get_url_kwargs(name, url_kwargs, params))
+                except KeyError as error:
+                    self.stdout.write(self.style.WARNING(f'{name}: skipped, no value of {error}'))
+                    continue
+                client = APIClient(HTTP_HOST=host)
+                if authenticated:
+                    client.force_authenticate(params['user'])
+                results[name] = self.measure_endpoint(
+                    client, url, ENDPOINT_QUERY_PARAMS.get(name, {}), options['iterations'], options['warm'],
+                )
+            transaction.set_rollback(True)
+        self.write_results(results, options['output'])
+
+        # error pages must not be measured as the baseline or against it
+        failed = [f'{name}: status {summary["status"]}' for name, summary in results.items()
+                  if not 200 <= summary['status'] < 300]
+        if failed:
+            raise CommandError('Endpoints have not responded with 2xx:\n' + '\n'.join(failed))
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            regressions = compare_results(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    @staticmethod
+    def get_endpoints() -> Iterator[Tuple[str, List[str], bool]]:
+        """
+        :return: (name of the URL, names of its kwargs, whether the view requires a user) of views with GET
+        """
+        for resolver in get_resolver().url_patterns:
+            if not isinstance(resolver, URLResolver) or resolver.namespace not in API_NAMESPACES:
+                continue
+            for pattern in resolver.url_patterns:
+                view_class = getattr(pattern.callback, 'view_class', None) if isinstance(pattern, URLPattern) else None
+                if view_class is None or not hasattr(view_class, 'get'):
+                    continue
+                permissions = getattr(view_class, 'permission_classes', ())
+                authenticated = any(permission.__name__ == 'IsAuthenticated' for permission in permissions)
+                yield f'{resolver.namespace}:{pattern.name}', list(pattern.pattern.converters), authenticated
+
+    @staticmethod
+    def get_params() -> Dict[str, Optional[object]]:
+        """
+        Values of URL kwargs: the most commented anime, its first episode, the comment of the anime with
+        the most replies and the user with the longest anime list, as the hottest pages of the site.
+        """
+        content_type = ContentType.objects.get_for_model(Anime)
+        top = Comment.objects.filter(content_type=content_type).order_by().values('object_id').annotate(
+            total=Count('id')
+        ).order_by('-total').first()
+        anime = Anime.objects.filter(pk=top['object_id']).first() if top else Anime.objects.order_by('id').first()
+        episode = Episode.objects.filter(anime=anime).order_by('order').first() if anime else None
+        comment = Comment.objects.filter(
+            content_type=content_type, object_id=anime.pk if anime else None, parent=None
+        ).annotate(total=Count('reply')).order_by('-total').first()
+        user_id = UserAnime.objects.order_by().values('user_id').annotate(total=Count('id')).order_by(
+            '-total'
+        ).values_list('user_id', flat=True).first()
+        user_model = get_user_model()
+        user = user_model.objects.filter(pk=user_id).first() if user_id else user_model.objects.first()
+
+        params = {'user': user}
+        if anime:
+            params.update(pk=anime.pk, slug=anime.slug, anime_pk=anime.pk, anime_slug=anime.slug)
+        if episode:
+            params['order'] = episode.order
+        if comment:
+            params['comment_pk'] = comment.pk
+        return params
+
+    @staticmethod
+    def get_url_kwargs(name: str, url_kwargs: List[str], params: dict) -> dict:
+        if name.startswith('comment:'):
+            params = dict(params, pk=params['comment_pk'])  # 'pk' of comment URLs is the comment
+        return {key: params[key] for key in url_kwargs}
+
+    @staticmethod
+    def measure_endpoint(client: APIClient, url: str, query_params: dict, iterations: int, warm: bool) -> Dict:
+        timings, queries, sizes, statuses = [], [], set(), set()
+        for iteration in range(iterations + 1):  # the first request is a warmup
+            if not warm:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url, query_params)
+                duration = time.perf_counter() - started
+            if iteration:
+                timings.append(duration)
+                queries.append(len(context.captured_queries))
+                sizes.add(len(response.content))
+                statuses.add(response.status_code)
+        summary = summarize(timings)
+        summary.update(queries=max(queries), bytes=max(sizes), status=max(statuses))
+        return summary
@@ -0,0 +1,39 @@
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.core.benchmark import BenchmarkCommand, measure
+from apps.core.mixins import CheckIPSpam
+
+
+class BaseView:
+    def dispatch(self, request, *args, **kwargs):
+        return HttpResponse()
+
+
+class SpamCheckedView(CheckIPSpam, BaseView):
+    spam_key = 'benchmark'
+    spam_limit = 10
+    spam_window = 60
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure the overhead of CheckIPSpam per request against the configured cache'
+    default_iterations = 10000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        requests = [factory.post('/', REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}')
+                    for i in range(iterations)]
+        base_view, checked_view = BaseView(), SpamCheckedView()
+
+        results = {
+            'without_check': measure(lambda i: base_view.dispatch(requests[i]), iterations),
+            # every request comes from a new IP, so all of them pass the limiter
+            'allowed': measure(lambda i: checked_view.dispatch(requests[i]), iterations),
+            # the same IP over the limit
+            'rejected': measure(lambda i: checked_view.dispatch(requests[0]), iterations),
+        }
+        overhead = results['allowed']['mean_ms'] - results['without_check']['mean_ms']
+        self.write_results(results, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Overhead per request: {overhead * 1000:.1f} µs'))
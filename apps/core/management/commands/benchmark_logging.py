@@ -0,0 +1,59 @@
+import io
+import json
+import logging
+
+from anime_on.logging import FormatterJSON, QueueHandler, default, get_request_id, orjson
+from apps.core.benchmark import BenchmarkCommand, measure
+
+
+class PreviousFormatterJSON(logging.Formatter):
+    """
+    'FormatterJSON' before the allowlist of fields, to compare with.
+    """
+    def format(self, record):
+        exclude = (
+            'msg', 'args', 'exc_text', 'stack_info',
+            'relativeCreated', 'msecs',
+            'thread', 'threadName', 'processName', 'process',
+        )
+        log_data = {k: v for k, v in record.__dict__.items() if k not in exclude}
+        log_data["asctime"] = self.formatTime(record, self.datefmt)
+        log_data["message"] = record.getMessage()
+        log_data["logger"] = log_data.pop("name")
+        log_data["request_id"] = get_request_id()
+        log_data.pop("exc_info")
+        return json.dumps(log_data, default=default)
+
+
+class Command(BenchmarkCommand):
+    help = 'Measure records per second of the JSON formatter and the time of logging calls on the request thread'
+    default_iterations = 50000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        record = logging.LogRecord(
+            'apps.core.middleware', logging.WARNING, __file__, 1, 'Error response %s', (400,), None,
+        )
+        record.__dict__.update({
+            'message_id': 'error_logging_middleware', 'request_path': '/api/v1/anime/list/',
+            'request_query': {'page': ['2']}, 'request_body': b'{"title": "Naruto"}' * 20,
+            'response_content': b'{"errors": [{"message": "Invalid page"}]}',
+        })
+
+        formatters = {'format.previous': PreviousFormatterJSON(), 'format.json': FormatterJSON()}
+        if orjson is not None:
+            formatters['format.orjson'] = FormatterJSON(fast_json=True)
+        results = {name: measure(lambda i: formatter.format(record), iterations)
+                   for name, formatter in formatters.items()}
+
+        stream_handler = logging.StreamHandler(io.StringIO())
+        stream_handler.setFormatter(FormatterJSON(fast_json=True))
+        queue_handler = QueueHandler(io.StringIO())
+        queue_handler.setFormatter(FormatterJSON(fast_json=True))
+        for name, handler in (('handle.stream', stream_handler), ('handle.queue', queue_handler)):
+            results[name] = measure(lambda i: handler.handle(logging.makeLogRecord(record.__dict__)), iterations)
+        queue_handler.flush()
+
+        self.write_results(results, options['output'])
+        for name in formatters:
+            self.stdout.write(self.style.SUCCESS(f'{name}: {results[name]["ops_per_sec"]:.0f} records/s'))
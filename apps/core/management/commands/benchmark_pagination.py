@@ -0,0 +1,77 @@
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.anime.models import Anime
+from apps.comment.models import Comment
+from apps.comment.paginators import CommentAnimeListPaginator
+from apps.core.benchmark import BenchmarkCommand, get_allowed_host, measure
+
+
+class Command(BenchmarkCommand):
+    help = ('Compare page number and cursor pagination of anime comments on a generated comment table. '
+            'Generated rows are rolled back at the end')
+    default_iterations = 20
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of generated comments')
+        parser.add_argument('--pages', type=int, nargs='*', default=[1, 100, 1000, 10000],
+                            help='Numbers of measured pages')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            queryset = self.generate_comments(options['rows'])
+            results = {}
+            for page in options['pages']:
+                results[f'page_number.{page}'] = self.measure_page(queryset, {'page': page}, options['iterations'])
+                cursor = self.get_cursor(queryset, page)
+                results[f'cursor.{page}'] = self.measure_page(queryset, {'cursor': cursor}, options['iterations'])
+            transaction.set_rollback(True)
+        self.write_results(results, options['output'])
+
+    def generate_comments(self, rows: int):
+        user = get_user_model().objects.create(username='benchmark-pagination')
+        content_type = ContentType.objects.get_for_model(Anime)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                INSERT INTO {Comment._meta.db_table}
+                    (user_id, content_main, content, is_spoiler, is_pinned, urlhash, updated, created,
+                     content_type_id, object_id)
+                SELECT %s, 'comment', 'comment', false, g %% 10000 = 0, 'benchmark-' || g, now(),
+                       now() - g * interval '1 second', %s, 0
+                FROM generate_series(1, %s) AS g
+                ''',
+                [user.pk, content_type.pk, rows],
+            )
+            cursor.execute(f'ANALYZE {Comment._meta.db_table}')
+        self.stdout.write(f'Generated {rows} comments')
+        return Comment.objects.filter(content_type=content_type, object_id=0, parent=None).order_pinned_newest()
+
+    @staticmethod
+    def get_cursor(queryset, page: int) -> str:
+        """
+        Cursor of the given page, as if the client had followed 'next' links from the first one.
+        """
+        paginator = CommentAnimeListPaginator()
+        # as in 'paginate_queryset_by_cursor'
+        paginator.model = queryset.model
+        paginator.ordering = paginator.get_keyset_ordering(queryset)
+        if page <= 1:
+            return ''
+        last = queryset.order_by(*paginator.ordering)[(page - 1) * paginator.page_size - 1]
+        return paginator.encode_cursor(paginator.get_position(last))
+
+    @staticmethod
+    def measure_page(queryset, params: dict, iterations: int):
+        request = Request(APIRequestFactory().get('/', params, HTTP_HOST=get_allowed_host()))
+
+        def paginate(iteration):
+            paginator = CommentAnimeListPaginator()
+            paginator.paginate_queryset(queryset, request)
+            return paginator.get_paginated_response([])
+
+        return measure(paginate, iterations, warmup=1)
@@ -0,0 +1,147 @@
+import contextlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from anime_on.sqs_consumer import InFlightMessage, SQSConsumer
+from anime_on.sqs_memory import InMemorySQSClient
+from anime_on.sqs_sqlite import SQLiteSQSClient
+from apps.core.benchmark import BenchmarkCommand, measure, summarize
+
+
+QUEUE_URL = 'local://benchmark'
+# read-only endpoints requested by 'detail-type' messages
+HTTP_ENDPOINTS = ('anime:get_anime_filters', 'anime:get_anime_list', 'anime:get_anime_posters')
+# messages which must fail: an unknown path (404), an unknown command and a body which is not JSON
+FAILING_BODIES = (
+    {'detail-type': '/api/v1/benchmark/missing/', 'detail': {'httpMethod': 'GET'}},
+    {'command': 'benchmark_missing_command'},
+    'not json',
+)
+
+
+class BenchmarkConsumer(SQSConsumer):
+    """
+    Keeps durations of processed messages by their 'kind' attribute instead of logging them.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations: Dict[str, List[float]] = {}  # seconds in the handler by the kind of messages
+        self.latencies: List[float] = []  # seconds from the send to the end of processing
+
+    def on_processed(self, item: InFlightMessage, result: dict):
+        kind = item.message['MessageAttributes']['kind']['StringValue']
+        self.durations.setdefault(kind, []).append((result.get('duration_ms') or 0) / 1000)
+        self.latencies.append(time.time() - int(item.message['Attributes']['SentTimestamp']) / 1000)
+
+
+class Command(BenchmarkCommand):
+    help = ('Push synthetic EventBridge HTTP and command messages through the SQS consumer and process_message '
+            'on a local queue: messages per second, latency and failures, to size consumers without AWS')
+    default_iterations = 100000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--transport', choices=('memory', 'sqlite'), default='memory')
+        parser.add_argument('--sqlite-path', type=str, help='Path of the SQLite queue, a temporary file by default')
+        parser.add_argument('--workers', type=int, default=settings.SQS_CONSUMER_WORKERS)
+        parser.add_argument('--pool', choices=('thread', 'process'), default=settings.SQS_CONSUMER_POOL)
+        parser.add_argument('--command', type=str, default='check', help='Management command of command messages')
+        parser.add_argument('--command-share', type=float, default=0.2, help='Share of command messages')
+        parser.add_argument('--failure-share', type=float, default=0.01, help='Share of messages which must fail')
+        parser.add_argument('--timeout', type=float, default=3600, help='Max seconds of processing')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        client = self.get_client(options)
+        client.purge_queue(QueueUrl=QUEUE_URL)
+
+        messages = list(self.generate_messages(iterations, options))
+        batches = [messages[start:start + 10] for start in range(0, len(messages), 10)]
+        results = {'send_batch': measure(
+            lambda i: client.send_message_batch(QueueUrl=QUEUE_URL, Entries=batches[i]), len(batches),
+        )}
+
+        consumer = BenchmarkConsumer(client, QUEUE_URL, workers=options['workers'], pool=options['pool'],
+                                     wait_time=1)
+        watcher = threading.Thread(target=self.stop_when_empty, args=(consumer, client, options['timeout']))
+        started = time.perf_counter()
+        # every message would be logged and commands write to stdout, it is not what is measured here
+        logging.disable(logging.CRITICAL)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                watcher.start()
+                consumer.run()
+        finally:
+            logging.disable(logging.NOTSET)
+            consumer.stop()
+            watcher.join()
+        elapsed = time.perf_counter() - started
+
+        for kind, durations in sorted(consumer.durations.items()):
+            results[f'process.{kind}'] = summarize(durations, elapsed)
+        results['process'] = summarize([duration for durations in consumer.durations.values()
+                                        for duration in durations], elapsed)
+        results['latency'] = summarize(consumer.latencies, elapsed)
+        self.write_results(results, options['output'])
+
+        expected_failures = sum(1 for message in messages
+                                if message['MessageAttributes']['kind']['StringValue'] == 'failure')
+        left = client.count_messages(QUEUE_URL)
+        self.stdout.write(
+            f'{results["process"]["count"]} messages in {elapsed:.1f} s, {results["process"]["ops_per_sec"]} msg/s '
+            f'with {options["workers"]} {options["pool"]} workers; failed {consumer.metrics["failed"]} '
+            f'of {expected_failures} failing, deleted {consumer.metrics["deleted"]}, left {left}'
+        )
+        self.stdout.write(f'Calls of the queue: {client.calls}')
+        if left:
+            raise CommandError(f'{left} messages have not been processed in {options["timeout"]} seconds')
+        if consumer.metrics['failed'] != expected_failures:
+            raise CommandError(f'{consumer.metrics["failed"]} messages have failed, expected {expected_failures}')
+        self.stdout.write(self.style.SUCCESS('All messages have been processed and deleted'))
+
+    @staticmethod
+    def get_client(options: dict):
+        if options['transport'] == 'memory':
+            return InMemorySQSClient()
+        path = options['sqlite_path'] or os.path.join(tempfile.mkdtemp(), 'queue.sqlite3')
+        return SQLiteSQSClient(path)
+
+    @staticmethod
+    def generate_messages(count: int, options: dict) -> Iterator[dict]:
+        rng = random.Random(0)
+        paths = [reverse(name) for name in HTTP_ENDPOINTS]
+        for index in range(count):
+            chance = rng.random()
+            if chance < options['failure_share']:
+                kind, body = 'failure', FAILING_BODIES[index % len(FAILING_BODIES)]
+            elif chance < options['failure_share'] + options['command_share']:
+                kind, body = 'command', {'command': options['command'], 'args': [], 'kwargs': {}}
+            else:
+                kind, body = 'http', {
+                    'version': '0', 'id': f'benchmark-{index}', 'detail-type': rng.choice(paths),
+                    'source': 'com.anime_on.benchmark', 'time': timezone.now().isoformat(), 'resources': [],
+                    'detail': {'httpMethod': 'GET', 'body': '', 'headers': None, 'queryStringParameters': None},
+                }
+            yield {
+                'Id': str(index % 10),
+                'MessageBody': body if isinstance(body, str) else json.dumps(body),
+                'MessageAttributes': {'kind': {'DataType': 'String', 'StringValue': kind}},
+            }
+
+    @staticmethod
+    def stop_when_empty(consumer: SQSConsumer, client, timeout: float):
+        deadline = time.monotonic() + timeout
+        while client.count_messages(QUEUE_URL) and time.monotonic() < deadline and not consumer.stopping.is_set():
+            time.sleep(0.1)
+        consumer.stop()
@@ -0,0 +1,47 @@
+import logging
+
+from django.urls import reverse
+
+from anime_on.sqs_consumer import dispatch_request, process_request
+from apps.core.benchmark import BenchmarkCommand, measure
+
+
+def make_message(path: str, method: str = 'GET', body: dict = None) -> dict:
+    return {
+        'version': '0', 'id': 'benchmark', 'detail-type': path, 'source': 'com.anime_on.benchmark',
+        'detail': {'httpMethod': method, 'body': body or '', 'headers': None, 'queryStringParameters': None},
+    }
+
+
+class Command(BenchmarkCommand):
+    help = ('Compare the processing of EventBridge HTTP messages as requests to the whole WSGI application '
+            '(process_request) and dispatching them to views directly (dispatch_request)')
+    default_iterations = 1000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        messages = {
+            'get_list': make_message(reverse('anime:get_anime_list')),
+            'get_filters': make_message(reverse('anime:get_anime_filters')),
+            'post_refresh': make_message(reverse('authentication:token_refresh'), 'POST', {'refresh': 'wrong'}),
+            'not_found': make_message('/api/v1/benchmark/missing/'),
+        }
+        results = {}
+        # both paths log the same errors, the handlers are not measured.
+        # The messages don't write: every request closes the connection (request_started), it can't be rolled back
+        logging.disable(logging.CRITICAL)
+        try:
+            for name, message in messages.items():
+                for path, process in (('wsgi', process_request), ('direct', dispatch_request)):
+                    summary = measure(lambda i: process(message), iterations, warmup=10)
+                    results[f'{name}.{path}'] = {'status': process(message).status_code, **summary}
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.write_results(results, options['output'])
+        for name in messages:
+            wsgi, direct = results[f'{name}.wsgi'], results[f'{name}.direct']
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {wsgi["mean_ms"]} ms -> {direct["mean_ms"]} ms, '
+                f'{wsgi["mean_ms"] / direct["mean_ms"]:.1f}x faster'
+            ))
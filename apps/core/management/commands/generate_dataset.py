@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = ('Generate a reproducible dataset for load tests: users, comments with replies, reactions, anime lists, '
+            'viewed episodes and voiceovers. Missing anime are generated too')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000, help='Number of users')
+        parser.add_argument('--anime', type=int, default=2000, help='Number of anime (the first ones by id)')
+        parser.add_argument('--comments-per-anime', type=int, default=200, help='Mean number of comments of anime')
+        parser.add_argument('--episodes-per-anime', type=int, default=12, help='Episodes of generated anime')
+        parser.add_argument('--teams', type=int, default=20, help='Number of dubbing teams')
+        parser.add_argument('--reply-depth', type=int, default=4, help='Max depth of reply trees')
+        parser.add_argument('--reply-ratio', type=float, default=0.4, help='Share of comments which are replies')
+        parser.add_argument('--anime-per-user', type=float, default=20, help='Mean size of anime lists of users')
+        parser.add_argument('--reactions-per-comment', type=float, default=1, help='Mean number of reactions')
+        parser.add_argument('--zipf', type=float, default=1.1, help="Exponent of Zipf's law of popularity")
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+
+    def handle(self, *args, **options):
+        generator = DatasetGenerator(
+            users=options['users'], anime=options['anime'], comments_per_anime=options['comments_per_anime'],
+            episodes_per_anime=options['episodes_per_anime'], teams=options['teams'],
+            reply_depth=options['reply_depth'], reply_ratio=options['reply_ratio'],
+            anime_per_user=options['anime_per_user'], reactions_per_comment=options['reactions_per_comment'],
+            zipf_exponent=options['zipf'], seed=options['seed'], log=self.stdout.write,
+        )
+        started = time.perf_counter()
+        counts = generator.generate()
+        duration = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish generate dataset: {total} rows in {duration:.1f} s, {total / duration:.0f} rows/s'
+        ))
@@ -0,0 +1,63 @@
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+
+from anime_on.schedulers import DatabaseScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Run due jobs of DatabaseScheduler (SCHEDULER_BACKEND) in this process or send them to the queue. '
+            'Several workers can run at once, every job is leased by one of them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between checks of due jobs')
+        parser.add_argument('--lease', type=int, default=300,
+                            help='Seconds a job is leased for, longer jobs can be run by another worker again')
+        parser.add_argument('--batch-size', type=int, default=10, help='Number of due jobs leased at once')
+        parser.add_argument('--queue', action='store_true',
+                            help='Send jobs to the queue of async tasks (SQS_QUEUE_URL) instead of running them')
+        parser.add_argument('--once', action='store_true', help='Run due jobs and exit')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        metrics = {'runs': 0, 'failures': 0, 'max_lag_ms': 0.0, 'total_duration_ms': 0.0}
+        self.stdout.write(f'Scheduler worker {worker} has been started')
+
+        while not self.stopping.is_set():
+            jobs = DatabaseScheduler.lease_due_jobs(worker, options['batch_size'], options['lease'])
+            for job in jobs:
+                result = DatabaseScheduler.run_job(job, worker, to_queue=options['queue'])
+                metrics['runs'] += 1
+                metrics['failures'] += 0 if result['ok'] else 1
+                metrics['max_lag_ms'] = max(metrics['max_lag_ms'], result['lag_ms'])
+                metrics['total_duration_ms'] += result['duration_ms']
+                logger.info('Scheduled job has been run', extra={
+                    'message_id': 'scheduler_job_finished', 'job_name': job.name,
+                    'schedule_expression': job.schedule_expression, **result,
+                })
+            if options['once'] and len(jobs) < options['batch_size']:
+                break
+            if not jobs:
+                self.stopping.wait(options['interval'])
+
+        logger.info('Scheduler worker has been stopped', extra={
+            'message_id': 'scheduler_stopped', 'worker': worker, **metrics,
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f'Finish run scheduler: {metrics["runs"]} jobs run, {metrics["failures"]} failed, '
+            f'max lag {metrics["max_lag_ms"]:.0f} ms'
+        ))
+
+    def stop(self, *args):
+        self.stopping.set()
@@ -1,5 +1,13 @@
 import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import List, Optional, Tuple
 
+from django.conf import settings
+from django.db import connections
 from django.http import HttpResponse
 
 from anime_on.logging import request_id_context
@@ -8,6 +16,8 @@ from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
+SQL_PARAMS_LIST_PATTERN = re.compile(r'\((?:%s, )*%s\)')
+
 
 def request_id_middleware(get_response):
     def middleware(request):
@@ -28,25 +38,135 @@ def ping_middleware(get_response):
     return middleware
 
 
+# bodies of these views have passwords
+SENSITIVE_BODY_VIEWS = ('authentication:register', 'authentication:login')
+
+
+def get_request_body(request) -> bytes:
+    """
+    The body cut to 'LOG_BODY_MAX_SIZE', multipart (uploads) and big bodies are not read,
+    because reading them keeps the whole body in memory.
+    """
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not content_length:
+        return b''
+    if request.content_type == 'multipart/form-data' or content_length > settings.LOG_BODY_MAX_SIZE:
+        return f'<{request.content_type}, {content_length} bytes>'.encode()
+    return request.body
+
+
+def get_response_content(response) -> bytes:
+    if response.streaming:
+        return b'<streaming>'
+    return response.content[:settings.LOG_BODY_MAX_SIZE]
+
+
 def error_logging_middleware(get_response):
     def middleware(request):
-        request_body = request.body
+        # the body is read before the view, which may read the stream
+        request_body = get_request_body(request)
         response = get_response(request)
         if 400 <= response.status_code < 600:
-            # TODO: we don't log data from the /api/auth/registration/ endpoint, because there is a password in the data.
-            #  We should just remove this password from body and show all the other data.
             message = f'Error response {response.status_code}'
-            if request.path != '/api/auth/registration/':
-                logger.warning(message,
-                               extra={'message_id': 'error_logging_middleware',
-                                      "request_query": request.GET,
-                                      "request_body": request_body,
-                                      "request_path": request.path,
-                                      "response_content": response.content})
-            else:
-                logger.warning(message,
-                               extra={'message_id': 'error_logging_middleware',
-                                      "request_path": request.path,
-                                      "response_content": response.content})
+            extra = {'message_id': 'error_logging_middleware',
+                     "request_path": request.path,
+                     "response_content": get_response_content(response)}
+            match = getattr(request, 'resolver_match', None)
+            if not match or match.view_name not in SENSITIVE_BODY_VIEWS:
+                extra.update(request_query=request.GET, request_body=request_body)
+            logger.warning(message, extra=extra)
+        return response
+    return middleware
+
+
+class QueryStats:
+    """
+    'connection.execute_wrapper' counting queries, their time and executions of the same SQL. Queries themselves
+    are kept only with 'keep_queries', otherwise the cost is a counter increment per query.
+    """
+    def __init__(self, keep_queries: bool = False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.queries: Optional[List[dict]] = [] if keep_queries else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.statements[sql] += 1
+            if self.queries is not None:
+                self.queries.append({'sql': sql, 'duration_ms': round(duration * 1000, 3)})
+
+    def get_duplicates(self, limit: int) -> List[dict]:
+        """
+        :return: list. SQL executed at least 'limit' times, "IN (%s, %s)" lists of any length are the same SQL.
+            For example, [{"sql": "SELECT ... WHERE anime_id = %s", "count": 20}]
+        """
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[SQL_PARAMS_LIST_PATTERN.sub('(%s, ...)', sql)] += count
+        return [{'sql': sql, 'count': count} for sql, count in shapes.most_common() if count >= limit]
+
+
+def get_query_budget(request) -> Tuple[Optional[str], int]:
+    """
+    :return: URL name of the view and its budget: 'QUERY_BUDGETS' by URL name, 'query_budget' of the view class
+        or 'QUERY_BUDGET_DEFAULT'
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, settings.QUERY_BUDGET_DEFAULT
+    if match.view_name in settings.QUERY_BUDGETS:
+        return match.view_name, settings.QUERY_BUDGETS[match.view_name]
+    budget = getattr(getattr(match.func, 'view_class', None), 'query_budget', None)
+    return match.view_name, budget if budget is not None else settings.QUERY_BUDGET_DEFAULT
+
+
+def query_budget_middleware(get_response):
+    """
+    Counts queries and DB time of requests for the 'Server-Timing' header. Requests over the query budget of
+    their view or with repeated SQL (N+1) are logged with warnings, 'QUERY_SAMPLE_RATE' of requests are logged
+    with all their queries.
+    """
+    def middleware(request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return get_response(request)
+
+        sampled = random.random() < settings.QUERY_SAMPLE_RATE
+        stats = QueryStats(keep_queries=sampled)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = get_response(request)
+        duration = time.perf_counter() - started
+
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", total;dur={duration * 1000:.1f}'
+            )
+        view_name, budget = get_query_budget(request)
+        duplicates = stats.get_duplicates(settings.QUERY_DUPLICATES_LIMIT)
+        over_budget = stats.count > budget
+        if over_budget or duplicates or sampled:
+            extra = {
+                'message_id': 'query_budget_middleware',
+                'request_path': request.path,
+                'view': view_name,
+                'queries_count': stats.count,
+                'queries_budget': budget,
+                'queries_duration_ms': round(stats.duration * 1000, 3),
+                'duration_ms': round(duration * 1000, 3),
+                'duplicated_queries': duplicates,
+            }
+            if sampled:
+                extra['queries'] = stats.queries
+            log = logger.warning if over_budget or duplicates else logger.info
+            log(f'{view_name}: {stats.count} queries, the budget is {budget}', extra=extra)
         return response
     return middleware
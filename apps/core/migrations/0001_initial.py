@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created date and time')),
+                ('updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Updated date and time')),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('name', models.CharField(max_length=64)),
+                ('command', models.CharField(max_length=255)),
+                ('schedule_expression', models.CharField(max_length=255)),
+                ('run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
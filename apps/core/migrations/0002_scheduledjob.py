@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created date and time')),
+                ('updated', models.DateTimeField(auto_now=True, null=True, verbose_name='Updated date and time')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('schedule_expression', models.CharField(max_length=255)),
+                ('input', models.TextField()),
+                ('next_run_at', models.DateTimeField(db_index=True)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('leased_by', models.CharField(blank=True, max_length=255)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration_ms', models.FloatField(blank=True, null=True)),
+                ('last_ok', models.BooleanField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
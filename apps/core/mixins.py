@@ -1,8 +1,15 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
 from django.core.cache import cache
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 from rest_framework import status
 
+from apps.core.cache import get_response_cache_key, SlidingWindowLimiter
 from apps.core.utils import get_client_ip, get_response_body_errors
 
 
@@ -12,14 +19,63 @@ spam_timeout = 30
 
 
 class CheckIPSpam:
+    """
+    Limits requests per client IP with a sliding window shared by all workers.
+    The limit can be configured by 'spam_key' in settings.IP_SPAM_LIMITS.
+    """
     spam_key: str
+    spam_limit: int = 1
+    spam_window: int = spam_timeout
+
+    def get_spam_limiter(self) -> SlidingWindowLimiter:
+        limit, window = settings.IP_SPAM_LIMITS.get(self.spam_key, (self.spam_limit, self.spam_window))
+        return SlidingWindowLimiter(limit=limit, window=window)
 
     def dispatch(self, request, *args, **kwargs):
         ip = get_client_ip(request)
         cache_key = IPSpanCacheKey.format(spam_key=self.spam_key, ip=ip)
-        has_spam = cache.get(cache_key)
-        if has_spam:
-            response_data = get_response_body_errors(errors=f'Спробуйте повторити запит через {spam_timeout} секунд')
+        limiter = self.get_spam_limiter()
+        if not limiter.hit(cache_key):
+            retry_after = limiter.get_retry_after(cache_key)
+            response_data = get_response_body_errors(errors=f'Спробуйте повторити запит через {retry_after} секунд')
             return JsonResponse(data=response_data, status=status.HTTP_403_FORBIDDEN)
-        cache.set(cache_key, True, timeout=spam_timeout)
         return super().dispatch(request, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """
+    Caches successful GET responses until any of 'cache_models' is changed.
+    Stored responses are validated with ETag and Last-Modified headers.
+    """
+    cache_models: tuple = ()
+    cache_timeout: int = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not self.cache_models:
+            return super().dispatch(request, *args, **kwargs)
+
+        cache_key = get_response_cache_key(request, self.cache_models)
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if hasattr(response, 'render'):
+                response.render()
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': f'"{md5(response.content, usedforsecurity=False).hexdigest()}"',
+                'last_modified': int(time.time()),
+            }
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TIMEOUT
+            cache.set(cache_key, cached, timeout=timeout)
+        else:
+            response = HttpResponse(content=cached['content'], content_type=cached['content_type'])
+
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(cached['last_modified'])
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return get_conditional_response(
+            request, etag=cached['etag'], last_modified=cached['last_modified'], response=response
+        )
@@ -34,3 +34,39 @@ class VerifyMixin(models.Model):
         self.verified = True
         if save:
             self.save()
+
+
+class ScheduledTask(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
+    """
+    Pending task of 'schedule_command' with coalescing, there is one schedule by the command and its arguments.
+    One-time tasks are removed when their message is processed.
+    """
+    key = models.CharField(max_length=32, unique=True)
+    name = models.CharField(max_length=64)  # of the schedule in the scheduler backend
+    command = models.CharField(max_length=255)
+    schedule_expression = models.CharField(max_length=255)
+    run_at = models.DateTimeField(null=True, blank=True)  # of one-time tasks
+
+    def __str__(self):
+        return f'{self.command} {self.schedule_expression}'
+
+
+class ScheduledJob(CreatedDateTimeMixin, UpdatedDateTimeMixin, models.Model):
+    """
+    Schedule of 'DatabaseScheduler', it is run by 'manage.py run_scheduler' workers which lease due jobs.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    schedule_expression = models.CharField(max_length=255)  # at(...), rate(...) or cron(...) in UTC
+    input = models.TextField()  # message of the command, as in the queue of async tasks
+    next_run_at = models.DateTimeField(db_index=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    leased_by = models.CharField(max_length=255, blank=True)
+    # metrics of runs
+    runs = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_duration_ms = models.FloatField(null=True, blank=True)
+    last_ok = models.BooleanField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} {self.schedule_expression}'
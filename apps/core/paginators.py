@@ -1,14 +1,77 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import List, Optional, Tuple
+
+from django.db import connections
+from django.db.models import BooleanField, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def get_approximate_count(queryset) -> Optional[int]:
+    """
+    Number of rows estimated by the PostgreSQL planner, it costs an EXPLAIN instead of a COUNT scan.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class KeysetRow(Func):
+    function = 'ROW'
+    output_field = BooleanField()  # never selected, only compared with another row
 
 
 class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode: a request with the 'cursor' query param
+    (empty for the first page) gets pages filtered by the ordering keys of the last seen row instead of
+    OFFSET, and no COUNT unless 'approximate_count' is enabled. The response envelope is the same.
+    """
     page_query_param = 'page'
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 500
 
+    cursor_pagination = False  # paginators of long lists enable the keyset mode
+    cursor_query_param = 'cursor'
+    approximate_count = False
+    invalid_cursor_message = 'Invalid cursor'
+
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_pagination and self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.ordering = self.get_keyset_ordering(queryset)
+        if self.ordering is None:  # ordering by expressions or related fields, keys can't be taken from rows
+            self.cursor_mode = False
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_queryset_by_cursor(queryset.order_by(*self.ordering), request)
+
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return Response({
+                'active_page': None,
+                'num_pages': None,
+                'count': self.count,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
         return Response({
             'active_page': self.page.number,
             'num_pages': self.page.paginator.num_pages,
@@ -17,3 +80,136 @@ class StandardResultsSetPagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'results': data,
         })
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return self.get_cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        return self.get_cursor_link(self.page[0], reverse=True)
+
+    @staticmethod
+    def get_keyset_ordering(queryset) -> Optional[List[str]]:
+        """
+        Ordering of the queryset completed with the primary key, so every row has a unique position.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        opts = queryset.model._meta
+        names = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                return None
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = opts.pk.name
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.null:
+                return None
+            names.append(('-' if item.startswith('-') else '') + field.name)
+
+        if opts.pk.name not in (name.lstrip('-') for name in names):
+            descending = names[-1].startswith('-') if names else True  # unordered lists are the newest first
+            names.append(f'-{opts.pk.name}' if descending else opts.pk.name)
+        return names
+
+    def paginate_queryset_by_cursor(self, queryset, request) -> list:
+        self.model = queryset.model
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*self.reverse_ordering(self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset, self.ordering, position, reverse))
+
+        self.count = get_approximate_count(queryset) if self.approximate_count else None
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    @staticmethod
+    def reverse_ordering(ordering: List[str]) -> List[str]:
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+    @staticmethod
+    def get_keyset_filter(queryset, ordering: List[str], position: list, reverse: bool = False):
+        """
+        Rows after the position. Keys of the same direction are compared as a row value, (a, b) < (x, y),
+        which is the index condition of a composite index. Mixed directions are expanded into
+        (a > x) OR (a = x AND b < y) OR ... bounded by the first key.
+        The comparison is inverted for the backward pagination.
+        """
+        names = [name.lstrip('-') for name in ordering]
+        directions = {name.startswith('-') != reverse for name in ordering}
+        if len(directions) == 1:
+            lookup = LessThan if directions.pop() else GreaterThan
+            values = [Value(value, output_field=queryset.model._meta.get_field(name))
+                      for name, value in zip(names, position)]
+            return lookup(KeysetRow(*names), KeysetRow(*values))
+
+        keyset_filter = Q()
+        for index, name in enumerate(ordering):
+            descending = name.startswith('-') != reverse
+            condition = Q(**{f'{names[index]}__{"lt" if descending else "gt"}': position[index]})
+            for previous_name, previous_value in zip(names[:index], position[:index]):
+                condition &= Q(**{previous_name: previous_value})
+            keyset_filter |= condition
+        descending = ordering[0].startswith('-') != reverse
+        return Q(**{f'{names[0]}__{"lte" if descending else "gte"}': position[0]}) & keyset_filter
+
+    def get_ordering_fields(self) -> list:
+        return [self.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+    def get_position(self, obj) -> list:
+        position = []
+        for field in self.get_ordering_fields():
+            value = getattr(obj, field.attname)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def decode_cursor(self, request) -> Tuple[Optional[list], bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            position, reverse = data['p'], bool(data.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [field.to_python(value) for field, value in zip(self.get_ordering_fields(), position)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def encode_cursor(position: list, reverse: bool = False) -> str:
+        data = {'p': position}
+        if reverse:
+            data['r'] = 1
+        return urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+    def get_cursor_link(self, obj, reverse: bool) -> str:
+        encoded = self.encode_cursor(self.get_position(obj), reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -9,3 +9,14 @@ class ResponseErrorSerializer(serializers.Serializer):
     errors = serializers.ListField(
         allow_empty=False, child=serializers.DictField(allow_empty=False, child=ErrorComponentSerializer())
     )
+
+
+class DynamicFieldsSerializerMixin:
+    """
+    Takes an additional 'fields' argument that controls which fields should be displayed.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.core.cache import is_versioned_model, bump_cache_version
+
+
+@receiver([post_save, post_delete])
+def bump_model_cache_version(sender, **kwargs):
+    if is_versioned_model(sender):
+        bump_cache_version(sender)
+
+
+@receiver(m2m_changed)
+def bump_m2m_cache_version(sender, instance, action, model, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for changed_model in (instance.__class__, model):
+        if is_versioned_model(changed_model):
+            bump_cache_version(changed_model)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import TestCase
+
+from apps.core.benchmark import compare_results
+from apps.core.dataset import DatasetGenerator
+
+
+class CompareResultsTest(TestCase):
+    baseline = {'list': {'p95_ms': 10.0, 'queries': 3}, 'detail': {'p95_ms': 0.5, 'queries': 1}}
+
+    def test_regressions(self):
+        results = {
+            'list': {'p95_ms': 13.0, 'queries': 23},  # N+1
+            'detail': {'p95_ms': 0.9, 'queries': 1},  # +80%, but less than 1 ms
+            'new': {'p95_ms': 100.0, 'queries': 100},  # not in the baseline
+        }
+        self.assertEqual(compare_results(results, self.baseline, threshold=20), [
+            'list: queries 3 -> 23', 'list: p95 10.0 ms -> 13.0 ms',
+        ])
+
+    def test_within_threshold(self):
+        results = {'list': {'p95_ms': 11.0, 'queries': 2}}
+        self.assertEqual(compare_results(results, self.baseline, threshold=20), [])
+
+
+class BenchmarkAPICommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DatasetGenerator(users=5, anime=3, comments_per_anime=10, episodes_per_anime=2, teams=1, seed=1).generate()
+
+    def setUp(self):
+        self.output = os.path.join(tempfile.mkdtemp(), 'results.json')
+
+    def test_all_endpoints(self):
+        call_command('benchmark_api', '--iterations', '2', '--output', self.output, stdout=StringIO())
+        with open(self.output) as file:
+            results = json.load(file)
+
+        for name in ('anime:get_anime', 'anime:get_anime_comments', 'anime:get_anime_episode', 'anime:get_anime_list',
+                     'anime:search_anime', 'comment:get_reply_comments', 'user:user-anime'):
+            self.assertIn(name, results)
+        for name, summary in results.items():
+            self.assertEqual(summary['status'], 200, name)
+            self.assertEqual(summary['count'], 2)
+            self.assertGreater(summary['bytes'], 0)
+
+    def test_error_status(self):
+        with self.settings(ALLOWED_HOSTS=['api.example.com']), \
+                self.assertRaisesMessage(CommandError, 'anime:get_anime_list: status 503'), \
+                mock.patch('apps.anime.views.AnimeListAPIView.get', return_value=HttpResponse(status=503)):
+            call_command('benchmark_api', '--iterations', '1', '--endpoint', 'anime:get_anime_list',
+                         stdout=StringIO())
+
+    def test_regression(self):
+        call_command('benchmark_api', '--iterations', '1', '--endpoint', 'anime:get_anime', '--output', self.output,
+                     stdout=StringIO())
+        with open(self.output) as file:
+            baseline = json.load(file)
+        baseline['anime:get_anime']['queries'] -= 1
+        with open(self.output, 'w') as file:
+            json.dump(baseline, file)
+
+        with self.assertRaisesMessage(CommandError, 'anime:get_anime: queries'):
+            call_command('benchmark_api', '--iterations', '1', '--endpoint', 'anime:get_anime',
+                         '--baseline', self.output, stdout=StringIO())
+
+
+class BenchmarkPaginationCommandTest(TestCase):
+    def test_pages(self):
+        output = StringIO()
+        call_command('benchmark_pagination', '--rows', '100', '--pages', '1', '3', '--iterations', '1', stdout=output)
+
+        for name in ('page_number.1', 'cursor.1', 'page_number.3', 'cursor.3'):
+            self.assertIn(f'{name}: count=1', output.getvalue())
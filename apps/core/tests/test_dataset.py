@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Min
+from django.test import TestCase
+
+from apps.anime.models import Anime, Episode, PublishedVoiceover, Reaction, Voiceover
+from apps.comment.models import Comment
+from apps.core.dataset import DatasetGenerator, format_copy_value
+from apps.user.models import User, UserAnime, UserEpisodeViewed
+
+
+class DatasetGeneratorTest(TestCase):
+    options = dict(users=30, anime=5, comments_per_anime=20, episodes_per_anime=3, teams=3, reply_depth=2)
+
+    def get_comments(self) -> list:
+        """
+        Comments with ids relative to the first generated user and comment, to compare runs.
+        """
+        first_user = User.objects.filter(username__startswith='dataset_').aggregate(Min('id'))['id__min']
+        first_comment = Comment.objects.aggregate(Min('id'))['id__min']
+        return [
+            (object_id, parent_id and parent_id - first_comment, user_id - first_user, created, content)
+            for object_id, parent_id, user_id, created, content in Comment.objects.order_by('id').values_list(
+                'object_id', 'parent_id', 'user_id', 'created', 'content'
+            )
+        ]
+
+    def test_generate(self):
+        counts = DatasetGenerator(seed=1, **self.options).generate()
+
+        self.assertEqual(Anime.objects.count(), 5)
+        self.assertEqual(Episode.objects.count(), 15)
+        self.assertEqual(counts['user.User'], 30)
+        self.assertEqual(counts['user.UserAnime'], UserAnime.objects.count())
+        self.assertEqual(counts['user.UserEpisodeViewed'], UserEpisodeViewed.objects.count())
+        self.assertEqual(counts['comment.Comment'], Comment.objects.count())
+        self.assertEqual(counts['anime.Voiceover'], Voiceover.objects.count())
+        self.assertGreater(Comment.objects.filter(parent__isnull=False).count(), 0)
+        self.assertFalse(Comment.objects.filter(parent__parent__parent__isnull=False).exists())  # reply_depth=2
+        self.assertTrue(PublishedVoiceover.objects.exists())
+        for anime in Anime.objects.all():
+            self.assertEqual(anime.count_like, Reaction.objects.filter(anime=anime, reaction='LIKE').count())
+
+    def test_same_seed_gives_same_rows(self):
+        DatasetGenerator(seed=7, **self.options).generate()
+        comments = self.get_comments()
+        Comment.objects.all().delete()
+        User.objects.filter(username__startswith='dataset_').delete()
+
+        DatasetGenerator(seed=7, **self.options).generate()
+        self.assertEqual(self.get_comments(), comments)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_dataset', '--users', '5', '--anime', '2', '--comments-per-anime', '3',
+                     '--episodes-per-anime', '1', '--teams', '1', stdout=out)
+        self.assertIn('Finish generate dataset', out.getvalue())
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_format_copy_value(self):
+        self.assertEqual(format_copy_value('a\tb\\c\nd'), 'a\\tb\\\\c\\nd')
+        self.assertEqual(format_copy_value(None), '\\N')
+        self.assertEqual(format_copy_value(True), 't')
+        self.assertEqual(format_copy_value(12), '12')
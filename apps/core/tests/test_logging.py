@@ -0,0 +1,98 @@
+import io
+import json
+import logging
+import sys
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from anime_on.logging import FormatterJSON, QueueHandler, SamplingFilter, request_id_context
+
+
+def make_record(level: int = logging.WARNING, **extra) -> logging.LogRecord:
+    record = logging.LogRecord('apps.test', level, __file__, 1, 'Message %s', ('text',), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class FormatterJSONTest(TestCase):
+    def test_format(self):
+        with request_id_context('request-1'):
+            data = json.loads(FormatterJSON().format(make_record(message_id='test', request_body=b'{"a": 1}')))
+
+        self.assertEqual(data['message'], 'Message text')
+        self.assertEqual(data['logger'], 'apps.test')
+        self.assertEqual(data['levelname'], 'WARNING')
+        self.assertEqual(data['request_id'], 'request-1')
+        self.assertEqual(data['message_id'], 'test')
+        self.assertEqual(data['request_body'], '{"a": 1}')
+        self.assertNotIn('msg', data)
+        self.assertNotIn('thread', data)
+
+    def test_exception(self):
+        try:
+            raise ValueError('wrong')
+        except ValueError:
+            record = logging.LogRecord('apps.test', logging.ERROR, __file__, 1, 'Failed', (), sys.exc_info())
+
+        data = json.loads(FormatterJSON().format(record))
+
+        self.assertIn('ValueError: wrong\n', data['exception'])
+
+
+class QueueHandlerTest(TestCase):
+    def test_records_are_written_by_listener(self):
+        stream = io.StringIO()
+        handler = QueueHandler(stream)
+        handler.setFormatter(FormatterJSON())
+
+        with request_id_context('request-1'):
+            handler.handle(make_record())
+        handler.flush()
+
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data['message'], 'Message text')
+        self.assertEqual(data['request_id'], 'request-1')  # saved on the request thread
+
+
+class SamplingFilterTest(TestCase):
+    def test_filter(self):
+        sampling = SamplingFilter({'noisy': 0})
+
+        self.assertFalse(sampling.filter(make_record(message_id='noisy')))
+        self.assertTrue(sampling.filter(make_record(level=logging.ERROR, message_id='noisy')))
+        self.assertTrue(sampling.filter(make_record(message_id='other')))
+        self.assertTrue(sampling.filter(make_record()))
+
+
+class ErrorLoggingMiddlewareTest(TestCase):
+    def post(self, url: str, **kwargs) -> logging.LogRecord:
+        with self.assertLogs('apps.core.middleware', logging.WARNING) as logs:
+            self.client.post(url, **kwargs)
+        record, = [record for record in logs.records if record.message_id == 'error_logging_middleware']
+        return record
+
+    def test_body(self):
+        record = self.post(reverse('support:create-help-appeal'), data={'email': 'wrong'},
+                           content_type='application/json')
+
+        self.assertEqual(record.request_body, b'{"email": "wrong"}')
+
+    @override_settings(LOG_BODY_MAX_SIZE=10)
+    def test_big_body_is_not_read(self):
+        record = self.post(reverse('support:create-help-appeal'), data={'email': 'wrong'},
+                           content_type='application/json')
+
+        self.assertEqual(record.request_body, b'<application/json, 18 bytes>')
+        self.assertLessEqual(len(record.response_content), 10)
+
+    def test_multipart_is_not_read(self):
+        record = self.post(reverse('support:create-help-appeal'), data={'email': 'wrong'})
+
+        self.assertTrue(record.request_body.startswith(b'<multipart/form-data, '))
+
+    def test_password_is_not_logged(self):
+        record = self.post(reverse('authentication:login'), data={'username': 'user', 'password': 'secret'},
+                           content_type='application/json')
+
+        self.assertFalse(hasattr(record, 'request_body'))
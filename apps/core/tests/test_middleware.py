@@ -1,9 +1,93 @@
-from django.test import TestCase
+import json
+import logging
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from rest_framework import status
 
+from anime_on.logging import FormatterJSON
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.core.middleware import QueryStats
+
 
 class PingMiddlewareTestCase(TestCase):
     def test_ping_pong_success(self):
         response = self.client.get("/ping/")
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         self.assertEqual(response.content, b'pong')
+
+
+class JSONCapturingHandler(logging.Handler):
+    """
+    Formats records when they are emitted, while the request id of the request is set.
+    """
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(FormatterJSON())
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(self.format(record)))
+
+
+class QueryBudgetMiddlewareTestCase(AnimeProviderMixin, TestCase):
+    url = reverse('anime:get_anime_list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_anime(episodes=2)
+
+    def setUp(self):
+        cache.clear()  # cached responses don't query the database
+        self.handler = JSONCapturingHandler()
+        logger = logging.getLogger('apps.core.middleware')
+        logger.addHandler(self.handler)
+        self.addCleanup(logger.removeHandler, self.handler)
+
+    def test_server_timing(self):
+        response = self.client.get(self.url)
+
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+        self.assertEqual(self.handler.records, [])
+
+    @override_settings(QUERY_BUDGETS={'anime:get_anime_list': 0})
+    def test_over_budget(self):
+        self.client.get(self.url, HTTP_X_REQUEST_ID='request-1')
+
+        record, = self.handler.records
+        self.assertEqual(record['levelname'], 'WARNING')
+        self.assertEqual(record['request_id'], 'request-1')
+        self.assertEqual(record['view'], 'anime:get_anime_list')
+        self.assertEqual(record['queries_budget'], 0)
+        self.assertGreater(record['queries_count'], 0)
+        self.assertNotIn('queries', record)
+
+    @override_settings(QUERY_SAMPLE_RATE=1)
+    def test_sample(self):
+        self.client.get(self.url)
+
+        record, = self.handler.records
+        self.assertEqual(record['levelname'], 'INFO')
+        self.assertEqual(len(record['queries']), record['queries_count'])
+
+    @override_settings(QUERY_BUDGET_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(self.url)
+
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_duplicates(self):
+        stats = QueryStats()
+        execute = mock.Mock(return_value=None)
+        for index in range(5):
+            stats(execute, 'SELECT * FROM anime_episode WHERE anime_id = %s', [index], False, {})
+        stats(execute, 'SELECT * FROM anime_genre WHERE id IN (%s)', [1], False, {})
+        stats(execute, 'SELECT * FROM anime_genre WHERE id IN (%s, %s)', [1, 2], False, {})
+
+        self.assertEqual(stats.count, 7)
+        self.assertEqual(stats.get_duplicates(limit=2), [
+            {'sql': 'SELECT * FROM anime_episode WHERE anime_id = %s', 'count': 5},
+            {'sql': 'SELECT * FROM anime_genre WHERE id IN (%s, ...)', 'count': 2},
+        ])
@@ -0,0 +1,78 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from rest_framework import status
+
+from apps.core.cache import SlidingWindowLimiter
+from apps.core.mixins import CheckIPSpam
+
+
+class SlidingWindowLimiterTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @mock.patch('apps.core.cache.time.time')
+    def test_limit_in_window(self, time_mock):
+        limiter = SlidingWindowLimiter(limit=3, window=60)
+        time_mock.return_value = 600.0
+
+        self.assertEqual([limiter.hit('key') for _ in range(4)], [True, True, True, False])
+        self.assertTrue(limiter.hit('other-key'))
+
+    @mock.patch('apps.core.cache.time.time')
+    def test_hits_expire_after_window(self, time_mock):
+        limiter = SlidingWindowLimiter(limit=2, window=60)
+        for now, expected in ((630.0, True), (650.0, True), (675.0, False)):
+            time_mock.return_value = now
+            self.assertEqual(limiter.hit('key'), expected)
+        self.assertEqual(limiter.get_retry_after('key'), 15)
+
+        # the first hit has expired, the second one takes the slot till 710
+        time_mock.return_value = 691.0
+        self.assertTrue(limiter.hit('key'))
+        self.assertFalse(limiter.hit('key'))
+        self.assertEqual(limiter.get_retry_after('key'), 19)
+
+
+class BaseView:
+    def dispatch(self, request, *args, **kwargs):
+        return HttpResponse()
+
+
+class SpamView(CheckIPSpam, BaseView):
+    spam_key = 'test'
+
+
+class CheckIPSpamTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(IP_SPAM_LIMITS={'test': (2, 30)})
+    def test_limit_from_settings(self):
+        view = SpamView()
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+
+        statuses = [view.dispatch(request).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_403_FORBIDDEN])
+        self.assertEqual(view.dispatch(RequestFactory().post('/', REMOTE_ADDR='10.0.0.2')).status_code,
+                         status.HTTP_200_OK)
+
+    @mock.patch('apps.core.cache.time.time')
+    def test_retry_after_in_message(self, time_mock):
+        view = SpamView()
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        time_mock.return_value = 600.0
+        self.assertEqual(view.dispatch(request).status_code, status.HTTP_200_OK)
+
+        time_mock.return_value = 610.0
+        response = view.dispatch(request)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('через 20 секунд', json.loads(response.content)['errors'][0]['message'])
+
+        # the default limit is 1 request per 30 seconds
+        time_mock.return_value = 631.0
+        self.assertEqual(view.dispatch(request).status_code, status.HTTP_200_OK)
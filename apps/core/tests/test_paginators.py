@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.anime.models import Anime
+from apps.anime.paginators import AnimeListPaginator
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.comment.models import Comment
+from apps.user.models import User
+
+
+class CursorPaginationMixin:
+    def walk(self, url: str, data: dict = None, link: str = 'next'):
+        """
+        Follow links from the first page and return ids of every page.
+        """
+        pages = []
+        response = self.client.get(url, data=data)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            body = response.json()
+            pages.append([item['id'] for item in body['results']])
+            if not body[link]:
+                return pages, body
+            response = self.client.get(body[link])
+
+
+class AnimeListCursorPaginationTest(CursorPaginationMixin, AnimeProviderMixin, APITestCase):
+    url = reverse('anime:get_anime_list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anime_list = [cls.create_anime(title=f'Anime {index}') for index in range(15)]
+        for index, anime in enumerate(cls.anime_list):
+            Anime.objects.filter(pk=anime.pk).update(count_like=index % 3)  # many equal keys
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_walk_forward(self):
+        pages, last = self.walk(self.url, data={'cursor': '', 'page_size': 4})
+        expected = list(Anime.objects.order_by('-created', '-id').values_list('id', flat=True))
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 3])
+        self.assertEqual(sum(pages, []), expected)
+        self.assertIsNone(last['active_page'])
+        self.assertIsNone(last['count'])
+
+    def test_walk_backward(self):
+        pages, last = self.walk(self.url, data={'cursor': '', 'page_size': 4})
+        response = self.client.get(last['previous'])
+        self.assertEqual([item['id'] for item in response.json()['results']], pages[-2])
+
+        backward_pages, first = self.walk(last['previous'], link='previous')
+        self.assertEqual(backward_pages, pages[-2::-1])
+        self.assertIsNone(first['previous'])
+        self.assertIsNotNone(first['next'])
+
+    def test_equal_keys(self):
+        pages, _ = self.walk(self.url, data={'cursor': '', 'page_size': 4, 'order': '-count_like'})
+        expected = list(Anime.objects.order_by('-count_like', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_page_without_count(self):
+        response = self.client.get(self.url, data={'cursor': '', 'page_size': 4})
+        with self.assertNumQueries(1):
+            self.client.get(response.json()['next'])
+
+    @mock.patch.object(AnimeListPaginator, 'approximate_count', True)
+    def test_approximate_count(self):
+        response = self.client.get(self.url, data={'cursor': ''})
+        self.assertIsInstance(response.json()['count'], int)
+
+    def test_invalid_cursor(self):
+        for cursor in ('invalid', 'eyJwIjpbMV19', 'eyJwIjpbIngiLCJ5Il19'):  # not json, number of keys, values
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, data={'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_by_default(self):
+        response = self.client.get(self.url, data={'page_size': 4})
+        self.assertEqual(response.json()['active_page'], 1)
+        self.assertEqual(response.json()['count'], 15)
+
+
+class ReplyCommentCursorPaginationTest(CursorPaginationMixin, AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        anime = cls.create_anime()
+        user = User.objects.create(username='user', email='user@example.com')
+        content_type = ContentType.objects.get_for_model(Anime)
+        cls.parent = Comment.objects.create(
+            user=user, content='parent', content_main='parent', urlhash='parent', content_type=content_type,
+            object_id=anime.pk,
+        )
+        for index in range(10):
+            Comment.objects.create(
+                user=user, content=f'reply {index}', content_main=f'reply {index}', urlhash=f'reply-{index}',
+                parent=cls.parent, is_pinned=index == 3, content_type=content_type, object_id=anime.pk,
+            )
+
+    def test_walk_forward(self):
+        url = reverse('comment:get_reply_comments', kwargs={'pk': self.parent.pk})
+        pages, _ = self.walk(url, data={'cursor': '', 'page_size': 3})
+        expected = list(
+            self.parent.reply.order_by('-is_pinned', '-created', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(sum(pages, []), expected)
@@ -0,0 +1,120 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from anime_on.awscli import get_scheduler, get_task_key, schedule_command
+from anime_on.sqs_consumer import process_message
+from apps.core.choices import TaskCoalescing
+from apps.core.models import ScheduledTask
+
+
+@override_settings(SCHEDULER_BACKEND='anime_on.schedulers.MemoryScheduler')
+class ScheduleCommandTest(TransactionTestCase):
+    def setUp(self):
+        self.scheduler = get_scheduler()
+        self.scheduler.schedules.clear()
+        self.start_time = timezone.now() + timedelta(minutes=5)
+
+    def process(self, schedule: dict):
+        with mock.patch('anime_on.sqs_consumer.call_command') as call_command:
+            process_message({'Body': schedule['input']})
+        call_command.assert_called_once()
+
+    def test_without_coalescing(self):
+        schedule_command('rebuild_anime_counters', self.start_time)
+        schedule_command('rebuild_anime_counters', self.start_time)
+
+        self.assertEqual(len(self.scheduler.schedules), 2)
+        self.assertFalse(ScheduledTask.objects.exists())
+
+    def test_skip(self):
+        with self.assertLogs('anime_on.awscli', 'INFO') as logs:
+            for _ in range(3):
+                schedule_command('rebuild_anime_counters', self.start_time, kwargs={'anime': [1]},
+                                 coalesce=TaskCoalescing.SKIP)
+            schedule_command('rebuild_anime_counters', self.start_time, kwargs={'anime': [2]},
+                             coalesce=TaskCoalescing.SKIP)
+
+        self.assertEqual([record.message_id for record in logs.records], [
+            'schedule_command_task_registered', 'schedule_command_task_skipped', 'schedule_command_task_skipped',
+            'schedule_command_task_registered',
+        ])
+        self.assertEqual(len(self.scheduler.schedules), 2)
+        self.assertEqual(ScheduledTask.objects.count(), 2)
+
+    def test_debounce(self):
+        later = self.start_time + timedelta(minutes=5)
+        schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.DEBOUNCE)
+        schedule_command('rebuild_anime_counters', later, coalesce=TaskCoalescing.DEBOUNCE)
+
+        schedule, = self.scheduler.schedules.values()
+        self.assertEqual(schedule['schedule_expression'], f"at({later.strftime('%Y-%m-%dT%H:%M:%S')})")
+        self.assertEqual(ScheduledTask.objects.get().run_at, later)
+
+    def test_processed_task_is_scheduled_again(self):
+        schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+        schedule, = self.scheduler.schedules.values()
+        self.assertIn('task_key', json.loads(schedule['input']))
+
+        self.process(schedule)
+        self.assertFalse(ScheduledTask.objects.exists())
+        self.scheduler.schedules.clear()  # one-time schedules are deleted after the run
+        schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+
+        self.assertEqual(len(self.scheduler.schedules), 1)
+
+    def test_recurring_task_stays_pending(self):
+        schedule_command('rebuild_anime_counters', schedule_expression='rate(1 hour)', coalesce=TaskCoalescing.SKIP)
+        schedule, = self.scheduler.schedules.values()
+
+        self.process(schedule)
+        schedule_command('rebuild_anime_counters', schedule_expression='rate(1 hour)', coalesce=TaskCoalescing.SKIP)
+
+        self.assertEqual(len(self.scheduler.schedules), 1)
+        self.assertTrue(ScheduledTask.objects.exists())
+
+    @override_settings(SCHEDULER_TASK_STALE_AFTER=60)
+    def test_stale_task_is_scheduled_again(self):
+        past = timezone.now() - timedelta(minutes=2)
+        schedule_command('rebuild_anime_counters', past, coalesce=TaskCoalescing.SKIP)
+        schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+
+        schedule, = self.scheduler.schedules.values()
+        self.assertEqual(schedule['schedule_expression'], f"at({self.start_time.strftime('%Y-%m-%dT%H:%M:%S')})")
+
+    def test_rolled_back_registration_has_no_schedule(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+            raise RuntimeError
+
+        self.assertEqual(self.scheduler.schedules, {})
+        self.assertFalse(ScheduledTask.objects.exists())
+
+    def test_failed_schedule_is_not_pending(self):
+        with mock.patch.object(self.scheduler, 'create_schedule', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+        self.assertFalse(ScheduledTask.objects.exists())
+
+        schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.SKIP)
+        self.assertEqual(len(self.scheduler.schedules), 1)
+
+    def test_replaced_call_does_not_create_schedule(self):
+        later = self.start_time + timedelta(minutes=5)
+        with transaction.atomic():
+            schedule_command('rebuild_anime_counters', self.start_time, coalesce=TaskCoalescing.DEBOUNCE)
+            # the callback of the first call runs after the second one has replaced the row
+            schedule_command('rebuild_anime_counters', later, coalesce=TaskCoalescing.DEBOUNCE)
+
+        schedule, = self.scheduler.schedules.values()
+        self.assertEqual(schedule['schedule_expression'], f"at({later.strftime('%Y-%m-%dT%H:%M:%S')})")
+
+    def test_task_key(self):
+        self.assertEqual(get_task_key('command', kwargs={'a': 1, 'b': [2]}),
+                         get_task_key('command', kwargs={'b': [2], 'a': 1}))
+        self.assertNotEqual(get_task_key('command', ['1']), get_task_key('command', ['2']))
+        self.assertNotEqual(get_task_key('command'), get_task_key('other'))
@@ -0,0 +1,120 @@
+import json
+import threading
+from datetime import datetime, timedelta, UTC
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from anime_on.awscli import schedule_command
+from anime_on.schedule_expressions import get_next_run_at
+from anime_on.schedulers import DatabaseScheduler
+from apps.core.models import ScheduledJob
+
+
+NOW = datetime(2026, 3, 14, 13, 30, 15, tzinfo=UTC)  # Saturday
+
+
+class ScheduleExpressionTest(SimpleTestCase):
+    def test_at(self):
+        run_at = datetime(2026, 3, 20, 10, 0, tzinfo=UTC)
+
+        self.assertEqual(get_next_run_at('at(2026-03-20T10:00:00)', NOW), run_at)
+        self.assertIsNone(get_next_run_at('at(2026-03-20T10:00:00)', NOW, previous=run_at))
+
+    def test_rate(self):
+        self.assertEqual(get_next_run_at('rate(5 minutes)', NOW), NOW)
+        self.assertEqual(get_next_run_at('rate(5 minutes)', NOW, previous=NOW - timedelta(minutes=1)),
+                         NOW + timedelta(minutes=4))
+        # missed runs are skipped
+        self.assertEqual(get_next_run_at('rate(1 hour)', NOW, previous=NOW - timedelta(hours=3, minutes=10)),
+                         NOW + timedelta(minutes=50))
+
+    def test_cron(self):
+        cases = {
+            'cron(0 12 * * ? *)': datetime(2026, 3, 15, 12, 0, tzinfo=UTC),
+            'cron(*/15 * * * ? *)': datetime(2026, 3, 14, 13, 45, tzinfo=UTC),
+            'cron(15 10 ? * MON-FRI *)': datetime(2026, 3, 16, 10, 15, tzinfo=UTC),
+            'cron(0 8 ? * 1 *)': datetime(2026, 3, 15, 8, 0, tzinfo=UTC),  # Sunday
+            'cron(0 0 L * ? *)': datetime(2026, 3, 31, 0, 0, tzinfo=UTC),
+            'cron(15 10 ? * 6L *)': datetime(2026, 3, 27, 10, 15, tzinfo=UTC),  # the last Friday
+            'cron(0 0 ? * L *)': datetime(2026, 3, 21, 0, 0, tzinfo=UTC),  # Saturday
+            'cron(30 9 1 JAN,JUL ? 2027)': datetime(2027, 1, 1, 9, 30, tzinfo=UTC),
+        }
+        for expression, expected in cases.items():
+            with self.subTest(expression):
+                self.assertEqual(get_next_run_at(expression, NOW), expected)
+        self.assertIsNone(get_next_run_at('cron(0 0 1 1 ? 2020)', NOW))
+
+    def test_wrong(self):
+        for expression in ('every(5 minutes)', 'rate(0 minutes)', 'rate(5 weeks)', 'cron(0 12 * * *)',
+                           'cron(0 12 1 * MON *)', 'cron(0 25 * * ? *)', 'cron(0 12 ? * 6#3 *)',
+                           'cron(0 12 ? * 8L *)'):
+            with self.subTest(expression), self.assertRaises(ValueError):
+                get_next_run_at(expression, NOW)
+
+
+@override_settings(SCHEDULER_BACKEND='anime_on.schedulers.DatabaseScheduler')
+class DatabaseSchedulerTest(TransactionTestCase):
+    def create_job(self, name: str, schedule_expression: str, next_run_at: datetime = None) -> ScheduledJob:
+        DatabaseScheduler().create_schedule(name, schedule_expression, json.dumps({'command': name}))
+        job = ScheduledJob.objects.get(name=name)
+        if next_run_at:
+            job.next_run_at = next_run_at
+            job.save()
+        return job
+
+    def test_schedule_command(self):
+        schedule_command('rebuild_anime_counters', schedule_expression='rate(1 day)', kwargs={'anime': [1]})
+
+        job = ScheduledJob.objects.get()
+        self.assertEqual(json.loads(job.input)['kwargs'], {'anime': [1]})
+        self.assertLessEqual(job.next_run_at, timezone.now())
+
+    @mock.patch('anime_on.sqs_consumer.handle_message', return_value={'ok': True, 'duration_ms': 1.0})
+    def test_run_scheduler(self, handle_message):
+        past = timezone.now() - timedelta(seconds=30)
+        self.create_job('one_time', f"at({past.strftime('%Y-%m-%dT%H:%M:%S')})")
+        self.create_job('recurring', 'rate(10 minutes)', next_run_at=past)
+        self.create_job('not_due', 'rate(10 minutes)', next_run_at=timezone.now() + timedelta(minutes=5))
+
+        output = StringIO()
+        call_command('run_scheduler', '--once', stdout=output)
+
+        self.assertEqual(handle_message.call_count, 2)
+        self.assertIn('2 jobs run, 0 failed', output.getvalue())
+        self.assertFalse(ScheduledJob.objects.filter(name='one_time').exists())
+        recurring = ScheduledJob.objects.get(name='recurring')
+        self.assertEqual(recurring.next_run_at, past + timedelta(minutes=10))
+        self.assertEqual((recurring.runs, recurring.failures, recurring.last_ok), (1, 0, True))
+        self.assertEqual(recurring.leased_by, '')
+        self.assertEqual(ScheduledJob.objects.get(name='not_due').runs, 0)
+
+    def test_locked_jobs_are_skipped(self):
+        past = timezone.now() - timedelta(seconds=1)
+        for name in ('first', 'second'):
+            self.create_job(name, 'rate(1 hour)', next_run_at=past)
+        locked, release = threading.Event(), threading.Event()
+
+        def lock_first_job():
+            with transaction.atomic():
+                list(ScheduledJob.objects.select_for_update().filter(name='first'))
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=lock_first_job)
+        thread.start()
+        locked.wait(5)
+        try:
+            jobs = DatabaseScheduler.lease_due_jobs('worker-1', limit=10, lease_seconds=60)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual([job.name for job in jobs], ['second'])
+        # leased jobs aren't taken by other workers until the lease expires
+        self.assertEqual([job.name for job in DatabaseScheduler.lease_due_jobs('worker-2', 10, 60)], ['first'])
+        self.assertEqual(DatabaseScheduler.lease_due_jobs('worker-3', 10, 60), [])
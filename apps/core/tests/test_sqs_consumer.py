@@ -0,0 +1,312 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from anime_on.sqs_consumer import (
+    SQSConsumer, dispatch_request, handle_batch, handle_message, process_message, process_request,
+)
+from anime_on.sqs_memory import InMemorySQSClient
+from anime_on.sqs_sqlite import SQLiteSQSClient
+from apps.anime.tests.mixins import AnimeProviderMixin
+
+
+QUEUE_URL = 'memory://queue'
+
+
+def sleeping_handler(message: dict) -> dict:
+    time.sleep(json.loads(message['Body'])['sleep'])
+    return {'ok': True, 'duration_ms': 0}
+
+
+class SQSConsumerTest(SimpleTestCase):
+    def setUp(self):
+        self.client = InMemorySQSClient()
+
+    def send(self, count: int, sleep: float = 0.0):
+        for _ in range(count):
+            self.client.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({'sleep': sleep}))
+
+    def run_until_empty(self, consumer: SQSConsumer, timeout: float = 10) -> float:
+        started = time.monotonic()
+        thread = threading.Thread(target=consumer.run)
+        thread.start()
+        while self.client.count_messages(QUEUE_URL) and time.monotonic() - started < timeout:
+            time.sleep(0.01)
+        consumer.stop()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive())
+        return time.monotonic() - started
+
+    def get_consumer(self, **kwargs) -> SQSConsumer:
+        kwargs = {'workers': 4, 'wait_time': 0, 'handler': sleeping_handler, **kwargs}
+        return SQSConsumer(self.client, QUEUE_URL, **kwargs)
+
+    def test_messages_are_processed_concurrently(self):
+        self.send(8, sleep=0.2)
+        consumer = self.get_consumer()
+
+        duration = self.run_until_empty(consumer)
+
+        self.assertLess(duration, 1.2)  # 1.6 s one by one
+        self.assertEqual(consumer.metrics['processed'], 8)
+        self.assertEqual(consumer.metrics['deleted'], 8)
+
+    def test_deletes_are_batched(self):
+        self.send(25)
+        consumer = self.get_consumer(workers=10)
+
+        self.run_until_empty(consumer)
+
+        self.assertEqual(consumer.metrics['deleted'], 25)
+        self.assertNotIn('delete_message', self.client.calls)
+        self.assertLessEqual(self.client.calls['delete_message_batch'], 5)
+
+    def test_visibility_is_extended(self):
+        self.send(1, sleep=1.5)
+        consumer = self.get_consumer(visibility_timeout=1)
+
+        self.run_until_empty(consumer)
+
+        self.assertEqual(consumer.metrics['received'], 1)  # it wasn't received again
+        self.assertGreater(consumer.metrics['extended'], 0)
+
+    def test_processed_messages_are_deleted_before_visibility_expires(self):
+        self.send(1, sleep=4)
+        self.send(3)
+        consumer = self.get_consumer(visibility_timeout=1)
+
+        self.run_until_empty(consumer)
+
+        # fast messages are deleted while the slow one is in progress, they aren't received again
+        self.assertEqual(consumer.metrics['received'], 4)
+        self.assertEqual(consumer.metrics['processed'], 4)
+        self.assertEqual(consumer.metrics['deleted'], 4)
+
+    def test_stop_finishes_messages_in_progress(self):
+        self.send(2, sleep=0.3)
+        self.send(10)
+        consumer = self.get_consumer(workers=2)
+        thread = threading.Thread(target=consumer.run)
+        thread.start()
+        time.sleep(0.1)
+
+        consumer.stop()
+        thread.join(5)
+
+        self.assertEqual(consumer.metrics['processed'], 2)
+        self.assertEqual(consumer.metrics['deleted'], 2)
+        self.assertEqual(self.client.count_messages(QUEUE_URL), 10)
+
+    def test_failed_messages_are_deleted(self):
+        self.send(3)
+        consumer = self.get_consumer(handler=lambda message: {'ok': False})
+
+        self.run_until_empty(consumer)
+
+        self.assertEqual(consumer.metrics['failed'], 3)
+        self.assertEqual(consumer.metrics['deleted'], 3)
+
+
+class BatchingTest(SimpleTestCase):
+    def setUp(self):
+        self.client = InMemorySQSClient()
+
+    def send_commands(self, command: str, count: int):
+        for index in range(count):
+            self.client.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({
+                'command': command, 'kwargs': {'anime': [index]},
+            }))
+
+    @mock.patch('anime_on.sqs_consumer.handle_batch',
+                side_effect=lambda path, messages: [{'ok': True, 'duration_ms': 0} for _ in messages])
+    def test_messages_of_command_are_grouped(self, batch):
+        self.send_commands('batched', 5)
+        self.send_commands('single', 1)
+        self.send_commands('other', 2)
+        # all messages are received at once
+        consumer = SQSConsumer(self.client, QUEUE_URL, workers=10, wait_time=0, handler=lambda message: {'ok': True},
+                               batch_handlers={'batched': 'handlers.batched', 'single': 'handlers.single'})
+
+        SQSConsumerTest.run_until_empty(self, consumer)
+
+        batch.assert_called_once()
+        (path, messages), _ = batch.call_args
+        self.assertEqual(path, 'handlers.batched')
+        self.assertEqual([json.loads(message['Body'])['kwargs'] for message in messages],
+                         [{'anime': [index]} for index in range(5)])
+        self.assertEqual(consumer.metrics['batches'], 1)
+        self.assertEqual(consumer.metrics['processed'], 8)
+        self.assertEqual(consumer.metrics['deleted'], 8)
+
+
+class SQLiteSQSConsumerTest(SQSConsumerTest):
+    def setUp(self):
+        self.client = SQLiteSQSClient(os.path.join(tempfile.mkdtemp(), 'queue.sqlite3'))
+
+
+class SQLiteSQSClientTest(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'queue.sqlite3')
+        self.client = SQLiteSQSClient(self.path)
+
+    def test_visibility_timeout(self):
+        self.client.send_message(QueueUrl=QUEUE_URL, MessageBody='body', MessageAttributes={'kind': 'test'})
+
+        message, = self.client.receive_message(QueueUrl=QUEUE_URL, VisibilityTimeout=1)['Messages']
+        self.assertEqual(message['Body'], 'body')
+        self.assertEqual(message['MessageAttributes'], {'kind': 'test'})
+        self.assertEqual(self.client.receive_message(QueueUrl=QUEUE_URL), {})  # hidden
+        received_again, = self.client.receive_message(QueueUrl=QUEUE_URL, WaitTimeSeconds=2)['Messages']
+
+        self.assertEqual(received_again['MessageId'], message['MessageId'])
+        self.assertEqual(received_again['Attributes']['ApproximateReceiveCount'], '2')
+        response = self.client.delete_message_batch(QueueUrl=QUEUE_URL, Entries=[
+            {'Id': '0', 'ReceiptHandle': message['ReceiptHandle']},  # expired
+            {'Id': '1', 'ReceiptHandle': received_again['ReceiptHandle']},
+        ])
+        self.assertEqual(response['Successful'], [{'Id': '1'}])
+        self.assertEqual(response['Failed'][0]['Id'], '0')
+        self.assertEqual(self.client.count_messages(QUEUE_URL), 0)
+
+    def test_messages_are_shared_between_clients(self):
+        self.client.send_message_batch(QueueUrl=QUEUE_URL, Entries=[
+            {'Id': str(index), 'MessageBody': str(index)} for index in range(10)
+        ])
+        other_client = SQLiteSQSClient(self.path)  # as in another process
+
+        received = self.client.receive_message(QueueUrl=QUEUE_URL, MaxNumberOfMessages=6)['Messages']
+        other_received = other_client.receive_message(QueueUrl=QUEUE_URL, MaxNumberOfMessages=6)['Messages']
+
+        self.assertEqual([message['Body'] for message in received + other_received], [str(i) for i in range(10)])
+        self.assertEqual(self.client.count_messages('memory://other'), 0)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])  # 'process_request' doesn't set the host of the test client
+class BenchmarkSQSConsumerCommandTest(TransactionTestCase):
+    def test_messages_are_processed(self):
+        output = StringIO()
+        call_command('benchmark_sqs_consumer', '--iterations', '60', '--workers', '4', '--transport', 'sqlite',
+                     '--failure-share', '0.1', stdout=output)
+
+        self.assertIn('All messages have been processed and deleted', output.getvalue())
+        self.assertIn('process.http: count=', output.getvalue())
+        self.assertIn('process.failure: count=', output.getvalue())
+
+
+def make_request_message(path: str, method: str = 'GET', body: dict = None, headers: dict = None,
+                         query: dict = None) -> dict:
+    return {
+        'detail-type': path,
+        'detail': {'httpMethod': method, 'body': body or '', 'headers': headers, 'queryStringParameters': query},
+    }
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class DispatchRequestTest(TestCase):
+    def setUp(self):
+        # as in the test client, the connection of the test transaction must not be closed by requests
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def test_get(self):
+        message = make_request_message(reverse('anime:get_anime_filters'), headers={'X-Request-ID': 'request-1'})
+
+        response = dispatch_request(message)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, process_request(message).content)
+        self.assertEqual(response.headers['X-Request-ID'], 'request-1')  # with the dispatch middleware
+
+    def test_post_body(self):
+        with self.assertLogs('apps.core.middleware', 'WARNING') as logs:
+            response = dispatch_request(make_request_message(reverse('authentication:token_refresh'), 'POST',
+                                                             {'refresh': 'wrong'}))
+
+        self.assertEqual(response.status_code, 401)  # not 400 of the missing field
+        self.assertEqual(logs.records[0].request_body, b'{"refresh": "wrong"}')
+
+    def test_session(self):
+        cache.clear()  # ids of random anime cached by other tests
+        self.addCleanup(cache.clear)
+        AnimeProviderMixin.create_anime()
+
+        response = dispatch_request(
+            make_request_message(reverse('anime:get_random_anime'), query={'no_repeat': 'true'})
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_finished(self):
+        receiver = mock.Mock()
+        request_finished.connect(receiver)
+        self.addCleanup(request_finished.disconnect, receiver)
+
+        dispatch_request(make_request_message(reverse('anime:get_anime_filters')))
+
+        receiver.assert_called_once()
+
+    def test_not_found(self):
+        with self.assertLogs('apps.core.middleware', 'WARNING'):
+            self.assertEqual(dispatch_request(make_request_message('/api/v1/missing/')).status_code, 404)
+
+    def test_process_message(self):
+        message = {'Body': json.dumps(make_request_message(reverse('anime:get_anime_filters')))}
+
+        with mock.patch('anime_on.sqs_consumer.process_request') as process:
+            self.assertEqual(process_message(message).status_code, 200)
+            process.assert_not_called()
+        with override_settings(SQS_DIRECT_DISPATCH=False), \
+                mock.patch('anime_on.sqs_consumer.dispatch_request') as dispatch:
+            self.assertEqual(process_message(message).status_code, 200)
+            dispatch.assert_not_called()
+
+
+def batch_handler(bodies: list):
+    if any(body['kwargs'].get('fail') for body in bodies):
+        raise ValueError('wrong')
+
+
+class HandleBatchTest(TestCase):
+    def get_messages(self, fail: bool = False) -> list:
+        return [{'MessageId': str(index), 'Body': json.dumps({'command': 'test', 'kwargs': {'fail': fail}})}
+                for index in range(3)]
+
+    @mock.patch('anime_on.sqs_consumer.handle_message')
+    def test_batch(self, handle):
+        results = handle_batch(f'{__name__}.batch_handler', self.get_messages())
+
+        self.assertEqual([result['ok'] for result in results], [True, True, True])
+        handle.assert_not_called()
+
+    @mock.patch('anime_on.sqs_consumer.handle_message', return_value={'ok': False})
+    def test_messages_are_processed_one_by_one_after_failure(self, handle):
+        with self.assertLogs('anime_on.sqs_consumer', 'ERROR'):
+            results = handle_batch(f'{__name__}.batch_handler', self.get_messages(fail=True))
+
+        self.assertEqual(handle.call_count, 3)
+        self.assertEqual(results, [{'ok': False}] * 3)
+
+
+class HandleMessageTest(SimpleTestCase):
+    @mock.patch('anime_on.sqs_consumer.process_message', side_effect=ValueError('wrong'))
+    def test_exception(self, process_message):
+        with self.assertLogs('anime_on.sqs_consumer', 'ERROR'):
+            result = handle_message({'Body': '{}'})
+
+        self.assertFalse(result['ok'])
+
+    @mock.patch('anime_on.sqs_consumer.process_message', return_value=mock.Mock(status_code=200))
+    def test_success(self, process_message):
+        self.assertTrue(handle_message({'Body': '{}'})['ok'])
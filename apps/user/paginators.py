@@ -5,3 +5,4 @@ class UserAnimeListPaginator(StandardResultsSetPagination):
     page_query_param = 'page'
     page_size = 12
     page_size_query_param = 'page_size'
+    cursor_pagination = True
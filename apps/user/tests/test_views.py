@@ -0,0 +1,30 @@
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.anime.tests.mixins import AnimeProviderMixin
+from apps.user.choices import UserAnimeChoices
+from apps.user.models import UserAnime
+from apps.user.tests.mixins import UserProviderMixin
+
+
+class UserAnimeAPIViewQueriesTest(UserProviderMixin, AnimeProviderMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(15):
+            anime = cls.create_anime(title=f'Anime {index}', episodes=index % 3)
+            UserAnime.objects.create(user=cls.user, anime=anime, action=UserAnimeChoices.VIEWED)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_user_anime_queries_do_not_depend_on_page_size(self):
+        for page_size in (1, 12):
+            # count + page
+            with self.subTest(page_size=page_size), self.assertNumQueries(2):
+                response = self.client.get(reverse('user:user-anime'), data={'page_size': page_size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['results']), page_size)
+            self.assertIn('count_episodes', response.json()['results'][0]['anime'])
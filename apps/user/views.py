@@ -87,7 +87,7 @@ class UserAnimeAPIView(ListAPIView, APIView):
     request_serializer = RequestUserAnimeSerializer
     request_delete_serializer = RequestUserAnimeDeleteSerializer
 
-    queryset = UserAnime.objects.prefetch_related('anime__episode_set').all()
+    queryset = UserAnime.objects.select_related('anime').all()
 
     serializer_class = ResponseUserAnimeListSerializer
 
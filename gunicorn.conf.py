@@ -0,0 +1,8 @@
+# gunicorn loads this file from the working directory, see https://docs.gunicorn.org/en/stable/settings.html
+
+
+def post_worker_init(worker):
+    # in-process indexes are built before the worker accepts requests, not by the first request
+    from apps.anime.autocomplete import anime_prefix_index
+
+    anime_prefix_index.warm_up()